@@ -0,0 +1,184 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from playwright_stealth import Stealth
+
+try:
+    import psutil
+except ImportError:  # RSS-based recycling is skipped without psutil
+    psutil = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+async def block_heavy_assets(route):
+    # SPEED OPTIMIZATION: Block heavy assets but NOT images (since we need URLs)
+    if route.request.resource_type in ["media", "font"]:
+        await route.abort()
+    else:
+        await route.continue_()
+
+class _BrowserSlot:
+    """One Chromium instance + context. Retired slots close once their last page is returned."""
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.idle_pages = []
+        self.in_use = 0
+        self.navigations = 0
+        self.retired = False
+
+    async def close(self):
+        try:
+            await self.browser.close()
+        except Exception as e:
+            print(f"⚠️ Browser Pool: close error: {e}", file=sys.stderr)
+
+class BrowserPool:
+    """
+    Long-lived, in-process Chromium pool for the Playwright scrapers (replaces one
+    interpreter + one browser launch per scrape). Pages are pre-warmed with Stealth and
+    asset blocking, checked out with `async with BrowserPool.page() as page`, and browsers
+    are recycled after N navigations or when Chromium's RSS passes a ceiling.
+    """
+    enabled: bool = os.getenv("BROWSER_POOL_ENABLED", "1") == "1"
+    browser_count: int = int(os.getenv("BROWSER_POOL_BROWSERS", "1"))
+    max_pages: int = int(os.getenv("BROWSER_POOL_MAX_PAGES", "4"))
+    warm_pages: int = int(os.getenv("BROWSER_POOL_WARM_PAGES", "2"))
+    max_navigations: int = int(os.getenv("BROWSER_POOL_MAX_NAVIGATIONS", "100"))
+    max_rss_mb: int = int(os.getenv("BROWSER_POOL_MAX_RSS_MB", "1500"))
+
+    _playwright = None
+    _slots: list = []
+    _semaphore: asyncio.Semaphore = None
+    _lock: asyncio.Lock = None
+    stats: dict = {"checkouts": 0, "pages_created": 0, "recycles": 0, "launch_failures": 0}
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._playwright is not None and bool(cls._slots)
+
+    @classmethod
+    async def start(cls):
+        """Launches and pre-warms the browsers. Safe to call once per process."""
+        if not cls.enabled or cls.is_running():
+            return
+        cls._lock = asyncio.Lock()
+        cls._semaphore = asyncio.Semaphore(cls.max_pages)
+        try:
+            cls._playwright = await async_playwright().start()
+            for _ in range(cls.browser_count):
+                slot = await cls._launch_slot()
+                for _ in range(cls.warm_pages):
+                    slot.idle_pages.append(await cls._new_page(slot))
+                cls._slots.append(slot)
+            print(f"🧭 Browser Pool: {len(cls._slots)} browser(s) ready, max {cls.max_pages} concurrent pages")
+        except Exception as e:
+            cls.stats["launch_failures"] += 1
+            print(f"⚠️ Browser Pool unavailable (falling back to scraper subprocesses): {e}")
+            await cls.stop()
+
+    @classmethod
+    async def stop(cls):
+        for slot in cls._slots:
+            await slot.close()
+        cls._slots = []
+        if cls._playwright is not None:
+            try:
+                await cls._playwright.stop()
+            except Exception:
+                pass
+            cls._playwright = None
+
+    @classmethod
+    async def _launch_slot(cls):
+        browser = await cls._playwright.chromium.launch(headless=True)
+        context = await browser.new_context(user_agent=USER_AGENT, viewport={'width': 1280, 'height': 720})
+        return _BrowserSlot(browser, context)
+
+    @classmethod
+    async def _new_page(cls, slot):
+        page = await slot.context.new_page()
+        await Stealth().apply_stealth_async(page)
+        await page.route("**/*", block_heavy_assets)
+
+        def count_navigation(frame):
+            if frame == page.main_frame and frame.url != "about:blank":
+                slot.navigations += 1
+        page.on("framenavigated", count_navigation)
+        cls.stats["pages_created"] += 1
+        return page
+
+    @staticmethod
+    def _chromium_rss_mb() -> float:
+        if psutil is None:
+            return 0
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    @classmethod
+    async def _recycle_if_needed(cls):
+        """Retires worn-out browsers and launches fresh ones in their place."""
+        worn_out = [s for s in cls._slots if s.navigations >= cls.max_navigations]
+        if not worn_out and cls.max_rss_mb and cls._chromium_rss_mb() > cls.max_rss_mb:
+            # Over the RSS ceiling: retire the busiest browser (fresh ones are left alone)
+            busiest = max(cls._slots, key=lambda s: s.navigations)
+            worn_out = [busiest] if busiest.navigations > 0 else []
+
+        # One recycle per check keeps relaunch cost off a single request
+        for slot in worn_out[:1]:
+            print(f"♻️ Browser Pool: recycling browser after {slot.navigations} navigations")
+            slot.retired = True
+            cls._slots[cls._slots.index(slot)] = await cls._launch_slot()
+            cls.stats["recycles"] += 1
+            if slot.in_use == 0:
+                await slot.close()
+
+    @classmethod
+    @asynccontextmanager
+    async def page(cls):
+        """Checks out a ready page (blocks while `max_pages` are in use) and returns it afterwards."""
+        if not cls.is_running():
+            raise RuntimeError("Browser pool is not running")
+
+        async with cls._semaphore:
+            async with cls._lock:
+                await cls._recycle_if_needed()
+                slot = min(cls._slots, key=lambda s: s.in_use)
+                page = slot.idle_pages.pop() if slot.idle_pages else await cls._new_page(slot)
+                slot.in_use += 1
+                cls.stats["checkouts"] += 1
+            try:
+                yield page
+            finally:
+                slot.in_use -= 1
+                if slot.retired:
+                    if slot.in_use == 0:
+                        await slot.close()
+                elif page.is_closed():
+                    pass
+                else:
+                    try:
+                        # Drop the previous site's DOM and timers before the page is reused
+                        await page.goto("about:blank")
+                        slot.idle_pages.append(page)
+                    except Exception:
+                        await page.close()
+
+    @classmethod
+    def get_stats(cls):
+        return {
+            **cls.stats,
+            "running": cls.is_running(),
+            "browsers": len(cls._slots),
+            "pages_in_use": sum(s.in_use for s in cls._slots),
+            "idle_pages": sum(len(s.idle_pages) for s in cls._slots),
+            "navigations": [s.navigations for s in cls._slots],
+            "chromium_rss_mb": round(cls._chromium_rss_mb(), 1),
+        }
@@ -0,0 +1,52 @@
+import time
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Closed: calls go through. After `failure_threshold` failures in a row it opens, and callers
+    skip the dependency until `reset_timeout` has passed; then one trial call is let through
+    (half-open) and its outcome closes the circuit again or re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.stats = {"opened": 0, "closed": 0, "failures": 0, "successes": 0}
+
+    def allow(self) -> bool:
+        """True when a call should be attempted (closed, or open long enough to try again)."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        return self.state != "open"
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self.failures = 0
+        if self.state != "closed":
+            self.state = "closed"
+            self.opened_at = None
+            self.stats["closed"] += 1
+
+    def record_failure(self, error=None) -> bool:
+        """Counts a failure. Returns True when this failure opened the circuit."""
+        self.stats["failures"] += 1
+        self.failures += 1
+        self.last_error = str(error) if error is not None else None
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+            return True
+        return False
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.opened_at else 0,
+            "last_error": self.last_error,
+        }
@@ -1,15 +1,212 @@
 import asyncio
 import json
+import os
+import re
 import sys
+import httpx
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
-async def scrape_daraz(keyword):
+# Add the project root to sys.path (this file also runs as a standalone script)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.scrape_readiness import wait_for_cards
+from backend.normalize import parse_price, parse_reviews
+
+# Product cards on the catalog grid (anchor fallback mirrors the extraction script below)
+CARD_SELECTOR = 'div[data-qa-locator="product-item"], [class*="gridItem"], [class*="product-card"], a[href*="/products/"]'
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+CATALOG_URL = "https://www.daraz.pk/catalog/"
+
+# --- HTTP FAST PATH (no browser) ---
+# Daraz catalog pages ship their listing as JSON: `?ajax=true` returns it directly and the
+# HTML page embeds the same payload as `window.pageData = {...}`.
+_http_client: httpx.AsyncClient = None
+
+def get_http_client():
+    """Shared keep-alive client, reused across requests."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+            timeout=httpx.Timeout(8.0, connect=4.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            follow_redirects=True,
+        )
+    return _http_client
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def _extract_page_data(html: str):
+    match = re.search(r'window\.pageData\s*=\s*(\{.*?\})\s*;?\s*</script>', html, re.DOTALL)
+    return json.loads(match.group(1)) if match else {}
+
+def parse_daraz_listing(payload, limit=15):
+    """
+    Converts a Daraz catalog payload (ajax JSON dict, or the catalog HTML) into result items.
+    Pure function so it can be checked offline against saved responses.
+    """
+    if isinstance(payload, str):
+        payload = _extract_page_data(payload)
+    items = ((payload or {}).get("mods") or {}).get("listItems") or []
+
+    results = []
+    for item in items[:limit]:
+        try:
+            title = (item.get("name") or "").strip()
+            price = int(parse_price(item.get("price") or item.get("priceShow")))
+            reviews = parse_reviews(item.get("review"))
+            try:
+                rating = round(float(item.get("ratingScore")), 1)
+            except (TypeError, ValueError):
+                rating = 4.0 + (price % 10) / 10
+
+            link = item.get("itemUrl") or item.get("productUrl") or ""
+            if link.startswith("//"):
+                link = "https:" + link
+            image_url = item.get("image") or ""
+            if image_url and not image_url.startswith("http"):
+                image_url = "https:" + image_url
+
+            if title and price > 0:
+                results.append({
+                    "title": title,
+                    "price": price,
+                    "platform": "Daraz",
+                    "image": image_url,
+                    "link": link,
+                    "rating": rating,
+                    "reviews": reviews,
+                    "growth": f"+{10 + (price % 15)}%",
+                    "pos": 65 + (price % 25),
+                    "seller": item.get("sellerName") or None,
+                    "fetch_path": "http"
+                })
+        except Exception:
+            continue
+    return results
+
+async def scrape_daraz_http(keyword):
+    """Fetches the catalog listing over plain HTTP. Returns [] when blocked or empty."""
+    client = get_http_client()
+    params = {"q": keyword}
+    try:
+        response = await client.get(CATALOG_URL, params={**params, "ajax": "true"}, headers={"Accept": "application/json"})
+        if response.status_code == 200 and "json" in response.headers.get("content-type", ""):
+            results = parse_daraz_listing(response.json())
+            if results:
+                return results
+
+        # Anti-bot pages or HTML responses: try the embedded pageData instead
+        response = await client.get(CATALOG_URL, params=params, headers={"Accept": "text/html"})
+        if response.status_code == 200:
+            return parse_daraz_listing(response.text)
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"Daraz HTTP fast path failed: {e}", file=sys.stderr)
+    return []
+
+async def scrape_daraz_page(page, keyword):
+    """Scrapes search results with an already prepared page (stealth + asset blocking applied)."""
     results = []
+
+    search_url = f"https://www.daraz.pk/catalog/?q={keyword.replace(' ', '+')}"
+    print(f"Searching Daraz: {search_url}", file=sys.stderr)
+
+    try:
+        await page.goto(search_url, wait_until="domcontentloaded", timeout=45000)
+        # Wait for the grid to render (first card + stable count) instead of a fixed 4s sleep
+        await wait_for_cards(page, CARD_SELECTOR, "daraz")
+
+        # Take a debug screenshot
+        # await page.screenshot(path="daraz_debug.png")
+
+        # Use page.evaluate to extract products
+        products_data = await page.evaluate('''() => {
+            // Try multiple selectors for product items
+            let items = Array.from(document.querySelectorAll('div[data-qa-locator="product-item"], [class*="gridItem"], [class*="product-card"]'));
+
+            // If not found, look for elements that have an anchor with a link containing /products/
+            if (items.length === 0) {
+                items = Array.from(document.querySelectorAll('a')).filter(a => {
+                    return a.href.includes('/products/') && (a.innerText.includes('Rs') || a.innerText.includes('Rs.'));
+                }).map(a => a.closest('div'));
+            }
+
+            return items.slice(0, 15).map(item => {
+                const titleElem = item.querySelector('a[title], [class*="title"] a, [class*="title"]');
+                const priceElem = item.querySelector('[class*="price"]');
+                const imgElem = item.querySelector('img');
+
+                // Reviews extraction: Daraz uses span classes like "rating__review", ".rat-rev", or just text in parens
+                let reviewsText = "0";
+                const reviewElem = item.querySelector('[class*="rating__review"], .rat-rev, [class*="review"], [class*="rating-count"]');
+                if (reviewElem) {
+                    reviewsText = reviewElem.innerText;
+                } else {
+                    // Fallback: look for text matching (numbers)
+                    const allText = item.innerText;
+                    const match = allText.match(/\((\d+[\d,kK\+]*)\)/);
+                    if (match) reviewsText = match[1];
+                }
+
+                return {
+                    title: titleElem ? (titleElem.innerText || titleElem.getAttribute('title')) : "Unknown",
+                    link: item.querySelector('a') ? item.querySelector('a').href : "",
+                    price: priceElem ? priceElem.innerText : "",
+                    image: imgElem ? (imgElem.src || imgElem.getAttribute('data-src')) : "",
+                    reviews: reviewsText
+                };
+            });
+        }''')
+
+        for p_data in products_data:
+            try:
+                price = int(parse_price(p_data.get('price')))
+                reviews = parse_reviews(p_data.get('reviews'))
+
+                image_url = p_data.get('image', '')
+                if image_url and not image_url.startswith('http'):
+                    image_url = 'https:' + image_url
+
+                if p_data['title'] and price > 0:
+                    results.append({
+                        "title": p_data['title'].strip(),
+                        "price": price,
+                        "platform": "Daraz",
+                        "image": image_url,
+                        "link": p_data['link'],
+                        "rating": 4.0 + (price % 10) / 10,
+                        "reviews": reviews,
+                        "growth": f"+{10 + (price % 15)}%",
+                        "pos": 65 + (price % 25),
+                        "fetch_path": "browser"
+                    })
+            except Exception as e:
+                continue
+
+    except Exception as e:
+        print(f"Error scraping Daraz: {e}", file=sys.stderr)
+    return results
+
+async def scrape_daraz(keyword, http: bool = True):
+    """
+    Standalone scrape: HTTP fast path first, a fresh Chromium only if that yields nothing.
+    `http=False` (--no-http) goes straight to Chromium, for callers that already tried the fast path.
+    """
+    if http:
+        results = await scrape_daraz_http(keyword)
+        await close_http_client()
+        if results:
+            return results
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            user_agent=USER_AGENT,
             viewport={'width': 1280, 'height': 720}
         )
         page = await context.new_page()
@@ -23,89 +220,7 @@ async def scrape_daraz(keyword):
                 await route.continue_()
         await page.route("**/*", block_aggressively)
         
-        search_url = f"https://www.daraz.pk/catalog/?q={keyword.replace(' ', '+')}"
-        print(f"Searching Daraz: {search_url}", file=sys.stderr)
-        
-        try:
-            await page.goto(search_url, wait_until="domcontentloaded", timeout=45000)
-            await asyncio.sleep(4) # Reduced wait since we are blocking heavy assets
-            
-            # Take a debug screenshot
-            # await page.screenshot(path="daraz_debug.png")
-            
-            # Use page.evaluate to extract products
-            products_data = await page.evaluate('''() => {
-                // Try multiple selectors for product items
-                let items = Array.from(document.querySelectorAll('div[data-qa-locator="product-item"], [class*="gridItem"], [class*="product-card"]'));
-                
-                // If not found, look for elements that have an anchor with a link containing /products/
-                if (items.length === 0) {
-                    items = Array.from(document.querySelectorAll('a')).filter(a => {
-                        return a.href.includes('/products/') && (a.innerText.includes('Rs') || a.innerText.includes('Rs.'));
-                    }).map(a => a.closest('div'));
-                }
-
-                return items.slice(0, 15).map(item => {
-                    const titleElem = item.querySelector('a[title], [class*="title"] a, [class*="title"]');
-                    const priceElem = item.querySelector('[class*="price"]');
-                    const imgElem = item.querySelector('img');
-                    
-                    // Reviews extraction: Daraz uses span classes like "rating__review", ".rat-rev", or just text in parens
-                    let reviewsText = "0";
-                    const reviewElem = item.querySelector('[class*="rating__review"], .rat-rev, [class*="review"], [class*="rating-count"]');
-                    if (reviewElem) {
-                        reviewsText = reviewElem.innerText;
-                    } else {
-                        // Fallback: look for text matching (numbers)
-                        const allText = item.innerText;
-                        const match = allText.match(/\((\d+[\d,kK\+]*)\)/);
-                        if (match) reviewsText = match[1];
-                    }
-
-                    return {
-                        title: titleElem ? (titleElem.innerText || titleElem.getAttribute('title')) : "Unknown",
-                        link: item.querySelector('a') ? item.querySelector('a').href : "",
-                        price: priceElem ? priceElem.innerText : "",
-                        image: imgElem ? (imgElem.src || imgElem.getAttribute('data-src')) : "",
-                        reviews: reviewsText
-                    };
-                });
-            }''')
-            
-            for p_data in products_data:
-                try:
-                    price_text = p_data.get('price', '0')
-                    price = int(''.join(filter(str.isdigit, price_text))) if any(c.isdigit() for c in price_text) else 0
-                    
-                    reviews = 0
-                    rt = p_data.get('reviews', '0')
-                    if rt and "k" in rt.lower():
-                        reviews = int(float(rt.lower().replace("k", "").replace("+", "").replace(",", "")) * 1000)
-                    elif rt:
-                        reviews = int(''.join(filter(str.isdigit, rt))) if any(c.isdigit() for c in rt) else 0
-                    
-                    image_url = p_data.get('image', '')
-                    if image_url and not image_url.startswith('http'):
-                        image_url = 'https:' + image_url
-                        
-                    if p_data['title'] and price > 0:
-                        results.append({
-                            "title": p_data['title'].strip(),
-                            "price": price,
-                            "platform": "Daraz",
-                            "image": image_url,
-                            "link": p_data['link'],
-                            "rating": 4.0 + (price % 10) / 10,
-                            "reviews": reviews,
-                            "growth": f"+{10 + (price % 15)}%",
-                            "pos": 65 + (price % 25)
-                        })
-                except Exception as e:
-                    continue
-                    
-        except Exception as e:
-            print(f"Error scraping Daraz: {e}", file=sys.stderr)
-        
+        results = await scrape_daraz_page(page, keyword)
         await browser.close()
     return results
 
@@ -114,6 +229,15 @@ if __name__ == "__main__":
         print(json.dumps([]))
         sys.exit(1)
         
+    # Offline check against a saved catalog response: daraz_scraper.py --fixture <file.json|file.html>
+    if sys.argv[1] == "--fixture" and len(sys.argv) > 2:
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            raw = f.read()
+        payload = json.loads(raw) if sys.argv[2].endswith(".json") else raw
+        print(json.dumps(parse_daraz_listing(payload)))
+        sys.exit(0)
+
+    # daraz_scraper.py <keyword> [--no-http]
     keyword = sys.argv[1]
-    results = asyncio.run(scrape_daraz(keyword))
+    results = asyncio.run(scrape_daraz(keyword, http="--no-http" not in sys.argv[2:]))
     print(json.dumps(results))
@@ -1,61 +1,316 @@
 import motor.motor_asyncio
+import asyncio
+import base64
 import os
 import json
+import re
+import time
 import certifi
 from datetime import datetime
-from tinydb import TinyDB, Query
 from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.circuit_breaker import CircuitBreaker
+from backend.local_store import LocalStore, FIELD_NAME, LEGACY_TABLES
+from backend.product_index import ProductIndex
+from backend.shared_storage import LocalStorage
+from backend.snapshot_store import SnapshotStore
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 DATABASE_NAME = "pakpick_ai"
+BULK_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", "500"))
+# Connection pool and failure handling for Atlas
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+HEALTH_CHECK_SECONDS = float(os.getenv("MONGO_HEALTH_CHECK_SECONDS", "15"))
+LOCAL_PAGE_SIZE = 500  # rows per SQLite round-trip while streaming
+
+def _upsert_key_indexes():
+    # save_product / save_products_many upsert on (title, platform); `id` serves /details, /export and watchlist deletes
+    return [
+        IndexModel([("title", ASCENDING), ("platform", ASCENDING)], unique=True, name="title_platform_unique"),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ]
+
+# Indexes every Mongo collection must have, reconciled at connect time
+INDEXES = {
+    "products": _upsert_key_indexes() + [
+        IndexModel([("pos_score", DESCENDING)], name="pos_score"),   # default /products sort
+        IndexModel([("price", ASCENDING)], name="price"),            # budget range filters
+    ],
+    "emerging_trends": _upsert_key_indexes(),
+    "watchlist": _upsert_key_indexes(),
+    "search_cache": [
+        IndexModel([("q", ASCENDING)], unique=True, name="q_unique"),   # upsert key (cloud migration)
+        IndexModel([("results.id", ASCENDING)], name="results_id"),
+        # Entries carry a Date `expires_at` (SearchCache.to_cloud), removed by Mongo once it passes
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "system_metadata": [IndexModel([("key", ASCENDING)], unique=True, name="key_unique")],
+}
+INDEX_OPTIONS = ("unique", "expireAfterSeconds", "sparse")
+# Collections whose ids ProductIndex tracks (detail and export lookups)
+INDEXED_COLLECTIONS = ("products", "watchlist")
 
 class Database:
     client: motor.motor_asyncio.AsyncIOMotorClient = None
     db: motor.motor_asyncio.AsyncIOMotorDatabase = None
-    local_db: TinyDB = None
+    local_db: LocalStore = None
     mode: str = "Disconnected"
+    index_status: dict = {}
+
+    breaker: CircuitBreaker = CircuitBreaker(
+        failure_threshold=int(os.getenv("MONGO_BREAKER_FAILURES", "3")),
+        reset_timeout=float(os.getenv("MONGO_BREAKER_RESET_SECONDS", "30")),
+    )
+    health: dict = {"last_probe_at": None, "last_latency_ms": None, "promotions": 0, "demotions": 0, "replayed": 0}
+    _monitor: asyncio.Task = None
 
     @classmethod
-    async def connect_db(cls):
-        """Establish connection to MongoDB Atlas, with Local Fallback."""
-        # 1. Try Cloud Atlas
+    async def connect_db(cls, wait: bool = True):
+        """
+        Opens the local store (always: it is the fallback and holds writes waiting for the cloud)
+        and a pooled Atlas client. With wait=False (API startup) the first ping is left to the
+        health monitor, so startup never blocks on Atlas; it switches to Cloud once Atlas answers.
+        """
+        # 1. Local store
         try:
-            if not MONGO_URI:
-                raise Exception("No MONGO_URI provided in .env")
-                
-            print(f"📡 Attempting to connect to Cloud MongoDB...")
+            if not os.path.exists('backend/data'):
+                os.makedirs('backend/data')
+            cls.local_db = LocalStore.shared()
+            # First start on SQLite: bring over the old TinyDB data (one-shot)
+            imported = cls.local_db.import_tinydb()
+            if imported:
+                print(f"📥 Imported legacy local_storage.json into SQLite: {imported}")
+            if cls.local_db.get_metadata("tinydb_imported_at"):
+                # Imported tables only slow down every parse of the file the search cache still uses
+                dropped = LocalStorage.drop_tables(LEGACY_TABLES + ("system_metadata",))
+                if dropped:
+                    print(f"🧹 Pruned imported tables from local_storage.json: {', '.join(dropped)}")
+        except Exception as local_e:
+            print(f"❌ Critical Error: Could not initialize local DB: {local_e}")
+            cls.mode = "Error"
+
+        # 2. Cloud Atlas
+        if not MONGO_URI:
+            print("🏠 No MONGO_URI provided in .env: Local Database Mode")
+            if cls.local_db is not None:
+                cls.mode = "Local (Permanent Fix)"
+            return
+        if cls.client is None:
+            print(f"📡 Connecting to Cloud MongoDB (pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE})...")
             cls.client = motor.motor_asyncio.AsyncIOMotorClient(
-                MONGO_URI, 
+                MONGO_URI,
                 tlsCAFile=certifi.where(),
-                serverSelectionTimeoutMS=2000, # Ultra-fast timeout (2s)
-                connectTimeoutMS=2000,
-                socketTimeoutMS=2000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=60000,
+                serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_TIMEOUT_MS,
             )
-            cls.db = cls.client[DATABASE_NAME]
-            # Force a call to ensure connection is actually alive
+        if cls.db is None and cls.local_db is not None:
+            cls.mode = "Local (Fallback Active)"
+        if wait:
+            await cls.probe()
+
+    @classmethod
+    async def probe(cls):
+        """One health check: promotes to Cloud when Atlas answers, counts a failure otherwise."""
+        if cls.client is None:
+            return False
+        started = time.perf_counter()
+        cls.health["last_probe_at"] = datetime.now().isoformat()
+        try:
             await cls.client.admin.command('ping')
-            cls.mode = "Cloud (Atlas)"
-            print("✅ Successfully connected to MongoDB Atlas!")
+        except Exception as e:
+            cls.health["last_latency_ms"] = None
+            if cls.db is None and cls.breaker.stats["failures"] == 0:
+                print(f"⚠️ Cloud Connection Failed (Staying Local, retrying in the background): {e}")
+            cls._cloud_failed(e)
+            return False
+        cls.health["last_latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        cls.breaker.record_success()
+        if cls.db is None:
+            await cls._promote()
+        elif cls.local_db is not None and cls.local_db.pending_count():
+            # Writes that fell back to Local on an isolated error (the circuit stayed closed)
+            try:
+                await cls.replay_local_writes()
+            except Exception as e:
+                print(f"⚠️ Replay to Cloud interrupted: {e}")
+                cls._cloud_failed(e)
+        return True
+
+    @classmethod
+    async def _promote(cls):
+        db = cls.client[DATABASE_NAME]
+        try:
+            # Local writes go up before traffic switches over, so they can't overwrite newer cloud writes
+            await cls.replay_local_writes(db)
+        except Exception as e:
+            print(f"⚠️ Replay to Cloud interrupted (Staying Local): {e}")
+            cls._cloud_failed(e)
             return
+        cls.db = db
+        cls.mode = "Cloud (Atlas)"
+        cls.health["promotions"] += 1
+        print("✅ Successfully connected to MongoDB Atlas!")
+        try:
+            await cls.ensure_indexes()
+            # Anything that landed locally while the first replay was running
+            await cls.replay_local_writes()
         except Exception as e:
-            print(f"⚠️ Cloud Connection Failed (Switching to Local): {e}")
+            cls._cloud_failed(e)
+
+    @classmethod
+    def _cloud_failed(cls, error):
+        """Records a cloud error; once the breaker opens, reads and writes switch to Local."""
+        if cls.breaker.record_failure(error) and cls.db is not None:
             cls.db = None
             cls.mode = "Local (Fallback Active)"
-        
-        # 2. Permanent Local Fallback (The Fix)
-        try:
-            print("🏠 Switching to Local Database Mode...")
-            if not os.path.exists('backend/data'):
-                os.makedirs('backend/data')
-            cls.local_db = TinyDB('backend/data/local_storage.json')
-            if cls.mode == "Disconnected":
-                cls.mode = "Local (Permanent Fix)"
-            print("✅ Local Database Initialized! (No IP/Internet issues anymore)")
-        except Exception as local_e:
-            print(f"❌ Critical Error: Could not initialize local DB: {local_e}")
-            cls.mode = "Error"
+            cls.health["demotions"] += 1
+            print(f"⚠️ Cloud circuit opened after {cls.breaker.failures} failures (Switching to Local): {error}")
+
+    @classmethod
+    def _journal(cls):
+        # Local writes are queued for replay whenever a cloud database is configured
+        return cls.client is not None
+
+    @classmethod
+    async def _health_loop(cls):
+        while True:
+            # Open circuit: only probe again once its reset timeout has passed
+            if cls.db is not None or cls.breaker.allow():
+                try:
+                    await cls.probe()
+                except Exception as e:
+                    print(f"⚠️ Database health probe error: {e}")
+            await asyncio.sleep(HEALTH_CHECK_SECONDS)
+
+    @classmethod
+    def start_health_monitor(cls):
+        """Background probes that demote to Local on failures and re-promote to Cloud on recovery."""
+        if cls.client is not None and (cls._monitor is None or cls._monitor.done()):
+            cls._monitor = asyncio.create_task(cls._health_loop())
+
+    @classmethod
+    async def close(cls):
+        if cls._monitor is not None:
+            cls._monitor.cancel()
+            cls._monitor = None
+        if cls.client is not None:
+            cls.client.close()
+
+    @classmethod
+    async def replay_local_writes(cls, db=None, batch_size=BULK_BATCH_SIZE):
+        """
+        Pushes documents that were written locally while Cloud was unavailable, oldest first.
+        Only writes Cloud accepted leave the queue: rejected ones stay for the next replay.
+        Raises on a cloud error; what was replayed before it stays cleared from the queue.
+        """
+        db = db if db is not None else cls.db
+        if cls.local_db is None or db is None:
+            return 0
+        replayed = rejected = 0
+        after = 0
+        while True:
+            rows = cls.local_db.pending(batch_size, after)
+            if not rows:
+                break
+            after = rows[-1][0]
+            # The current local version of each document is sent, so repeated writes replay once
+            done = []
+            for collection_name, entries in cls.local_db.pending_docs(rows).items():
+                rowids = [rowid for rowid, doc in entries if doc is not None]
+                docs = [doc for _, doc in entries if doc is not None]
+                # Documents removed locally since have nothing left to replay
+                done += [rowid for rowid, doc in entries if doc is None]
+                failed = set((await cls._cloud_bulk_write(collection_name, docs, db)).get("failed", [])) if docs else set()
+                done += [rowid for i, rowid in enumerate(rowids) if i not in failed]
+                rejected += len(failed)
+            cls.local_db.clear_pending(done)
+            replayed += len(done)
+        if replayed:
+            cls.health["replayed"] += replayed
+            print(f"🔁 Replayed {replayed} local writes to Cloud")
+        if rejected:
+            print(f"⚠️ Cloud rejected {rejected} replayed writes (kept queued for the next replay)")
+        return replayed
+
+    @classmethod
+    def get_status(cls):
+        return {
+            "mode": cls.mode,
+            "cloud_configured": cls.client is not None,
+            "breaker": cls.breaker.get_stats(),
+            **cls.health,
+            "pending_replay": cls.local_db.pending_count() if cls.local_db is not None else 0,
+            "pool": {"max": MONGO_MAX_POOL_SIZE, "min": MONGO_MIN_POOL_SIZE, "timeout_ms": MONGO_TIMEOUT_MS},
+            "health_check_seconds": HEALTH_CHECK_SECONDS,
+        }
+
+    @staticmethod
+    def _index_spec(key, options):
+        return list(key.items()) if hasattr(key, "items") else list(key), {o: options.get(o) for o in INDEX_OPTIONS if options.get(o) is not None}
+
+    @classmethod
+    async def ensure_indexes(cls, create=True):
+        """
+        Reconciles the declared INDEXES with what each collection has: missing ones are created
+        (unless `create` is False), and indexes with the same keys but other options, or that are
+        not declared at all, are reported (never dropped automatically). Returns the status per collection.
+        Only a reconcile (`create`) is kept as `index_status`; a read-only check just returns its report.
+        """
+        if cls.db is None:
+            return {}
+        status = {}
+        for collection_name, models in INDEXES.items():
+            report = {"present": [], "created": [], "missing": [], "conflicting": [], "extra": [], "errors": []}
+            try:
+                existing = await cls.db[collection_name].index_information()
+            except Exception as e:
+                report["errors"].append(str(e))
+                status[collection_name] = report
+                continue
+            existing_specs = {name: cls._index_spec(info["key"], info) for name, info in existing.items()}
+
+            declared_keys = []
+            for model in models:
+                document = model.document
+                key, options = cls._index_spec(document["key"], document)
+                declared_keys.append(key)
+                match = next((name for name, spec in existing_specs.items() if spec[0] == key), None)
+                if match is not None:
+                    report["present" if existing_specs[match][1] == options else "conflicting"].append(match)
+                elif not create:
+                    report["missing"].append(document["name"])
+                else:
+                    try:
+                        await cls.db[collection_name].create_indexes([model])
+                        report["created"].append(document["name"])
+                    except Exception as e:
+                        # e.g. duplicate (title, platform) documents block a unique index
+                        report["missing"].append(document["name"])
+                        report["errors"].append(f"{document['name']}: {e}")
+
+            report["extra"] = [name for name, spec in existing_specs.items() if name != "_id_" and spec[0] not in declared_keys]
+            status[collection_name] = report
+
+        result = {"checked_at": datetime.now().isoformat(), "collections": status}
+        if not create:
+            return result
+        cls.index_status = result
+        for collection_name, report in status.items():
+            if report["created"]:
+                print(f"🗂️ Created indexes on {collection_name}: {', '.join(report['created'])}")
+            for problem in ("missing", "conflicting", "extra"):
+                if report[problem]:
+                    print(f"⚠️ {collection_name} has {problem} indexes: {', '.join(report[problem])}")
+        return result
 
     @classmethod
     async def save_product(cls, product_data, collection_name="products"):
@@ -65,6 +320,12 @@ class Database:
         if "_id" in data_to_save:
             data_to_save["_id"] = str(data_to_save["_id"])
 
+        # Every product ingest also lands in the append-only price/review history
+        if collection_name == "products":
+            SnapshotStore.record(data_to_save)
+        if collection_name in INDEXED_COLLECTIONS:
+            ProductIndex.add(collection_name, [data_to_save])
+
         # Try Cloud
         if cls.db is not None:
             try:
@@ -73,72 +334,303 @@ class Database:
                     {"$set": data_to_save},
                     upsert=True
                 )
+                cls.breaker.record_success()
                 return "Saved to Cloud"
-            except:
-                pass # Fallback to local if cloud fails during write
+            except Exception as e:
+                cls._cloud_failed(e) # Fallback to local if cloud fails during write (replayed later)
         
         # Try Local
         if cls.local_db is not None:
-            table = cls.local_db.table(collection_name)
-            Product = Query()
-            table.upsert(data_to_save, (Product.title == data_to_save["title"]) & (Product.platform == data_to_save["platform"]))
+            cls.local_db.upsert(collection_name, data_to_save, journal=cls._journal())
             return "Saved to Local"
         
         return "Not Saved"
 
+    @classmethod
+    async def _cloud_bulk_write(cls, collection_name, docs, db=None, key=("title", "platform")):
+        """
+        One unordered bulk upsert on the `key` fields. Returns {"inserted", "updated"}, plus "errors"
+        and "failed" (positions in `docs` of the rejected writes) when some operations failed.
+        """
+        operations = []
+        for doc in docs:
+            # _id is immutable on existing documents, so it is only set when inserting
+            fields = {k: v for k, v in doc.items() if k != "_id"}
+            update = {"$set": fields}
+            if "_id" in doc:
+                update["$setOnInsert"] = {"_id": doc["_id"]}
+            operations.append(UpdateOne({k: doc[k] for k in key}, update, upsert=True))
+        try:
+            written = await (db if db is not None else cls.db)[collection_name].bulk_write(operations, ordered=False)
+            counts = {"inserted": written.upserted_count, "updated": written.matched_count}
+        except BulkWriteError as e:
+            # Unordered: everything but the failed operations was applied (and the server is reachable)
+            details = e.details
+            failed = sorted({error["index"] for error in details.get("writeErrors", [])})
+            counts = {"inserted": details.get("nUpserted", 0), "updated": details.get("nMatched", 0),
+                      "errors": len(failed), "failed": failed}
+        cls.breaker.record_success()
+        return counts
+
+    @classmethod
+    async def save_products_many(cls, products, collection_name="products", batch_size=BULK_BATCH_SIZE):
+        """
+        Bulk version of save_product: one `bulk_write` of upserts per batch on Cloud, one
+        transaction per batch on Local. A batch that can't reach the cloud falls back to Local as
+        a whole; documents the cloud rejects are written to Local (and journaled) on their own.
+        Returns one {"batch", "size", "target", "inserted", "updated", "rejected", "unsaved"} entry
+        per batch: "rejected" counts the cloud rejections, "unsaved" lists documents stored nowhere.
+        """
+        # Same cleaning as save_product; records without the upsert key are skipped
+        docs = []
+        for product in products:
+            if not product or "title" not in product or "platform" not in product:
+                continue
+            data_to_save = product.copy()
+            if "_id" in data_to_save:
+                data_to_save["_id"] = str(data_to_save["_id"])
+            docs.append(data_to_save)
+
+        if collection_name == "products":
+            SnapshotStore.record_many(docs)
+        if collection_name in INDEXED_COLLECTIONS:
+            ProductIndex.add(collection_name, docs)
+
+        results = []
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            result = {"batch": start // batch_size, "size": len(batch), "target": None, "inserted": 0, "updated": 0,
+                      "rejected": 0, "unsaved": []}
+            local = []
+
+            # Try Cloud
+            if cls.db is not None:
+                try:
+                    counts = await cls._cloud_bulk_write(collection_name, batch)
+                    local = [batch[i] for i in counts.pop("failed", [])]
+                    result.update(target="Cloud", rejected=len(local), **counts)
+                    if local:
+                        print(f"⚠️ Cloud rejected {len(local)} {collection_name} writes (batch {result['batch']}), "
+                              f"keeping them in Local for replay")
+                except Exception as e:
+                    print(f"⚠️ Cloud bulk write failed for {collection_name} (batch {result['batch']}): {e}")
+                    cls._cloud_failed(e)
+            if result["target"] is None:
+                local = batch
+
+            # Try Local (queued for replay to the cloud), like save_product's fallback
+            if local:
+                if cls.local_db is None:
+                    result["unsaved"] = local
+                elif result["target"] is None:
+                    result.update(target="Local", **cls.local_db.upsert_many(collection_name, local, journal=cls._journal()))
+                else:
+                    result["local"] = cls.local_db.upsert_many(collection_name, local, journal=cls._journal())
+
+            results.append(result)
+        return results
+
     @classmethod
     async def clear_collection(cls, collection_name):
         """Removes all items from a collection."""
+        ProductIndex.discard_source(collection_name)
         if cls.db is not None:
             try: await cls.db[collection_name].delete_many({})
             except: pass
         if cls.local_db is not None:
-            try: cls.local_db.table(collection_name).truncate()
+            try: cls.local_db.truncate(collection_name)
             except: pass
 
+    @staticmethod
+    def encode_page_token(backend, sort, cursor):
+        from bson import json_util
+        payload = json_util.dumps({"b": backend, "s": sort, "c": cursor})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def decode_page_token(token, backend, sort):
+        """Cursor inside a page token; tokens are only valid for the same backend and sort."""
+        from bson import json_util
+        try:
+            payload = json_util.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        except Exception:
+            raise ValueError("Malformed page token")
+        if payload.get("b") != backend or payload.get("s") != sort:
+            raise ValueError("Page token was issued for a different backend or sort order")
+        return payload["c"]
+
+    @staticmethod
+    def _as_list(value):
+        if value is None:
+            return None
+        return [value] if isinstance(value, str) else list(value)
+
+    @classmethod
+    def _cloud_query(cls, min_price, max_price, platforms, categories, keywords):
+        query = {}
+        if min_price is not None or max_price is not None:
+            query["price"] = {k: v for k, v in (("$gte", min_price), ("$lte", max_price)) if v is not None}
+        if platforms:
+            query["platform"] = {"$in": platforms}
+        if categories:
+            query["category"] = {"$in": categories}
+        if keywords:
+            query["title"] = {"$regex": "|".join(re.escape(k) for k in keywords), "$options": "i"}
+        return query
+
+    @staticmethod
+    def _cloud_after(field, descending, cursor):
+        """Keyset condition for rows after `cursor` ([sort value, _id]) in (field, _id ascending) order."""
+        from bson import ObjectId
+        value, last_id = cursor
+        # String _ids sort before ObjectIds and comparisons only match within one BSON type
+        after_id = {"_id": {"$gt": last_id}}
+        if not isinstance(last_id, ObjectId):
+            after_id = {"$or": [after_id, {"_id": {"$type": "objectId"}}]}
+        if field is None:
+            return after_id
+        tie = {"$and": [{field: value}, after_id]}
+        if value is None:
+            # Missing values sort lowest
+            return tie if descending else {"$or": [{field: {"$ne": None}}, tie]}
+        if descending:
+            return {"$or": [{field: {"$lt": value}}, {field: None}, tie]}
+        return {"$or": [{field: {"$gt": value}}, tie]}
+
     @classmethod
-    async def get_products(cls, collection_name="products"):
-        """Fetches products from either Cloud or Local."""
+    async def _scan(cls, collection_name="products", fields=None, min_price=None, max_price=None, platform=None,
+                    category=None, keywords=None, sort=None, limit=None, page_token=None):
+        """Yields (document, page token resuming after it) with every filter evaluated by the backend."""
+        descending = bool(sort) and sort.startswith("-")
+        field = sort.lstrip("-") if sort else None
+        fields = cls._as_list(fields)
+        for name in [*(fields or ()), *([field] if field else [])]:
+            if not FIELD_NAME.match(name):
+                raise ValueError(f"Invalid field name: {name!r}")
+        platforms, categories = cls._as_list(platform), cls._as_list(category)
+        keywords = [k for k in cls._as_list(keywords) or [] if k]
+        yielded = 0
+
         if cls.db is not None:
             try:
-                cursor = cls.db[collection_name].find({})
-                results = await cursor.to_list(length=1000)
-                # Convert ObjectId to string for JSON serialization
-                processed = []
-                for item in results:
-                    if item and isinstance(item, dict):
-                        if "_id" in item:
-                            item["_id"] = str(item["_id"])
-                        processed.append(item)
-                return processed
+                query = cls._cloud_query(min_price, max_price, platforms, categories, keywords)
+                if page_token:
+                    after = cls._cloud_after(field, descending, cls.decode_page_token(page_token, "cloud", sort))
+                    query = {"$and": [query, after]} if query else after
+                projection = None
+                if fields:
+                    projection = {f: 1 for f in fields}
+                    if field:
+                        projection[field] = 1
+                order = ([(field, -1 if descending else 1)] if field else []) + [("_id", 1)]
+                cursor = cls.db[collection_name].find(query, projection).sort(order)
+                if limit:
+                    cursor = cursor.limit(limit)
+                async for item in cursor:
+                    token = cls.encode_page_token("cloud", sort, [item.get(field) if field else None, item["_id"]])
+                    item["_id"] = str(item["_id"])
+                    if fields:
+                        item = {k: v for k, v in item.items() if k in fields}
+                    yielded += 1
+                    yield item, token
+                return
+            except ValueError:
+                raise
             except Exception as e:
+                cls._cloud_failed(e)
+                if yielded:
+                    raise
                 print(f"Cloud fetch error for {collection_name}: {e}")
-                pass
-        
+
         if cls.local_db is not None:
-            try:
-                return cls.local_db.table(collection_name).all()
-            except:
-                return []
-            
+            after = cls.decode_page_token(page_token, "local", sort) if page_token else None
+            while limit is None or yielded < limit:
+                size = LOCAL_PAGE_SIZE if limit is None else min(LOCAL_PAGE_SIZE, limit - yielded)
+                page = cls.local_db.query(
+                    collection_name, fields=fields, min_price=min_price, max_price=max_price, platforms=platforms,
+                    categories=categories, keywords=keywords, sort=field, descending=descending, after=after, limit=size,
+                )
+                for after, item in page:
+                    yielded += 1
+                    yield item, cls.encode_page_token("local", sort, after)
+                if len(page) < size:
+                    return
+
+    @classmethod
+    async def iter_products(cls, collection_name="products", **query):
+        """
+        Streams documents instead of materializing the collection. Filters (min_price/max_price,
+        platform, category, keywords: any of them in the title), `fields` projection, `sort`
+        ("pos_score" or "-pos_score") and `limit` are applied by Mongo or SQLite, not in Python.
+        """
+        async for item, _ in cls._scan(collection_name, **query):
+            yield item
+
+    @classmethod
+    async def get_products(cls, collection_name="products", **query):
+        """Fetches products from either Cloud or Local (same filters as iter_products)."""
+        return [item async for item in cls.iter_products(collection_name, **query)]
+
+    @classmethod
+    async def get_products_page(cls, collection_name="products", limit=50, page_token=None, **query):
+        """One page of results plus the token for the next one (None on the last page)."""
+        results, tokens = [], []
+        async for item, token in cls._scan(collection_name, limit=limit + 1, page_token=page_token, **query):
+            results.append(item)
+            tokens.append(token)
+        has_more = len(results) > limit
+        return {"results": results[:limit], "next_token": tokens[limit - 1] if has_more else None}
+
     @classmethod
     async def save_metadata(cls, key, value):
         """Saves a system-level metadata entry."""
         data = {"key": key, "value": value, "updated_at": datetime.now().isoformat()}
         if cls.db is not None:
-            await cls.db["system_metadata"].update_one({"key": key}, {"$set": data}, upsert=True)
+            try:
+                await cls.db["system_metadata"].update_one({"key": key}, {"$set": data}, upsert=True)
+            except Exception as e:
+                cls._cloud_failed(e)
         if cls.local_db is not None:
-            table = cls.local_db.table("system_metadata")
-            table.upsert(data, Query().key == key)
+            cls.local_db.set_metadata(key, data)
 
     @classmethod
     async def get_metadata(cls, key):
         """Retrieves a system-level metadata entry."""
         if cls.db is not None:
-            doc = await cls.db["system_metadata"].find_one({"key": key})
-            if doc: return doc.get("value")
+            try:
+                doc = await cls.db["system_metadata"].find_one({"key": key})
+                if doc: return doc.get("value")
+            except Exception as e:
+                cls._cloud_failed(e)
         if cls.local_db is not None:
-            table = cls.local_db.table("system_metadata")
-            res = table.get(Query().key == key)
+            res = cls.local_db.get_metadata(key)
             if res: return res.get("value")
         return None
+
+    @classmethod
+    async def find_product(cls, product_id, collection_name="products"):
+        """Looks a product up by its `id` or `_id` (indexed locally)."""
+        if cls.db is not None:
+            try:
+                from bson import ObjectId
+                query = {"$or": [{"id": product_id}, {"_id": product_id}]}
+                if ObjectId.is_valid(product_id):
+                    query["$or"].append({"_id": ObjectId(product_id)})
+                doc = await cls.db[collection_name].find_one(query)
+                if doc:
+                    doc["_id"] = str(doc["_id"])
+                    return doc
+            except Exception as e:
+                cls._cloud_failed(e)
+                print(f"Cloud lookup error for {collection_name}: {e}")
+        if cls.local_db is not None:
+            return cls.local_db.find(collection_name, product_id)
+        return None
+
+    @classmethod
+    async def remove_product(cls, product_id, collection_name="products"):
+        """Removes a document by its `id` or `_id` from the local store."""
+        ProductIndex.discard(collection_name, product_ids=[product_id])
+        if cls.local_db is not None:
+            return cls.local_db.remove(collection_name, product_id)
+        return 0
@@ -0,0 +1,213 @@
+import hashlib
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import date, datetime
+
+import numpy as np
+
+from backend.normalize import product_key
+from backend.snapshot_store import SnapshotStore
+
+@lru_cache(maxsize=64)
+def _day_labels(last_day: int, days: int, horizon: int):
+    """'Oct 17'-style chart labels from `days` before `last_day` (inclusive) to `horizon` after it."""
+    return tuple(date.fromordinal(last_day + offset).strftime("%b %d") for offset in range(1 - days, horizon + 1))
+
+class Forecaster:
+    """
+    Batch demand forecaster (Holt's linear exponential smoothing: level + trend).
+    Many product histories are fitted at once with NumPy (one vector step per day across
+    all series), the fitted state is cached per product, and a new observation advances
+    that state by one smoothing step instead of refitting from scratch.
+
+    Models are fitted on the review snapshots recorded by SnapshotStore (one point per day).
+    Only a product without enough recorded days gets a history seeded deterministically from
+    the product key and anchored on its review-velocity sales estimate, so charts are stable
+    across refreshes and real observations continue on the same scale.
+    """
+    alpha: float = float(os.getenv("FORECAST_ALPHA", "0.5"))    # level smoothing
+    beta: float = float(os.getenv("FORECAST_BETA", "0.1"))      # trend smoothing
+    history_days: int = int(os.getenv("FORECAST_HISTORY_DAYS", "30"))
+    max_entries: int = int(os.getenv("FORECAST_CACHE_ENTRIES", "20000"))
+    min_observed_days: int = int(os.getenv("FORECAST_MIN_OBSERVED_DAYS", "2"))
+
+    # key -> {"level", "trend", "n", "sse", "history": recent values, "last_day": date ordinal}
+    _models: OrderedDict = OrderedDict()
+    stats: dict = {"hits": 0, "fitted": 0, "batch_fits": 0, "updates": 0, "evictions": 0,
+                   "observed": 0, "seeded": 0}
+
+    product_key = staticmethod(product_key)
+
+    @staticmethod
+    def daily_sales_anchor(reviews) -> float:
+        """Daily sales implied by the review-velocity method (1 review ~ 40 sales, see MLEngine.estimate_sales)."""
+        return max(float(reviews or 0) * 40 / 12 / 30, 5.0)
+
+    @staticmethod
+    def seed_histories(keys, anchors, days):
+        """Deterministic per-key histories (N x days): a daily growth trend plus noise, ending on the anchor."""
+        drift = np.empty((len(keys), 1))
+        noise = np.empty((len(keys), days))
+        for row, key in enumerate(keys):
+            seed = int(hashlib.md5(str(key).encode()).hexdigest()[:16], 16)
+            rng = np.random.default_rng(seed)
+            drift[row] = rng.uniform(-0.003, 0.008)  # Slight upward trend usually (-9% to +24% a month)
+            noise[row] = rng.uniform(0.02, 0.08) * rng.standard_normal(days)
+        noise[:, -1] = 0  # the latest point is the anchor itself
+        days_before_last = np.arange(days - 1, -1, -1)
+        return np.maximum(np.asarray(anchors, dtype=float)[:, None] * np.exp(noise - drift * days_before_last), 1.0)
+
+    @classmethod
+    def observed_history(cls, key, days):
+        """
+        Daily sales series from the product's recorded snapshots: the last review count of each day
+        through `daily_sales_anchor`, days without a snapshot carrying the previous value forward.
+        Returns (values, last day ordinal), or None with fewer than `min_observed_days` recorded days.
+        """
+        first_day = date.fromordinal(date.today().toordinal() - days + 1)
+        start = datetime(first_day.year, first_day.month, first_day.day).timestamp()
+        snapshots = SnapshotStore.history(key, start=start)
+        reviews_by_day = {}
+        for ts, reviews in zip(snapshots["ts"], snapshots["reviews"]):
+            reviews_by_day[date.fromtimestamp(ts).toordinal()] = reviews
+        if len(reviews_by_day) < cls.min_observed_days:
+            return None
+        values, reviews = [], None
+        for day in range(min(reviews_by_day), max(reviews_by_day) + 1):
+            reviews = reviews_by_day.get(day, reviews)
+            values.append(cls.daily_sales_anchor(reviews))
+        return values, max(reviews_by_day)
+
+    @classmethod
+    def fit_many(cls, histories):
+        """Fits Holt's level/trend for every row of an N x T array in one vectorized pass."""
+        y = np.asarray(histories, dtype=float)
+        level = y[:, 0].copy()
+        trend = y[:, 1] - y[:, 0] if y.shape[1] > 1 else np.zeros(len(y))
+        sse = np.zeros(len(y))
+        for t in range(1, y.shape[1]):
+            predicted = level + trend
+            sse += (y[:, t] - predicted) ** 2
+            new_level = cls.alpha * y[:, t] + (1 - cls.alpha) * predicted
+            trend = cls.beta * (new_level - level) + (1 - cls.beta) * trend
+            level = new_level
+        cls.stats["batch_fits"] += 1
+        cls.stats["fitted"] += len(y)
+        return level, trend, sse
+
+    @classmethod
+    def _remember(cls, key, model):
+        cls._models[key] = model
+        cls._models.move_to_end(key)
+        while len(cls._models) > cls.max_entries:
+            cls._models.popitem(last=False)
+            cls.stats["evictions"] += 1
+
+    @classmethod
+    def ensure(cls, keys, anchors):
+        """
+        Cached models for the keys. The missing ones are fitted from their recorded history,
+        grouped by length so each group is one batch; the rest are seeded and fitted in one batch.
+        """
+        missing = [(k, a) for k, a in zip(keys, anchors) if k not in cls._models]
+        cls.stats["hits"] += len(keys) - len(missing)
+        if missing:
+            # Duplicate keys in one batch share a model
+            missing = dict(missing)
+            by_length = {}
+            for key in list(missing):
+                observed = cls.observed_history(key, cls.history_days)
+                if observed is not None:
+                    del missing[key]
+                    by_length.setdefault(len(observed[0]), []).append((key, observed))
+            for group in by_length.values():
+                cls._fit_and_remember([k for k, _ in group], np.array([values for _, (values, _) in group]),
+                                      [last_day for _, (_, last_day) in group])
+                cls.stats["observed"] += len(group)
+            if missing:
+                # Fallback: no recorded history yet
+                histories = cls.seed_histories(list(missing), list(missing.values()), cls.history_days)
+                cls._fit_and_remember(list(missing), histories, [date.today().toordinal() - 1] * len(missing))
+                cls.stats["seeded"] += len(missing)
+        return [cls._models[k] for k in keys]
+
+    @classmethod
+    def _fit_and_remember(cls, keys, histories, last_days):
+        level, trend, sse = cls.fit_many(histories)
+        for row, key in enumerate(keys):
+            cls._remember(key, {
+                "level": float(level[row]),
+                "trend": float(trend[row]),
+                "n": histories.shape[1],
+                "sse": float(sse[row]),
+                "history": [round(v) for v in histories[row].tolist()],
+                "last_day": last_days[row],
+            })
+
+    @classmethod
+    def observe(cls, key, value, day: date = None):
+        """
+        Folds a new daily observation into the cached model with one Holt step.
+        Re-observing the same (or an older) day is ignored.
+        """
+        model = cls._models.get(key)
+        day = (day or date.today()).toordinal()
+        if model is None or day <= model["last_day"]:
+            return model
+
+        predicted = model["level"] + model["trend"]
+        level = cls.alpha * value + (1 - cls.alpha) * predicted
+        model["trend"] = cls.beta * (level - model["level"]) + (1 - cls.beta) * model["trend"]
+        model["level"] = level
+        model["sse"] += (value - predicted) ** 2
+        model["n"] += 1
+        model["history"] = (model["history"] + [round(value)])[-cls.history_days:]
+        model["last_day"] = day
+        cls._models.move_to_end(key)
+        cls.stats["updates"] += 1
+        return model
+
+    @staticmethod
+    def summary(model):
+        """Growth/confidence in the same shape (and bounds) as MLEngine.get_forecast."""
+        level = max(model["level"], 1e-9)
+        growth = max(min(model["trend"] * 30 / level * 100, 45), -15)
+        # More data = more confidence, a poor fit costs some of it
+        relative_error = (model["sse"] / max(model["n"] - 1, 1)) ** 0.5 / level
+        confidence = 70 + min(model["n"] * 2, 25) - min(int(relative_error * 20), 15)
+        return {
+            "monthly_growth_prediction": ("+" if growth >= 0 else "") + f"{growth:.1f}%",
+            "confidence_score": f"{confidence}%"
+        }
+
+    @staticmethod
+    def trend_points(model, days, horizon):
+        """Chart series: the last `days` observed values followed by a `horizon`-day forecast."""
+        history = model["history"][-days:]
+        labels = _day_labels(model["last_day"], len(history), horizon)
+        points = [{"name": name, "sales": v, "is_forecast": False} for name, v in zip(labels, history)]
+        for h, name in enumerate(labels[len(history):], start=1):
+            points.append({
+                "name": name,
+                "sales": max(round(model["level"] + h * model["trend"]), 1),
+                "is_forecast": True
+            })
+        return points
+
+    @classmethod
+    def forecast_many(cls, keys, reviews, days=10, horizon=4):
+        """
+        (salesTrend, forecast summary) for each product. Uncached products are fitted in one
+        batch; today's review-velocity estimate is folded in as the day's observation.
+        """
+        anchors = [cls.daily_sales_anchor(r) for r in reviews]
+        models = cls.ensure(keys, anchors)
+        for key, anchor in zip(keys, anchors):
+            cls.observe(key, anchor)
+        return [(cls.trend_points(m, days, horizon), cls.summary(m)) for m in models]
+
+    @classmethod
+    def get_stats(cls):
+        return {**cls.stats, "models": len(cls._models), "max_entries": cls.max_entries,
+                "alpha": cls.alpha, "beta": cls.beta}
@@ -0,0 +1,339 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", "backend/data/local_storage.db")
+# The TinyDB file the local fallback used before (imported once on first start)
+LEGACY_TINYDB_PATH = "backend/data/local_storage.json"
+# TinyDB tables that belong to the Database API (search_cache is owned by SearchCache)
+LEGACY_TABLES = ("products", "emerging_trends", "watchlist")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    title TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    doc_id TEXT,
+    oid TEXT,
+    doc TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_key ON documents (collection, title, platform);
+CREATE INDEX IF NOT EXISTS idx_documents_id ON documents (collection, doc_id);
+CREATE INDEX IF NOT EXISTS idx_documents_oid ON documents (collection, oid);
+CREATE INDEX IF NOT EXISTS idx_documents_updated ON documents (collection, updated_at);
+CREATE TABLE IF NOT EXISTS system_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS pending_sync (
+    rowid INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    title TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    queued_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pending_sync_key ON pending_sync (collection, title, platform);
+"""
+
+UPSERT_SQL = (
+    "INSERT INTO documents (collection, title, platform, doc_id, oid, doc, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (collection, title, platform) DO UPDATE SET "
+    "doc_id=excluded.doc_id, oid=excluded.oid, doc=excluded.doc, updated_at=excluded.updated_at"
+)
+
+# Field names are interpolated into JSON paths, so only plain identifiers are accepted
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+# Missing sort values order first (like null in Mongo) and numbers before text
+NULL_SORT_VALUE = -1e308
+
+def _like(keyword: str) -> str:
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+class LocalStore:
+    """
+    SQLite (WAL mode) local storage behind the Database API.
+    Documents are stored as JSON with indexed columns for the (title, platform) upsert key and
+    the product id, so upserts and id lookups are B-tree operations instead of rewriting and
+    scanning a whole JSON file. WAL lets other processes (scripts, workers) read concurrently.
+    """
+    _shared: dict = {}  # path -> the process-wide store
+
+    @classmethod
+    def shared(cls, path: str = LOCAL_DB_PATH):
+        """The one connection per process for a database file (API, scripts and workers share it)."""
+        if path not in cls._shared:
+            cls._shared[path] = cls(path)
+        return cls._shared[path]
+
+    def __init__(self, path: str = LOCAL_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _ids(doc):
+        doc_id, oid = doc.get("id"), doc.get("_id")
+        return (str(doc_id) if doc_id is not None else None), (str(oid) if oid is not None else None)
+
+    def _row(self, key, doc):
+        return (*key, *self._ids(doc), json.dumps(doc, default=str), datetime.now().isoformat())
+
+    def upsert(self, collection: str, doc: dict, journal: bool = False):
+        """Insert or merge (like Mongo's $set) the document with the same title + platform."""
+        self.upsert_many(collection, [doc], journal)
+
+    def upsert_many(self, collection: str, docs, journal: bool = False):
+        """
+        `upsert` for a batch of documents in one transaction (one fsync instead of one per
+        document). With `journal`, the keys are also queued (same transaction) for replay to
+        the cloud. Returns {"inserted", "updated"} counts.
+        """
+        merged = {}
+        for doc in docs:
+            key = (collection, str(doc.get("title", "")), str(doc.get("platform", "")))
+            # Repeats of a key within the batch merge in order, as sequential upserts would
+            merged[key] = {**merged[key], **doc} if key in merged else doc
+
+        counts = {"inserted": 0, "updated": 0}
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                for key, doc in merged.items():
+                    row = self.conn.execute(
+                        "SELECT doc FROM documents WHERE collection=? AND title=? AND platform=?", key
+                    ).fetchone()
+                    counts["updated" if row else "inserted"] += 1
+                    rows.append(self._row(key, {**json.loads(row[0]), **doc} if row else doc))
+                self.conn.executemany(UPSERT_SQL, rows)
+                if journal:
+                    # REPLACE gives a re-queued key a new rowid, so a replay in progress won't clear it
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO pending_sync (collection, title, platform, queued_at) VALUES (?, ?, ?, ?)",
+                        [(*key, datetime.now().isoformat()) for key in merged],
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return counts
+
+    def pending(self, limit: int = 500, after: int = 0):
+        """Oldest queued cloud writes after rowid `after`: [(rowid, collection, title, platform)]."""
+        return self.conn.execute(
+            "SELECT rowid, collection, title, platform FROM pending_sync WHERE rowid>? ORDER BY rowid LIMIT ?",
+            (after, limit),
+        ).fetchall()
+
+    def pending_docs(self, rows):
+        """Current documents for pending rows: {collection: [(rowid, doc)]} (doc is None once deleted)."""
+        grouped = {}
+        for rowid, collection, title, platform in rows:
+            grouped.setdefault(collection, []).append((rowid, self.get(collection, title, platform)))
+        return grouped
+
+    def clear_pending(self, rowids):
+        if not rowids:
+            return
+        with self._lock:
+            self.conn.execute(f"DELETE FROM pending_sync WHERE rowid IN ({', '.join('?' * len(rowids))})", list(rowids))
+
+    def pending_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pending_sync").fetchone()[0]
+
+    def all(self, collection: str):
+        rows = self.conn.execute("SELECT doc FROM documents WHERE collection=? ORDER BY rowid", (collection,))
+        return [json.loads(doc) for (doc,) in rows]
+
+    def query(self, collection: str, fields=None, min_price=None, max_price=None, platforms=None,
+              categories=None, keywords=None, sort=None, descending=False, after=None, limit=500):
+        """
+        One page of a filtered read, evaluated inside SQLite: price range, platform, category and
+        title keywords (any, case-insensitive) become WHERE clauses, `sort` a JSON field ORDER BY
+        (rowid breaks ties) and `after` a keyset cursor. `fields` extracts only those JSON fields.
+        Returns [(cursor, doc)], where cursor = [sort value, rowid] resumes after that row.
+        """
+        for name in [*(fields or ()), *([sort] if sort else [])]:
+            if not FIELD_NAME.match(name):
+                raise ValueError(f"Invalid field name: {name!r}")
+
+        clauses, params = ["collection=?"], [collection]
+        if min_price is not None:
+            clauses.append("json_extract(doc, '$.price') >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("json_extract(doc, '$.price') <= ?")
+            params.append(max_price)
+        if platforms:
+            clauses.append(f"platform IN ({', '.join('?' * len(platforms))})")
+            params.extend(platforms)
+        if categories:
+            clauses.append(f"json_extract(doc, '$.category') IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        if keywords:
+            clauses.append("(" + " OR ".join("title LIKE ? ESCAPE '\\'" for _ in keywords) + ")")
+            params.extend(_like(k) for k in keywords)
+
+        sort_key = f"IFNULL(json_extract(doc, '$.{sort}'), {NULL_SORT_VALUE})" if sort else "NULL"
+        if after is not None:
+            value, rowid = after
+            if sort:
+                value = NULL_SORT_VALUE if value is None else value
+                clauses.append(f"({sort_key} {'<' if descending else '>'} ? OR ({sort_key} = ? AND rowid > ?))")
+                params.extend((value, value, rowid))
+            else:
+                clauses.append("rowid > ?")
+                params.append(rowid)
+
+        columns = ", ".join(["doc -> ?"] * len(fields)) if fields else "doc"
+        order = f"{sort_key} {'DESC' if descending else 'ASC'}, rowid" if sort else "rowid"
+        rows = self.conn.execute(
+            f"SELECT rowid, {sort_key}, {columns} FROM documents WHERE {' AND '.join(clauses)} ORDER BY {order} LIMIT ?",
+            [*(f"$.{f}" for f in fields or ()), *params, limit],
+        ).fetchall()
+
+        page = []
+        for rowid, value, *values in rows:
+            if fields:
+                doc = {f: json.loads(v) for f, v in zip(fields, values) if v is not None}
+            else:
+                doc = json.loads(values[0])
+            page.append(([None if value == NULL_SORT_VALUE else value, rowid], doc))
+        return page
+
+    def scan(self, collection: str, after=("", 0), limit: int = 500):
+        """
+        [((updated_at, rowid), doc)] in write order after the `after` position (keyset paging for
+        exports and migrations). An upsert moves its document to the end, so paging on from a
+        saved position also returns the documents changed since.
+        """
+        updated_at, rowid = after
+        rows = self.conn.execute(
+            "SELECT updated_at, rowid, doc FROM documents WHERE collection=? AND (updated_at>? OR (updated_at=? AND rowid>?)) "
+            "ORDER BY updated_at, rowid LIMIT ?",
+            (collection, updated_at, updated_at, rowid, limit),
+        )
+        return [((updated_at, rowid), json.loads(doc)) for updated_at, rowid, doc in rows]
+
+    def get(self, collection: str, title: str, platform: str):
+        """Document with this title + platform, else None."""
+        row = self.conn.execute(
+            "SELECT doc FROM documents WHERE collection=? AND title=? AND platform=?", (collection, title, platform)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, collection: str, product_id: str):
+        """Document whose `id` or `_id` equals product_id (index lookup), else None."""
+        row = self.conn.execute(
+            "SELECT doc FROM documents WHERE collection=? AND doc_id=? "
+            "UNION ALL SELECT doc FROM documents WHERE collection=? AND oid=? LIMIT 1",
+            (collection, str(product_id), collection, str(product_id)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def remove(self, collection: str, product_id: str):
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM documents WHERE collection=? AND (doc_id=? OR oid=?)",
+                (collection, str(product_id), str(product_id)),
+            )
+        return cursor.rowcount
+
+    def truncate(self, collection: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM documents WHERE collection=?", (collection,))
+
+    def count(self, collection: str):
+        return self.conn.execute("SELECT COUNT(*) FROM documents WHERE collection=?", (collection,)).fetchone()[0]
+
+    def indexes(self):
+        """{index name: CREATE statement} for the local tables."""
+        rows = self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL")
+        return dict(rows.fetchall())
+
+    def set_metadata(self, key: str, data: dict):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO system_metadata (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
+                (key, json.dumps(data.get("value"), default=str), data.get("updated_at")),
+            )
+
+    def get_metadata(self, key: str):
+        """The metadata entry ({"key", "value", "updated_at"}) or None."""
+        row = self.conn.execute("SELECT value, updated_at FROM system_metadata WHERE key=?", (key,)).fetchone()
+        return {"key": key, "value": json.loads(row[0]), "updated_at": row[1]} if row else None
+
+    def scan_metadata(self, after=("", 0), limit: int = 500):
+        """`scan` for the metadata entries: [((updated_at, rowid), {"key", "value", "updated_at"})]."""
+        updated_at, rowid = after
+        rows = self.conn.execute(
+            "SELECT IFNULL(updated_at, ''), rowid, key, value, updated_at FROM system_metadata "
+            "WHERE IFNULL(updated_at, '')>? OR (IFNULL(updated_at, '')=? AND rowid>?) "
+            "ORDER BY IFNULL(updated_at, ''), rowid LIMIT ?",
+            (updated_at, updated_at, rowid, limit),
+        )
+        return [((position, rowid), {"key": key, "value": json.loads(value), "updated_at": updated_at})
+                for position, rowid, key, value, updated_at in rows]
+
+    def count_metadata(self):
+        return self.conn.execute("SELECT COUNT(*) FROM system_metadata").fetchone()[0]
+
+    def import_tinydb(self, path: str = LEGACY_TINYDB_PATH, force: bool = False):
+        """
+        One-shot import of the legacy TinyDB file (products, trends, watchlist, metadata).
+        Runs in a single transaction and is skipped once done unless `force` is set.
+        Returns {table: imported count}.
+        """
+        if not force and self.get_metadata("tinydb_imported_at"):
+            return {}
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+
+        imported = {}
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in LEGACY_TABLES:
+                    docs = list((legacy.get(table) or {}).values())
+                    # Later duplicates of a title + platform win, as with TinyDB's upsert
+                    self.conn.executemany(
+                        UPSERT_SQL,
+                        [self._row((table, str(d.get("title", "")), str(d.get("platform", ""))), d) for d in docs],
+                    )
+                    imported[table] = len(docs)
+
+                metadata = list((legacy.get("system_metadata") or {}).values())
+                self.conn.executemany(
+                    "INSERT INTO system_metadata (key, value, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
+                    [(m["key"], json.dumps(m.get("value"), default=str), m.get("updated_at")) for m in metadata if "key" in m],
+                )
+                imported["system_metadata"] = len(metadata)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO system_metadata (key, value, updated_at) VALUES (?, ?, ?)",
+                    ("tinydb_imported_at", json.dumps(datetime.now().isoformat()), datetime.now().isoformat()),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return imported
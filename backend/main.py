@@ -3,13 +3,27 @@ import sys
 import json
 import os
 import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import FastAPI, Query as FastAPIQuery, BackgroundTasks, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from backend.database import Database
 from backend.ml_engine import MLEngine
+from backend.normalize import normalize_record, parse_price, parse_reviews
 from backend.seeder import sync_colab_data
+from backend.search_cache import SearchCache
+from backend.sentiment_cache import SentimentCache
+from backend.forecaster import Forecaster
+from backend.snapshot_store import SnapshotStore
+from backend.write_behind import WriteBehind
+from backend.shared_storage import LocalStorage
+from backend.product_index import ProductIndex
+from backend.singleflight import SingleFlight
+from backend.browser_pool import BrowserPool
+from backend.scrape_readiness import get_readiness_stats
+from backend.daraz_scraper import scrape_daraz_page, scrape_daraz_http, close_http_client
+from backend.markaz_scraper import scrape_markaz_page
+from backend.serp_scraper import scrape_serp
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from fastapi.responses import StreamingResponse
@@ -41,8 +55,21 @@ app.add_middleware(
 async def startup_event():
     """Initialize Auto-Pilot Background Tasks."""
     print("🚀 PakPick AI Auto-Pilot: Initializing...")
-    # Attempt DB connection
-    await Database.connect_db()
+    # Attempt DB connection (Atlas is probed in the background, startup serves from Local until it answers)
+    await Database.connect_db(wait=False)
+    Database.start_health_monitor()
+
+    # Pre-load recent searches so the first cache hits skip the disk tier
+    try:
+        print(f"📦 Search Cache: {SearchCache.warm()} entries warmed")
+    except Exception as e:
+        print(f"⚠️ Search Cache Warm-up Error: {e}")
+    print(f"🧠 Sentiment Cache: {SentimentCache.load()} titles loaded")
+    # Single background writer for scored products
+    WriteBehind.start()
+
+    # Pre-warm the shared Chromium pool in the background (scrapers use subprocesses until it's up)
+    asyncio.create_task(BrowserPool.start())
 
     # Sync initial data from colab_data.json if needed
     asyncio.create_task(sync_colab_data())
@@ -59,54 +86,20 @@ async def startup_event():
     scheduler.start()
     print("⏰ PakPick AI: Nightly Scheduler active (3:00 AM)")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await BrowserPool.stop()
+    await close_http_client()
+    await WriteBehind.stop()
+    await Database.close()
+    SentimentCache.save()
+    SnapshotStore.flush()
+    LocalStorage.close()
+
 # Removed obsolete autopilot_scheduler in favor of APScheduler
 
 # --- UTILS ---
-def generate_trend_data(seed_id, days=20, forecast_days=7):
-    """
-    Generates deterministic historical data followed by a forecast.
-    Uses the product ID/Title hash to ensure the graph doesn't change on refresh.
-    """
-    import hashlib
-    h = int(hashlib.md5(str(seed_id).encode()).hexdigest(), 16)
-    random_gen = random.Random(h)
-    
-    base = datetime.now()
-    results = []
-    
-    # Starting point for sales
-    base_sales = random_gen.randint(10, 50)
-    volatility = random_gen.uniform(0.1, 0.4)
-    trend_slope = random_gen.uniform(-0.5, 1.5) # Slight upward trend usually
-    
-    # 1. Historical Data
-    current_val = base_sales
-    for i in range(days):
-        date = base - timedelta(days=days-i)
-        # Random walk with a trend
-        change = current_val * volatility * (random_gen.random() - 0.5) + trend_slope
-        current_val = max(5, int(current_val + change))
-        results.append({
-            "name": date.strftime("%b %d"),
-            "sales": current_val,
-            "is_forecast": False
-        })
-        
-    # 2. Predicted Forecast
-    for i in range(1, forecast_days + 1):
-        date = base + timedelta(days=i)
-        # Use simple exponential smoothing or extension of trend
-        change = current_val * (volatility/2) * (random_gen.random() - 0.4) + (trend_slope * 1.5)
-        current_val = max(5, int(current_val + change))
-        results.append({
-            "name": date.strftime("%b %d"),
-            "sales": current_val,
-            "is_forecast": True
-        })
-        
-    return results
-
-async def run_scraper_script(script_name: str, keyword: str):
+async def run_scraper_script(script_name: str, keyword: str, *flags: str):
     import subprocess
     abs_path = os.path.abspath(script_name)
     if not os.path.exists(abs_path):
@@ -115,7 +108,7 @@ async def run_scraper_script(script_name: str, keyword: str):
     def execute():
         # Added a 35s timeout to the subprocess itself
         try:
-            result = subprocess.run([sys.executable, abs_path, keyword], capture_output=True, text=True, timeout=35)
+            result = subprocess.run([sys.executable, abs_path, keyword, *flags], capture_output=True, text=True, timeout=35)
             return result
         except subprocess.TimeoutExpired:
             return None
@@ -128,14 +121,94 @@ async def run_scraper_script(script_name: str, keyword: str):
         print(f"Scraper Error ({script_name}): {e}")
     return []
 
+# Live engines fired for every search (name -> standalone scraper script)
+SCRAPER_SCRIPTS = {
+    "daraz": "backend/daraz_scraper.py",
+    "markaz": "backend/markaz_scraper.py",
+    "serp": "backend/serp_scraper.py",
+}
+
+# In-process scrapers served by the shared browser pool (the scripts above remain the fallback)
+POOLED_SCRAPERS = {
+    "daraz": scrape_daraz_page,
+    "markaz": scrape_markaz_page,
+}
+
+# Browser-free fast paths, tried first; the browser is only used when they come back empty
+HTTP_FAST_PATHS = {
+    "daraz": scrape_daraz_http,
+}
+
+# Engines that never need a browser run directly on the event loop (no subprocess)
+IN_PROCESS_SCRAPERS = {
+    "serp": scrape_serp,
+}
+
+# Which path served each engine's requests (http / pool / subprocess / failed)
+engine_path_stats = {engine: {} for engine in SCRAPER_SCRIPTS}
+
+def record_engine_path(engine: str, path: str):
+    engine_path_stats[engine][path] = engine_path_stats[engine].get(path, 0) + 1
+
+async def run_engine(engine: str, keyword: str):
+    """Runs one engine: in-process / HTTP fast path, then a pooled browser page, then the subprocess script."""
+    if engine in IN_PROCESS_SCRAPERS:
+        try:
+            results = await asyncio.wait_for(IN_PROCESS_SCRAPERS[engine](keyword), timeout=35)
+        except Exception as e:
+            print(f"Scraper Error ({engine}): {e}")
+            results = []
+        record_engine_path(engine, "in_process" if results else "failed")
+        return results
+
+    if engine in HTTP_FAST_PATHS:
+        try:
+            results = await HTTP_FAST_PATHS[engine](keyword)
+            if results:
+                print(f"⚡ {engine} served over HTTP fast path ({len(results)} items)")
+                record_engine_path(engine, "http")
+                return results
+        except Exception as e:
+            print(f"Fast Path Error ({engine}): {e}")
+
+    if engine in POOLED_SCRAPERS and BrowserPool.is_running():
+        try:
+            async with BrowserPool.page() as page:
+                results = await asyncio.wait_for(POOLED_SCRAPERS[engine](page, keyword), timeout=35)
+            record_engine_path(engine, "pool" if results else "failed")
+            return results
+        except asyncio.TimeoutError:
+            print(f"Scraper Timeout ({engine}): {keyword}")
+        except Exception as e:
+            print(f"Scraper Error ({engine}): {e}")
+        record_engine_path(engine, "failed")
+        return []
+
+    # The script's own HTTP fast path was just tried above: go straight to its browser
+    flags = ("--no-http",) if engine in HTTP_FAST_PATHS else ()
+    results = await run_scraper_script(SCRAPER_SCRIPTS[engine], keyword, *flags)
+    record_engine_path(engine, "subprocess" if results else "failed")
+    return results
+
 # --- ENDPOINTS ---
 @app.get("/")
 async def root():
     return {"status": "PakPick AI is Live", "database": Database.mode}
 
-@app.get("/search")
-async def search(q: str = FastAPIQuery(..., description="Search keyword")):
-    print(f"🔍 Incoming Search Request: {q}")
+# Latency budget for the live scrape stage (seconds). Engines still running when their budget
+# expires are reported as pending and merged into the cache once they finish.
+SEARCH_BUDGET_SECONDS = float(os.getenv("SEARCH_BUDGET_SECONDS", "25"))
+# Upper bound for a caller-supplied ?budget= (engines time out after 35s anyway)
+SEARCH_MAX_BUDGET_SECONDS = float(os.getenv("SEARCH_MAX_BUDGET_SECONDS", "60"))
+SOURCE_BUDGETS = {
+    engine: float(os.getenv(f"SEARCH_BUDGET_{engine.upper()}", SEARCH_BUDGET_SECONDS))
+    for engine in SCRAPER_SCRIPTS
+}
+# Stop waiting once this many scored items are in (0 disables the early exit)
+SEARCH_ENOUGH_RESULTS = int(os.getenv("SEARCH_ENOUGH_RESULTS", "15"))
+
+def get_cached_response(q: str):
+    """Exhibition data or a search cache hit for the query, else None."""
     q_clean = q.lower().strip()
     
     # --- STEP 0: EXHIBITION MODE (Presentation Reliability) ---
@@ -156,110 +229,270 @@ async def search(q: str = FastAPIQuery(..., description="Search keyword")):
     except Exception as e:
         print(f"⚠️ Exhibition Mode Error: {e}")
 
-    # 1. IMMEDIATE CACHE CHECK (0.1 seconds)
+    # 1. IMMEDIATE CACHE CHECK (In-process LRU, then persistent tier)
     try:
-        if os.path.exists('backend/data/local_storage.json'):
-            from tinydb import TinyDB
-            db = TinyDB('backend/data/local_storage.json')
-            cached_entry = next((item for item in db.table("search_cache").all() if item.get('q') == q.lower()), None)
-            db.close()
-            
-            if cached_entry:
-                print(f"📦 Cache Hit: {q}")
-                return {"query": q, "results": cached_entry["results"], "source": "Verified Research Data", "is_cached": True}
+        cached_entry = SearchCache.get(q)
+        if cached_entry:
+            is_stale = SearchCache.is_stale(cached_entry)
+            print(f"📦 Cache Hit: {q}" + (" (stale, revalidating)" if is_stale else ""))
+            if is_stale:
+                schedule_revalidation(q)
+            response = {
+                "query": q,
+                "results": cached_entry["results"],
+                "source": "Verified Research Data",
+                "is_cached": True,
+                "is_stale": is_stale,
+                "cache_age_seconds": int(SearchCache.age(cached_entry))
+            }
+            if cached_entry.get("market"):
+                response["competition_score"] = cached_entry["market"]["competition_score"]
+                response["market"] = cached_entry["market"]
+            return response
     except Exception as cache_err:
         print(f"❌ Cache Error: {cache_err}")
+    return None
+
+@app.get("/search")
+async def search(q: str = FastAPIQuery(..., description="Search keyword"),
+                 budget: float = FastAPIQuery(None, gt=0, le=SEARCH_MAX_BUDGET_SECONDS, description="Scrape budget (seconds)")):
+    print(f"🔍 Incoming Search Request: {q}")
+    cached = get_cached_response(q)
+    if cached:
+        return cached
+    return await live_search(q, budget=budget)
+
+@app.get("/search/stream")
+async def search_stream(q: str = FastAPIQuery(..., description="Search keyword"),
+                        budget: float = FastAPIQuery(None, gt=0, le=SEARCH_MAX_BUDGET_SECONDS, description="Scrape budget (seconds)")):
+    """
+    Streaming variant of /search (NDJSON). Emits one `results` frame per engine as soon as
+    that engine finishes, then a final `summary` frame with the competition score.
+    """
+    print(f"🔍 Incoming Streaming Search Request: {q}")
 
-    # 2. OPTIMIZED LIVE SCRAPE (Race condition / Parallel)
+    def frame(data):
+        return json.dumps(data, default=str) + "\n"
+
+    async def frames():
+        cached = get_cached_response(q)
+        if cached:
+            results = cached.pop("results")
+            yield frame({"type": "results", "engine": "cache", "count": len(results), "results": results})
+            yield frame({"type": "summary", "total": len(results), **cached})
+            return
+
+        progress = asyncio.Queue()
+        flight = asyncio.ensure_future(live_search(q, progress=progress, budget=budget))
+        streamed = 0
+        while True:
+            getter = asyncio.ensure_future(progress.get())
+            done, _ = await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            streamed += 1
+            yield frame(getter.result())
+        while not progress.empty():
+            streamed += 1
+            yield frame(progress.get_nowait())
+
+        result = flight.result()
+        results = result.pop("results", [])
+        # Joined someone else's scrape (or fell back to predictions): send the final set in one frame
+        if not streamed or result.get("note"):
+            yield frame({"type": "results", "engine": "combined", "count": len(results), "results": results})
+        yield frame({"type": "summary", "total": len(results), **result})
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+# --- STALE-WHILE-REVALIDATE ---
+def schedule_revalidation(q: str):
+    """Re-scrapes a stale query in the background (skipped if one is running or ran recently)."""
+    if live_searches.in_flight(SearchCache.normalize(q)) or not SearchCache.claim_revalidation(q):
+        return
+
+    async def revalidate():
+        try:
+            # Never overwrite stale-but-real data with placeholder predictions
+            await live_search(q, cache_predictions=False)
+        except Exception as e:
+            print(f"⚠️ Revalidation Error ({q}): {e}")
+
+    asyncio.create_task(revalidate())
+
+# --- SINGLE-FLIGHT LIVE SCRAPES ---
+# Concurrent identical searches (users, nightly refresh, KB ingestion) share one scrape
+live_searches = SingleFlight()
+
+async def live_search(q: str, cache_predictions: bool = True, progress: asyncio.Queue = None, budget: float = None):
+    """
+    Live scrape + scoring pipeline, coalesced per normalized query.
+    `progress` receives per-engine frames and `budget` caps the scrape stage (seconds),
+    but only when this call leads the scrape.
+    """
+    key = SearchCache.normalize(q)
+    if live_searches.in_flight(key):
+        print(f"🔗 Joining in-flight scrape: {q}")
+    result = await live_searches.run(key, lambda: _run_live_search(q, cache_predictions, progress, budget))
+    return dict(result)
+
+async def score_items(items, processed):
+    """Runs the ML scoring on raw items, appending them to `processed`. Returns the newly scored ones."""
+    # 1. Safety Filter: Ensure basic fields exist
+    # Typed fields (numeric price/reviews, canonical platform) from here on
+    batch = [normalize_record(item) for item in items if item and isinstance(item, dict)]
+    if not batch:
+        return []
+
+    for item in batch:
+        # 2. Guarantee a unique ID for the frontend (Crucial for React keys)
+        if not item.get("id") and not item.get("_id"):
+            item["id"] = f"auto_{random.randint(10000, 99999)}"
+
+    # 3. Sentiment, POS, sales and profit for the whole batch in one vectorized pass
+    scores = MLEngine.score_batch(batch)
+    # 4. Demand forecasts (only products without a cached model are fitted, in one batch)
+    forecasts = Forecaster.forecast_many(
+        [Forecaster.product_key(item) for item in batch],
+        [item.get("reviews", 0) for item in batch],
+        days=10, horizon=4  # 10 history + 4 forecast
+    )
+
+    scored = []
+    for item, score, (trend, forecast) in zip(batch, scores, forecasts):
+        item.update(score)
+        item["salesTrend"] = trend
+        item["growth"] = forecast["monthly_growth_prediction"]
+        item["confidence"] = forecast["confidence_score"]
+
+        # User Friendly Labels (Non-tech)
+        item["sentiment_label"], item["advice"] = MLEngine.label_sentiment(item["sentiment_score"])
+
+        # Ensure _id is string the frontend can handle
+        if "_id" in item: item["_id"] = str(item["_id"])
+
+        processed.append(item)
+        scored.append(item)
+
+    # Snapshot: the query-level market analysis attached later is not product data
+    await WriteBehind.put([dict(item) for item in scored])
+    return scored
+
+async def absorb_straggler(q: str, engine: str, task: asyncio.Future):
+    """Scores the results of an engine that missed the deadline and merges them into the cache."""
+    try:
+        items = task.result()
+    except Exception as e:
+        print(f"Scraper Error ({engine}): {e}")
+        return
+    scored = await score_items(items or [], [])
+    if scored:
+        entry = SearchCache.extend(q, scored)
+        # The market picture changed: recompute it over the merged result set
+        try:
+            matched = match_knowledge_base(q, await Database.get_products("products", keywords=q.lower().split()))
+        except Exception:
+            matched = []
+        market = attach_market(entry["results"], MLEngine.analyze_market(entry["results"], matched))
+        SearchCache.annotate(q, results=entry["results"], market=market)
+        print(f"🐢 Late results from {engine} merged into cache for {q} ({len(scored)} items)")
+
+def match_knowledge_base(q: str, products):
+    """Knowledge-base products matching the query, most relevant first."""
+    # Smart Match: Check if any word from query is in title
+    q_lower = q.lower()
+    query_words = q_lower.split()
+    matched = []
+    for p in products or []:
+        title = p.get("title", "").lower()
+        # Direct match or any word match
+        if q_lower in title or any(word in title for word in query_words):
+            matched.append(p)
+    
+    # Sort by relevance (Exact match first, then number of keywords)
+    matched.sort(key=lambda p: (q_lower in p.get("title","").lower(), sum(1 for w in query_words if w in p.get("title","").lower())), reverse=True)
+    return matched
+
+def attach_market(items, market):
+    """Gives every item the query-level market analysis (one consistent competition score)."""
+    for item in items:
+        item["competition_score"] = market["competition_score"]
+        item["market"] = market
+    return market
+
+async def _run_live_search(q: str, cache_predictions: bool, progress: asyncio.Queue = None, budget: float = None):
+    """Live scrape + scoring pipeline. Replaces the cache entry for the query when done."""
+    # 2. OPTIMIZED LIVE SCRAPE (Deadline-based scatter/gather)
     print(f"🌍 Starting Fast Live Scrape: {q}")
+    processed = []
+    engine_counts = {}
+    sources = {engine: "pending" for engine in SCRAPER_SCRIPTS}
+
+    loop = asyncio.get_running_loop()
+    if budget is None:
+        budget = SEARCH_BUDGET_SECONDS
+    started = loop.time()
+    # ATTEMPT 1: ALL ENGINES FIRE AT ONCE, each scored the moment it finishes
+    tasks = {asyncio.ensure_future(run_engine(engine, q)): engine for engine in SCRAPER_SCRIPTS}
+    deadlines = {task: started + min(SOURCE_BUDGETS[engine], budget) for task, engine in tasks.items()}
     
     try:
-        # We wrap the gathering in a timeout of 25 seconds. 
-        # ATTEMPT 1: ALL ENGINES FIRE AT ONCE
-        daraz_task = run_scraper_script("backend/daraz_scraper.py", q)
-        markaz_task = run_scraper_script("backend/markaz_scraper.py", q)
-        serp_task = run_scraper_script("backend/serp_scraper.py", q)
-        
-        results_raw = await asyncio.gather(daraz_task, markaz_task, serp_task)
-        daraz, markaz, serp = results_raw
-        
-        raw_results = (daraz if daraz else []) + (markaz if markaz else []) + (serp if serp else [])
+        waiting = set(tasks)
+        while waiting:
+            if SEARCH_ENOUGH_RESULTS and len(processed) >= SEARCH_ENOUGH_RESULTS:
+                print(f"⚡ Enough results for {q} ({len(processed)}), not waiting for the rest")
+                break
+            timeout = max(min(deadlines[t] for t in waiting) - loop.time(), 0)
+            done, waiting = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                engine = tasks[task]
+                sources[engine] = "done"
+                try:
+                    items = task.result()
+                except Exception as e:
+                    print(f"Scraper Error ({engine}): {e}")
+                    items = []
+                scored = await score_items(items or [], processed)
+                engine_counts[engine] = len(scored)
+                if progress is not None:
+                    await progress.put({"type": "results", "engine": engine, "count": len(scored), "results": scored})
+            # Engines past their own budget keep running in the background as stragglers
+            now = loop.time()
+            waiting = {t for t in waiting if deadlines[t] > now}
         
         # If we got SERP results but no direct results, label it "Deep Web Scraper"
-        if serp and not daraz and not markaz:
+        if engine_counts.get("serp") and not engine_counts.get("daraz") and not engine_counts.get("markaz"):
             print(f"✅ SERP (Deep Web) rescued the search for {q}")
             
     except Exception as e:
         print(f"Scrape Gathering Error: {e}")
-        raw_results = []
+
+    # Stragglers still land in the cache once they finish
+    for task, engine in tasks.items():
+        if sources[engine] == "pending":
+            print(f"⏳ {engine} missed its {min(SOURCE_BUDGETS[engine], budget):.1f}s budget for {q}, continuing in background")
+            task.add_done_callback(lambda t, engine=engine: asyncio.ensure_future(absorb_straggler(q, engine, t)))
+    is_partial = "pending" in sources.values()
     
+    # Knowledge-base items for the same query (fallback results and market context)
+    try:
+        matched = match_knowledge_base(q, await Database.get_products("products", keywords=q.lower().split()))
+    except Exception as e:
+        print(f"⚠️ Knowledge Base Error: {e}")
+        matched = []
+
     # --- LAYER 2: KNOWLEDGE BASE FALLBACK ---
-    if not raw_results:
+    source_label = "Live Scraping Engine"
+    if not processed:
         print(f"🕵️ Scrapers failed for {q}. Checking Knowledge Base (Layer 2)...")
-        historical_data = await Database.get_products("products")
-        
-        # Smart Match: Check if any word from query is in title
-        q_lower = q.lower()
-        query_words = q_lower.split()
-        matched = []
-        for p in historical_data:
-            title = p.get("title", "").lower()
-            # Direct match or any word match
-            if q_lower in title or any(word in title for word in query_words):
-                matched.append(p)
-        
-        # Sort by relevance (Exact match first, then number of keywords)
-        matched.sort(key=lambda p: (q_lower in p.get("title","").lower(), sum(1 for w in query_words if w in p.get("title","").lower())), reverse=True)
-        raw_results = matched[:15]
+        scored = await score_items(matched[:15], processed)
         
-        if raw_results:
-            print(f"✅ Found {len(raw_results)} items in Knowledge Base.")
+        if scored:
+            print(f"✅ Found {len(scored)} items in Knowledge Base.")
             source_label = "Knowledge Base (Historical Data)"
-        else:
-            source_label = "Live Scraping Engine"
-    else:
-        source_label = "Live Scraping Engine"
-    
-    processed = []
-    for item in raw_results:
-        # 1. Safety Filter: Ensure basic fields exist
-        if not item or not isinstance(item, dict): continue
-        
-        # 2. Guarantee a unique ID for the frontend (Crucial for React keys)
-        if not item.get("id") and not item.get("_id"):
-            item["id"] = f"auto_{random.randint(10000, 99999)}"
-        
-        # 3. Process Sentiment & Advice
-        sentiment = MLEngine.analyze_sentiment(item.get("title", ""))
-        item["sentiment_score"] = sentiment
-        
-        # User Friendly Labels (Non-tech)
-        if sentiment > 0.7:
-            item["sentiment_label"] = "High Demand"
-            item["advice"] = "Perfect for launching - Top consumer choice."
-        elif sentiment > 0.5:
-            item["sentiment_label"] = "Stable Interest"
-            item["advice"] = "Safe bet with consistent middle-market interest."
-        else:
-            item["sentiment_label"] = "Low Potential"
-            item["advice"] = "High competition or low current interest."
-
-        item["pos_score"] = MLEngine.calculate_pos_score(item.get("price", 0), item.get("reviews", 0), sentiment)
-        item["salesTrend"] = generate_trend_data(10, 4) # 10 history + 4 forecast
-        forecast = MLEngine.get_forecast(item["salesTrend"])
-        item["growth"] = forecast["monthly_growth_prediction"]
-        item["confidence"] = forecast["confidence_score"]
-        
-        # --- NEW ANALYTICS ---
-        item["estimated_monthly_sales"] = MLEngine.estimate_sales(item.get("reviews", 0))
-        item["competition_score"] = MLEngine.calculate_competition_score(processed)
-        item["profit_estimate"] = MLEngine.calculate_profit(item.get("price", 0))
-        
-        # Ensure _id is string the frontend can handle
-        if "_id" in item: item["_id"] = str(item["_id"])
-
-        asyncio.create_task(Database.save_product(item))
-        processed.append(item)
+            if progress is not None:
+                await progress.put({"type": "results", "engine": "knowledge_base", "count": len(scored), "results": scored})
     
     # Save to Cache for next time (ONLY if NOT AI Predicted)
     # --- CACHING LOGIC ---
@@ -291,16 +524,17 @@ async def search(q: str = FastAPIQuery(..., description="Search keyword")):
         }
     ]
     results_to_return = processed if processed else ai_predictions
+    # --- MARKET ANALYSIS (once per result set) ---
+    market = attach_market(processed, MLEngine.analyze_market(processed, matched)) if processed else None
     
-    if results_to_return:
+    if processed or cache_predictions:
         try:
-            from tinydb import TinyDB
-            db = TinyDB('backend/data/local_storage.json')
-            table = db.table("search_cache")
-            # Clear old cache for this query
-            table.remove(lambda d: d.get('q') == q.lower())
-            table.insert({"q": q.lower(), "results": results_to_return, "timestamp": datetime.now().isoformat()})
-            db.close()
+            # Predictions are placeholders: keep them briefly and mark them stale right away,
+            # so the next request is served instantly while the scrapers retry in the background
+            if processed:
+                SearchCache.put(q, results_to_return, market=market)
+            else:
+                SearchCache.put(q, results_to_return, ttl=SearchCache.prediction_ttl, soft_ttl=0)
         except Exception as e:
             print(f"Cache Error: {e}")
             
@@ -313,11 +547,21 @@ async def search(q: str = FastAPIQuery(..., description="Search keyword")):
         return {
             "query": q, 
             "results": ai_predictions, 
+            "sources": sources,
+            "is_partial": is_partial,
             "source": "Generative AI Forecast (Fetching Live Data...)",
             "note": "We are showing predicted values while we finish scanning the live market. Please refresh in a moment."
         }
         
-    return {"query": q, "results": processed, "source": source_label, "competition_score": MLEngine.calculate_competition_score(processed)}
+    return {
+        "query": q,
+        "results": processed,
+        "source": source_label,
+        "sources": sources,
+        "is_partial": is_partial,
+        "competition_score": market["competition_score"],
+        "market": market
+    }
 
 @app.get("/analytics/keywords")
 async def get_trending_keywords():
@@ -325,11 +569,7 @@ async def get_trending_keywords():
     Returns trending keywords based on actual user searches stored in cache.
     """
     try:
-        from tinydb import TinyDB
-        db = TinyDB('backend/data/local_storage.json')
-        table = db.table("search_cache")
-        logs = table.all()
-        db.close()
+        logs = SearchCache.entries()
         
         if len(logs) > 2:
             # Aggregate and count
@@ -389,10 +629,12 @@ async def refresh_market_data_task():
         
         for niche in core_niches:
             print(f"📡 Background Ingesting: {niche}")
-            search_data = await search(niche)
+            # Go straight to the live pipeline so the nightly run always refreshes the cache
+            search_data = await live_search(niche, cache_predictions=False)
             
             # 2. Immediate Trend Analysis
             new_items = search_data.get("results", [])
+            trends = []
             for p in new_items:
                 sentiment = p.get("sentiment_score", 0.5)
                 pos = p.get("pos_score", 0)
@@ -403,11 +645,21 @@ async def refresh_market_data_task():
                 if is_trend:
                     p["trend_type"] = "Emerging"
                     p["detected_at"] = datetime.now().isoformat()
-                    # Ensure it has a reliable unique key for upsert
-                    await Database.save_product(p, "emerging_trends")
-            
+                    trends.append(p)
+            # One bulk upsert per niche (title + platform is the upsert key)
+            await Database.save_products_many(trends, "emerging_trends")
+
             await asyncio.sleep(1)
             
+        # 3. Re-score the whole knowledge base in one batch pass
+        products = await Database.get_products("products") or []
+        await Database.save_products_many(MLEngine.rescore_products([normalize_record(p) for p in products]))
+        print(f"🧮 Re-scored {len(products)} knowledge base products")
+
+        # 4. Downsample old price/review snapshots
+        before, after = SnapshotStore.compact()
+        print(f"🗜️ Snapshot store compacted: {before} -> {after} points")
+
         await Database.save_metadata("last_automated_refresh", datetime.now().isoformat())
         await Database.save_metadata("automation_status", "Healthy")
         print("✅ Background Market Refresh Complete.")
@@ -435,7 +687,7 @@ async def get_market_stats():
         if Database.mode == "Disconnected":
             await Database.connect_db()
             
-        products = await Database.get_products("products")
+        products = await Database.get_products("products", fields=["pos_score"])
         total = len(products)
         
         # Calculate some realistic metrics from data
@@ -542,31 +794,8 @@ async def export_strategy(product_id: str):
     """
     Generates a professional AI Sourcing Strategy PDF for a product.
     """
-    # 1. Fetch Data (Mirroring product_detail logic)
-    product = None
-    
-    # Try finding in search_cache first
-    if Database.db is not None:
-        try:
-            from bson import ObjectId
-            try:
-                # First try cache items
-                product = await Database.db["search_cache"].find_one({"results.id": product_id}, {"results.$": 1})
-                if product: product = product["results"][0]
-                
-                if not product:
-                    product = await Database.db["products"].find_one({"id": product_id})
-                
-                if not product:
-                    product = await Database.db["watchlist"].find_one({"id": product_id})
-                    
-            except: pass
-        except: pass
-        
-    if not product:
-        # Final fallback: fetch from products collection
-        all_products = await Database.get_products("products")
-        product = next((p for p in all_products if str(p.get("id")) == product_id or str(p.get("_id")) == product_id), None)
+    # 1. Fetch Data (Mirroring product_detail logic): search cache, products or watchlist via the id index
+    product = await ProductIndex.find(product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found for export")
@@ -683,39 +912,8 @@ async def get_details(product_id: str):
     """
     Returns deep market analytics for a single product.
     """
-    from bson import ObjectId
-    product = None
-    
-    # 1. Try Cloud
-    if Database.db:
-        try: 
-            product = await Database.db["products"].find_one({"_id": ObjectId(product_id)})
-        except: 
-            pass
-    
-    # 2. Try the Search Cache (Since many products live there first)
-    if not product and os.path.exists('backend/data/local_storage.json'):
-        from tinydb import TinyDB
-        db = TinyDB('backend/data/local_storage.json')
-        # Check all collections in cache
-        for table_name in ["search_cache", "products"]:
-            table = db.table(table_name)
-            if table_name == "search_cache":
-                # Scoped search in research history
-                for entry in table.all():
-                    for p in entry.get("results", []):
-                        if str(p.get("_id")) == product_id or str(p.get("id")) == product_id:
-                            product = p
-                            break
-                    if product: break
-            else:
-                product = next((item for item in table.all() if str(item.get("_id")) == product_id or str(item.get("id")) == product_id), None)
-            
-            if product: 
-                db.close()
-                break
-        else:
-            db.close()
+    # Search cache (many products live there first), knowledge base or watchlist: one id-index lookup
+    product = await ProductIndex.find(product_id)
     
     if not product:
         # Final fallback - generic analysis
@@ -727,19 +925,19 @@ async def get_details(product_id: str):
             else:
                 display_title = "AI Market Forecast"
         
-        history = generate_trend_data(product_id, 20, 7)
+        (history, forecast), = Forecaster.forecast_many([product_id], [0], days=20, horizon=7)
         return {
             "product": {"title": display_title, "image": "https://images.unsplash.com/photo-1551288049-bebda4e38f71?w=400", "price": "0", "platform": "AI Forecast"},
             "analysis": {
                 "sales_history": history,
-                "forecast": MLEngine.get_forecast(history),
+                "forecast": forecast,
                 "sentiment": {"score": 0.5, "label": "Neutral", "advice": "Standard performance predicted."},
                 "checklist": ["High Demand", "Competitive Pricing"]
             }
         }
         
     # --- PROFESSIONAL ARBITRAGE & SOURCING LOGIC ---
-    price = float(str(product.get("price", 0)).replace(",", ""))
+    price = parse_price(product.get("price"))
     
     # 1. Arbitrage Simulation (Markup logic)
     # If it's on Daraz, we assume sourcing from Markaz/Wholesale is 40-60% cheaper
@@ -755,13 +953,17 @@ async def get_details(product_id: str):
         sourcing_strategy = "Local Wholesale (Markaz/Shah Alam): Fast turnover, lower risk for budget items."
         sourcing_type = "Local"
 
-    history = generate_trend_data(product_id, 20, 7)
+    # Reuses the model fitted when the product was scored (no refit per request)
+    (history, forecast), = Forecaster.forecast_many(
+        [Forecaster.product_key(product)], [parse_reviews(product.get("reviews"))], days=20, horizon=7
+    )
     
     return {
         "product": product,
         "analysis": {
             "sales_history": history,
-            "forecast": MLEngine.get_forecast(history),
+            "forecast": forecast,
+            "price_history": SnapshotStore.history(product),
             "sentiment": {
                 "score": product.get("sentiment_score", 0.5), 
                 "label": product.get("sentiment_label", "Neutral"),
@@ -811,31 +1013,13 @@ async def recommendations(budget: str = "medium", category: str = "electronics",
     }
     keywords = cat_keywords.get(category, [category])
     
-    # 3. Pull from Database
-    all_products = await Database.get_products("products")
-    
-    # Apply Filters
-    filtered = []
-    for p in all_products:
-        price_raw = str(p.get("price", 0)).replace(",", "").replace("Rs.", "").strip()
-        try:
-            price = float(price_raw)
-        except:
-            price = 0
-            
+    # 3. Pull from Database: category (any keyword in title) and price match run in the backend
+    filtered = await Database.get_products("products", keywords=keywords, min_price=min_p, max_price=max_p)
+    for p in filtered:
         title = p.get("title", "").lower()
-        
-        # Smart Category Match (Any keyword in title)
-        cat_match = any(k in title for k in keywords)
-        
-        # Price Match
-        price_match = min_p <= price <= max_p
-        
-        if cat_match and price_match:
-            # Score based on how many keywords match + POS score
-            relevance = sum(1 for k in keywords if k in title) * 10
-            p["rank_score"] = p.get("pos_score", 0) + relevance
-            filtered.append(p)
+        # Score based on how many keywords match + POS score
+        relevance = sum(1 for k in keywords if k in title) * 10
+        p["rank_score"] = p.get("pos_score", 0) + relevance
             
     # 4. Rank by Rank Score (POS + Category Match)
     filtered.sort(key=lambda x: x.get("rank_score", 0), reverse=True)
@@ -847,16 +1031,18 @@ async def recommendations(budget: str = "medium", category: str = "electronics",
         search_term = keywords[0] if keywords else category
         
         # Scrape Live
-        live_results = await run_scraper_script("backend/serp_scraper.py", f"{search_term} {budget} price in pakistan")
+        live_results = await run_engine("serp", f"{search_term} {budget} price in pakistan")
         
         # Apply Budget Filters to Live Results
+        discovered = []
         for p in live_results:
-            p_price = p.get("price", 0)
+            p_price = normalize_record(p)["price"]
             if min_p <= p_price <= max_p:
                 p["rank_score"] = 80 # New finds get high priority
                 filtered.append(p)
-                # Save for future
-                asyncio.create_task(Database.save_product(p))
+                discovered.append(p)
+        # Save for future
+        await WriteBehind.put(discovered)
     
     # Re-sort after adding live results
     filtered.sort(key=lambda x: x.get("rank_score", 0), reverse=True)
@@ -864,7 +1050,7 @@ async def recommendations(budget: str = "medium", category: str = "electronics",
     # If STILL no results found, fallback to general top items
     if not filtered:
         print("⚠️ No direct matches, using profile-based fallback.")
-        filtered = [p for p in all_products if min_p <= float(str(p.get("price", 0)).replace(",", "")) <= max_p][:10]
+        filtered = await Database.get_products("products", min_price=min_p, max_price=max_p, limit=10)
 
     return {
         "query": f"{budget}_{category}",
@@ -873,6 +1059,58 @@ async def recommendations(budget: str = "medium", category: str = "electronics",
         "is_personalized": True
     }
 
+@app.get("/products")
+async def list_products(q: str = None, platform: str = None, category: str = None, min_price: float = None,
+                        max_price: float = None, sort: str = "-pos_score", fields: str = None,
+                        limit: int = 50, page_token: str = None):
+    """Paginated knowledge-base browsing; filters, sort and `fields` (comma-separated) run in the database."""
+    try:
+        page = await Database.get_products_page(
+            "products", limit=max(1, min(limit, 200)), page_token=page_token,
+            keywords=q.lower().split() if q else None, platform=platform, category=category,
+            min_price=min_price, max_price=max_price, sort=sort or None,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "count": len(page["results"])}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and sizing of the caches, plus the write-behind queue depth."""
+    return {**SearchCache.get_stats(), "live_scrapes": live_searches.get_stats(), "sentiment": SentimentCache.get_stats(),
+            "forecaster": Forecaster.get_stats(), "snapshots": SnapshotStore.get_stats(),
+            "write_behind": WriteBehind.get_stats(), "local_storage": LocalStorage.get_stats(),
+            "product_index": ProductIndex.get_stats()}
+
+@app.delete("/cache/search")
+async def invalidate_search_cache(q: str = None):
+    """Invalidates one cached query, or the whole search cache when no query is given."""
+    removed = SearchCache.invalidate(q)
+    return {"status": "success", "removed": removed, "query": q}
+
+@app.get("/db/status")
+async def get_db_status():
+    """Cloud/Local mode, circuit breaker, health probes and writes waiting to be replayed to Cloud."""
+    return Database.get_status()
+
+@app.get("/db/indexes")
+async def get_index_status():
+    """Declared vs. actual Mongo indexes per collection (present, missing, conflicting, extra)."""
+    if Database.db is not None:
+        return {"db_mode": Database.mode, **await Database.ensure_indexes(create=False),
+                "last_reconcile": Database.index_status}
+    return {"db_mode": Database.mode, "local_indexes": Database.local_db.indexes() if Database.local_db is not None else {}}
+
+@app.get("/scrapers/stats")
+async def get_scraper_stats():
+    """Browser pool utilisation, which path served each engine, and time-to-first-card."""
+    return {
+        "browser_pool": BrowserPool.get_stats(),
+        "engine_paths": engine_path_stats,
+        "readiness": get_readiness_stats()
+    }
+
 @app.get("/debug")
 async def debug():
     return {"status": "ok", "db_mode": Database.mode, "version": "2.1-Watchlist-Enabled"}
@@ -915,8 +1153,7 @@ async def remove_from_watchlist(product_id: str):
             
     if Database.local_db is not None:
         try:
-            table = Database.local_db.table("watchlist")
-            table.remove(lambda d: str(d.get("_id")) == product_id or str(d.get("id")) == product_id)
+            await Database.remove_product(product_id, "watchlist")
         except:
             pass
             
@@ -1,9 +1,17 @@
+import os
 from textblob import TextBlob
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import random
+from backend.normalize import parse_price, parse_reviews
+from backend.sentiment_cache import SentimentCache
+from backend.sentiment_lexicon import LexiconSentiment
 
 class MLEngine:
+    # "textblob" (default) or "lexicon" (precompiled TextBlob lexicon, for bulk re-scoring)
+    sentiment_backend: str = os.getenv("SENTIMENT_BACKEND", "textblob").lower()
+
     @staticmethod
     def analyze_sentiment(text: str):
         """
@@ -12,33 +20,51 @@ class MLEngine:
         """
         if not text or text == "Unknown":
             return 0.5
+        if MLEngine.sentiment_backend == "lexicon":
+            return LexiconSentiment.score(text)
+
+        # Memoized per normalized title (persisted across restarts)
+        cached = SentimentCache.get(text)
+        if cached is not None:
+            return cached
         
         analysis = TextBlob(text)
         # polarity is -1 to 1, convert to 0 to 1
         normalized_score = (analysis.sentiment.polarity + 1) / 2
+        SentimentCache.put(text, normalized_score)
         return normalized_score
 
+    @staticmethod
+    def analyze_sentiments(texts):
+        """Batch analyze_sentiment for a list of titles (one lexicon pass with the lexicon backend)."""
+        if MLEngine.sentiment_backend == "lexicon":
+            return LexiconSentiment.score_many(texts)
+        return [MLEngine.analyze_sentiment(t) for t in texts]
+
+    @staticmethod
+    def label_sentiment(sentiment_score):
+        """User friendly (non-tech) label and advice for a sentiment score. Returns (label, advice)."""
+        if sentiment_score > 0.7:
+            return "High Demand", "Perfect for launching - Top consumer choice."
+        elif sentiment_score > 0.5:
+            return "Stable Interest", "Safe bet with consistent middle-market interest."
+        return "Low Potential", "High competition or low current interest."
+
     @staticmethod
     def calculate_pos_score(price_str, reviews_count, sentiment_score):
         """
         Calculate the Product Opportunity Score (0-100).
         Formula: (Sentiment * 40) + (Review Volume Proxy * 30) + (Price Stability Proxy * 30)
         """
-        try:
-            # Clean price
-            price = float(str(price_str).replace(",", "").replace("Rs.", "").replace("Rs", "").strip())
-        except:
-            price = 1000
+        # Records are normalized at ingest, so this is a no-op for numbers
+        price = parse_price(price_str, default=1000)
 
         # Sentiment is 40% of the score
         sentiment_component = sentiment_score * 40
         
         # Review count (proxy for demand) - 30% of the score
         # Normalize: 100+ reviews is "high" (30 points)
-        try:
-            rc = int(str(reviews_count).replace("(", "").replace(")", "").strip())
-        except:
-            rc = 0
+        rc = parse_reviews(reviews_count)
         review_component = min(rc / 100, 1.0) * 30
 
         # Price Factor (higher price often means higher profit margin for sellers) - 30%
@@ -65,8 +91,8 @@ class MLEngine:
 
         # Real Logic: Simple linear regression proxy
         try:
-            # Extract y values (sales/demand)
-            y = [item.get('value', 0) for item in product_history]
+            # Extract y values (sales/demand); trend points store them under 'sales'
+            y = [item.get('sales', item.get('value', 0)) for item in product_history]
             if len(y) < 5:
                 # Not enough points for a real trend, add some physics-based noise
                 growth = (y[-1] / y[0] - 1) * 100 if y[0] > 0 else 5
@@ -96,21 +122,20 @@ class MLEngine:
             return {"growth": "+5%", "confidence": "70%"}
 
     @staticmethod
-    def estimate_sales(reviews_count):
+    def estimate_sales(reviews_count, variation=None):
         """
         Estimates monthly sales using the Stock Tracking / Review Velocity method.
         Base logic: 1 review per 50-100 sales.
+        `variation` (0.8-1.2) is random unless given, e.g. for parity checks.
         """
-        try:
-            rc = int(str(reviews_count).replace("(", "").replace(")", "").strip())
-        except:
-            rc = 0
+        rc = parse_reviews(reviews_count)
             
         # Review to Sales ratio in Pakistan is typically lower (more people buy without reviewing)
         # We estimate 1 review = 40 sales
         estimated_monthly = (rc * 40) / 12 # Average per month if total reviews
         # Add a variation for realism
-        variation = random.uniform(0.8, 1.2)
+        if variation is None:
+            variation = random.uniform(0.8, 1.2)
         return int(max(estimated_monthly * variation, 5))
 
     @staticmethod
@@ -119,18 +144,12 @@ class MLEngine:
         Calculates profit margin after Daraz fees (Commission, Payment Fee, Shipping, VAT).
         Default Sourcing Cost: 60% of retail if not provided.
         """
-        try:
-            price = float(str(retail_price).replace(",", "").replace("Rs.", "").replace("Rs", "").strip())
-        except:
-            price = 0
+        price = parse_price(retail_price)
             
         if sourcing_cost is None:
             sourcing_cost = price * 0.6  # Assume 60% sourcing cost
         else:
-            try:
-                sourcing_cost = float(str(sourcing_cost).replace(",", "").replace("Rs.", "").replace("Rs", "").strip())
-            except:
-                sourcing_cost = price * 0.6
+            sourcing_cost = parse_price(sourcing_cost, default=price * 0.6)
 
         # Daraz Fees (Approx):
         # 1. Commission: 10-15%
@@ -170,3 +189,219 @@ class MLEngine:
         if count < 10: return 65 # Moderate
         if count < 20: return 40 # High
         return 20 # Very High (Saturated)
+
+    @staticmethod
+    def analyze_market(items, reference_items=None):
+        """
+        Market-level competition analysis, computed once over a query's full result set
+        (plus knowledge-base items for the same query): seller count, price dispersion,
+        platform mix and review concentration, folded into one competition score
+        (same 0-100 scale as calculate_competition_score: high = low competition).
+        """
+        listings = list(items)
+        seen = {(i.get("title"), i.get("platform")) for i in listings}
+        listings += [i for i in reference_items or [] if (i.get("title"), i.get("platform")) not in seen]
+        listings = [i for i in listings if not i.get("is_prediction")]
+        if not listings:
+            return {"listings": 0, "competition_score": MLEngine.calculate_competition_score([])}
+
+        # Sellers: the scraper's seller name where known, otherwise each distinct listing counts
+        sellers = {
+            (i.get("platform"), i.get("seller") or " ".join(str(i.get("title", "")).lower().split()))
+            for i in listings
+        }
+
+        prices = np.array([parse_price(i.get("price")) for i in listings], dtype=float)
+        prices = prices[prices > 0]
+        if len(prices):
+            q1, median, q3 = np.percentile(prices, [25, 50, 75])
+            dispersion = float(prices.std() / prices.mean())
+        else:
+            q1 = median = q3 = dispersion = 0.0
+
+        platforms = {}
+        for i in listings:
+            platforms[i.get("platform") or "Web"] = platforms.get(i.get("platform") or "Web", 0) + 1
+
+        # Review concentration: Herfindahl index of review share (1.0 = one listing owns every review)
+        reviews = np.array([parse_reviews(i.get("reviews")) for i in listings], dtype=float)
+        total_reviews = reviews.sum()
+        if total_reviews > 0:
+            shares = reviews / total_reviews
+            concentration = float((shares ** 2).sum())
+            top3_share = float(np.sort(shares)[-3:].sum())
+        else:
+            concentration = top3_share = 0.0
+
+        # Crowded (count-based baseline), eased by a wide price spread (room to position),
+        # tightened when a few listings own the reviews or every platform is contested
+        score = MLEngine.calculate_competition_score(listings)
+        score += 10 * min(dispersion, 1.0)
+        score -= 20 * concentration
+        score -= 5 * (len(platforms) - 1)
+
+        return {
+            "listings": len(listings),
+            "seller_count": len(sellers),
+            "price": {
+                "min": float(prices.min()) if len(prices) else 0.0,
+                "median": round(float(median), 0),
+                "max": float(prices.max()) if len(prices) else 0.0,
+                "iqr": round(float(q3 - q1), 0),
+                "dispersion": round(dispersion, 3),
+            },
+            "platform_mix": {p: round(c / len(listings), 3) for p, c in sorted(platforms.items(), key=lambda x: -x[1])},
+            "review_concentration": round(concentration, 3),
+            "top3_review_share": round(top3_share, 3),
+            "competition_score": int(round(max(min(score, 100), 0))),
+        }
+
+    # --- BATCH (VECTORIZED) API ---
+    # Same formulas as the scalar methods above, computed over whole result sets / catalogs
+    # with NumPy in one pass. Inputs are typed at ingest (see backend.normalize); strings are
+    # only parsed when a column can't be converted directly.
+
+    # Below this many items the scalar loop is faster than setting up the arrays
+    batch_min_items: int = int(os.getenv("SCORE_BATCH_MIN_ITEMS", "64"))
+
+    @staticmethod
+    def _column(values, parse, default):
+        """float array for a typed column; missing or unparseable values become `default`."""
+        try:
+            column = np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            # Untyped records (e.g. 'Rs. 1,739'): parse element by element
+            column = np.array([parse(v, default=np.nan) for v in values], dtype=float)
+        return np.where(np.isnan(column), default, column)
+
+    @staticmethod
+    def calculate_pos_scores(prices, reviews, sentiments):
+        """Vectorized calculate_pos_score. Unparseable prices count as Rs. 1000, like the scalar path."""
+        price = MLEngine._column(prices, parse_price, 1000.0)
+        rc = np.trunc(MLEngine._column(reviews, parse_reviews, 0.0))
+        sentiment = np.asarray(sentiments, dtype=float)
+
+        total = sentiment * 40 + np.minimum(rc / 100, 1.0) * 30 + np.minimum(price / 5000, 1.0) * 30
+        scores = np.round(total, 1)
+        # np.round scales by 10 first, which can flip values like 14.15 (really 14.1499...) near a
+        # .x5 tie; those few are rounded with Python's exact round() for parity with the scalar score
+        scaled = total * 10
+        for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6).tolist():
+            scores[i] = round(float(total[i]), 1)
+        return scores
+
+    @staticmethod
+    def estimate_sales_batch(reviews, variation=None):
+        """Vectorized estimate_sales. `variation` is an array (or scalar) in 0.8-1.2; random if omitted."""
+        rc = np.trunc(MLEngine._column(reviews, parse_reviews, 0.0))
+        if variation is None:
+            variation = np.random.default_rng().uniform(0.8, 1.2, len(rc))
+        estimated = (rc * 40) / 12 * np.asarray(variation, dtype=float)
+        return np.maximum(estimated, 5).astype(int)
+
+    @staticmethod
+    def calculate_profit_batch(prices, sourcing_costs=None):
+        """Vectorized calculate_profit. Returns one dict per price, with the scalar method's keys."""
+        price = MLEngine._column(prices, parse_price, 0.0)
+        if sourcing_costs is None:
+            sourcing = price * 0.6  # Assume 60% sourcing cost
+        else:
+            sourcing = MLEngine._column(sourcing_costs, parse_price, np.nan)
+            sourcing = np.where(np.isnan(sourcing), price * 0.6, sourcing)
+
+        total_fees = price * 0.12 + price * 0.0125 + 30
+        profit = price - sourcing - total_fees
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin = np.where(price > 0, profit / price * 100, 0.0)
+
+        keys = ("retail_price", "sourcing_cost", "fees", "profit", "margin", "is_profitable")
+        columns = (price.tolist(), sourcing.tolist(), np.round(total_fees, 0).tolist(), np.round(profit, 0).tolist(),
+                   [f"{m:.1f}%" for m in margin.tolist()], (profit > 0).tolist())
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    @staticmethod
+    def get_forecast_batch(histories):
+        """
+        Vectorized get_forecast over many trend histories. Histories are grouped by length so
+        each group's least-squares slope is computed as one matrix operation.
+        """
+        forecasts = [None] * len(histories)
+        by_length = {}
+        for i, history in enumerate(histories):
+            if not history or len(history) < 2:
+                forecasts[i] = MLEngine.get_forecast(history)  # random baseline, nothing to vectorize
+                continue
+            by_length.setdefault(len(history), []).append(i)
+
+        for n, rows in by_length.items():
+            y = np.array([[p.get('sales', p.get('value', 0)) for p in histories[i]] for i in rows], dtype=float)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if n < 5:
+                    growth = np.where(y[:, 0] > 0, (y[:, -1] / y[:, 0] - 1) * 100, 5.0)
+                else:
+                    x = np.arange(n, dtype=float)
+                    denominator = n * (x * x).sum() - x.sum() ** 2
+                    slope = (n * (y @ x) - x.sum() * y.sum(axis=1)) / denominator if denominator != 0 else np.zeros(len(rows))
+                    avg_y = y.sum(axis=1) / n
+                    growth = np.where(avg_y > 0, slope / avg_y * 100, 5.0)
+
+            growth = np.clip(growth, -15, 45)
+            confidence = 70 + min(n * 2, 25)
+            for i, g in zip(rows, growth.tolist()):
+                forecasts[i] = {
+                    "monthly_growth_prediction": ("+" if g >= 0 else "") + f"{g:.1f}%",
+                    "confidence_score": f"{confidence}%"
+                }
+        return forecasts
+
+    @staticmethod
+    def score_batch(items, sentiments=None, variation=None):
+        """
+        Scores a whole result set (or the entire knowledge base) in one vectorized pass.
+        Returns one dict per item: sentiment_score, pos_score, estimated_monthly_sales,
+        profit_estimate, plus growth/confidence when any item has a salesTrend.
+        """
+        if sentiments is None:
+            sentiments = MLEngine.analyze_sentiments([item.get("title", "") for item in items])
+        prices = [item.get("price", 0) for item in items]
+        reviews = [item.get("reviews", 0) for item in items]
+
+        if len(items) < MLEngine.batch_min_items:
+            variations = variation if variation is None or np.ndim(variation) else [variation] * len(items)
+            scores = [{
+                "sentiment_score": float(s),
+                "pos_score": MLEngine.calculate_pos_score(p, r, s),
+                "estimated_monthly_sales": MLEngine.estimate_sales(r, variations[i] if variations is not None else None),
+                "profit_estimate": MLEngine.calculate_profit(p),
+            } for i, (p, r, s) in enumerate(zip(prices, reviews, sentiments))]
+        else:
+            columns = zip(
+                np.asarray(sentiments, dtype=float).tolist(),
+                MLEngine.calculate_pos_scores(prices, reviews, sentiments).tolist(),
+                MLEngine.estimate_sales_batch(reviews, variation).tolist(),
+                MLEngine.calculate_profit_batch(prices),
+            )
+            keys = ("sentiment_score", "pos_score", "estimated_monthly_sales", "profit_estimate")
+            scores = [dict(zip(keys, values)) for values in columns]
+
+        histories = [item.get("salesTrend") for item in items]
+        if any(histories):
+            for score, forecast in zip(scores, MLEngine.get_forecast_batch(histories)):
+                score["growth"] = forecast["monthly_growth_prediction"]
+                score["confidence"] = forecast["confidence_score"]
+        return scores
+
+    @staticmethod
+    def rescore_products(products, scores=None):
+        """
+        Bulk re-scoring of stored products (knowledge base, colab catalog) with a single
+        score_batch call, or with `scores` it already returned. Updates the records in place and returns them.
+        """
+        if not products:
+            return products
+        if scores is None:
+            scores = MLEngine.score_batch(products)
+        for product, score in zip(products, scores):
+            product.update(score)
+            product["sentiment_label"], product["advice"] = MLEngine.label_sentiment(score["sentiment_score"])
+        return products
@@ -0,0 +1,83 @@
+import re
+
+# Canonical platform names (lowercase alias -> display name)
+PLATFORM_ALIASES = {
+    "daraz": "Daraz",
+    "daraz.pk": "Daraz",
+    "markaz": "Markaz",
+    "markaz.app": "Markaz",
+    "markaz.pk": "Markaz",
+    "telemart": "Telemart",
+    "telemart.pk": "Telemart",
+    "web": "Web",
+    "ai forecast": "AI Forecast",
+}
+
+# The k/m suffix must end its word: '5 more' is 5, not 5 million
+_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)(?:\s*([kKmM])\b)?")
+# An amount with a currency marker, for prices inside free text (titles, snippets, card text)
+_CURRENCY_AMOUNT = re.compile(r"(?:Rs\.?|PKR)\s?\.?\s?(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE)
+_MULTIPLIERS = {"k": 1_000, "m": 1_000_000}
+
+def _parse_number(text: str, multipliers: bool = True):
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    if multipliers and match.group(2):
+        value *= _MULTIPLIERS[match.group(2).lower()]
+    return value
+
+def parse_price(value, default: float = 0.0) -> float:
+    """
+    'Rs. 1,739' / 'PKR 1500' / '1739.00' / 1739 -> 1739.0. Numbers pass straight through.
+    No k/m multipliers: listings print prices in full, and a suffix here is usually a following word.
+    """
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = _parse_number(str(value), multipliers=False) if value is not None else None
+    return parsed if parsed is not None else default
+
+def find_price(text, default: float = 0.0) -> float:
+    """First currency-marked amount in free text: 'Buy 2 for Rs. 1,739 only' -> 1739.0."""
+    match = _CURRENCY_AMOUNT.search(str(text or ""))
+    return parse_price(match.group(1), default) if match else default
+
+def parse_reviews(value, default: int = 0) -> int:
+    """'(123)' / '1.2k' / '1,234' / '45+' / 123 -> int. Numbers pass straight through."""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    parsed = _parse_number(str(value)) if value is not None else None
+    return int(parsed) if parsed is not None else default
+
+def parse_rating(value, default: float = 0.0) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    parsed = _parse_number(str(value), multipliers=False) if value is not None else None
+    return min(parsed, 5.0) if parsed is not None else default
+
+def canonical_platform(value) -> str:
+    text = str(value or "").strip()
+    return PLATFORM_ALIASES.get(text.lower(), text or "Web")
+
+def product_key(record: dict) -> str:
+    """Stable per-product key: canonical platform + normalized title (the pair the database upserts on)."""
+    title = " ".join(str(record.get("title", "")).lower().split())
+    return f"{canonical_platform(record.get('platform'))}:{title}"
+
+def normalize_record(record: dict) -> dict:
+    """
+    Ingest-time normalization for any product record (scraper, colab seed, SERP, knowledge base).
+    Converts price/reviews/rating into numbers and the platform into its canonical name, in place,
+    so downstream scoring never re-parses strings. Idempotent.
+    """
+    record["price"] = parse_price(record.get("price"))
+    record["reviews"] = parse_reviews(record.get("reviews"))
+    if "rating" in record:
+        record["rating"] = parse_rating(record.get("rating"))
+    record["platform"] = canonical_platform(record.get("platform"))
+    return record
@@ -0,0 +1,86 @@
+class ProductIndex:
+    """
+    id -> location index for product lookups (/details, /export/strategy).
+    A location is ("search_cache", normalized query) or (collection, None). SearchCache and
+    Database writes keep it current, so finding a product is a dict hit plus one keyed read
+    instead of walking every cached result list. Knowledge-base ids not seen by this process
+    fall back to Database.find_product, which is an indexed lookup on both backends.
+    """
+    _locations: dict = {}       # str(id) -> (source, key)
+    _cache_generation = None    # LocalStorage generation the search-cache part was built from
+    stats: dict = {"hits": 0, "misses": 0, "stale": 0, "rebuilds": 0}
+
+    @staticmethod
+    def _ids(item):
+        return [str(item[k]) for k in ("id", "_id") if item.get(k) is not None]
+
+    @classmethod
+    def add(cls, source: str, items, key: str = None):
+        """Points the ids of `items` at their location (the latest write wins)."""
+        for item in items:
+            if isinstance(item, dict):
+                for product_id in cls._ids(item):
+                    cls._locations[product_id] = (source, key)
+
+    @classmethod
+    def discard(cls, source: str, key: str = None, product_ids=None):
+        """Forgets ids still pointing at a removed location (all of them when product_ids is None)."""
+        location = (source, key)
+        if product_ids is None:
+            product_ids = [i for i, loc in cls._locations.items() if loc == location]
+        for product_id in product_ids:
+            if cls._locations.get(str(product_id)) == location:
+                del cls._locations[str(product_id)]
+
+    @classmethod
+    def _ensure_search_cache(cls):
+        """(Re)indexes the persisted search-cache results on first use or after another process wrote them."""
+        from backend.search_cache import SearchCache
+        from backend.shared_storage import LocalStorage
+
+        generation = LocalStorage.generation()
+        if generation == cls._cache_generation:
+            return
+        cls.discard_source("search_cache")
+        for entry in SearchCache.entries():
+            cls.add("search_cache", entry.get("results", []), SearchCache.normalize(entry.get("q", "")))
+        cls._cache_generation = generation
+        cls.stats["rebuilds"] += 1
+
+    @classmethod
+    def discard_source(cls, source: str):
+        cls._locations = {i: loc for i, loc in cls._locations.items() if loc[0] != source}
+
+    @classmethod
+    async def find(cls, product_id: str):
+        """The product with this `id` / `_id` from wherever it lives, or None."""
+        from backend.database import Database
+        from backend.search_cache import SearchCache
+
+        product_id = str(product_id)
+        cls._ensure_search_cache()
+        location = cls._locations.get(product_id)
+        if location is not None:
+            source, key = location
+            if source == "search_cache":
+                entry = SearchCache.peek(key)
+                product = next((p for p in (entry or {}).get("results", []) if product_id in cls._ids(p)), None)
+            else:
+                product = await Database.find_product(product_id, source)
+            if product:
+                cls.stats["hits"] += 1
+                return product
+            cls.stats["stale"] += 1
+            cls._locations.pop(product_id, None)
+
+        cls.stats["misses"] += 1
+        for collection_name in ("products", "watchlist"):
+            product = await Database.find_product(product_id, collection_name)
+            if product:
+                cls.add(collection_name, [product])
+                return product
+        return None
+
+    @classmethod
+    def get_stats(cls):
+        return {**cls.stats, "ids": len(cls._locations)}
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+import sys
+from collections import deque
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Upper bound for any readiness wait (replaces the fixed sleeps / 30s networkidle)
+READY_TIMEOUT_MS = int(os.getenv("SCRAPER_READY_TIMEOUT_MS", "8000"))
+# The card count must hold steady this long before the page counts as rendered
+STABLE_MS = int(os.getenv("SCRAPER_READY_STABLE_MS", "500"))
+
+# Recent runs (in-process scrapes only), newest last
+recent_runs = deque(maxlen=200)
+
+async def wait_for_cards(page, selector, engine, timeout_ms=READY_TIMEOUT_MS, stable_ms=STABLE_MS, poll_ms=150):
+    """
+    Waits on concrete readiness signals instead of a fixed sleep: the first product card
+    appearing, then the card count staying stable for `stable_ms`. Never waits past `timeout_ms`.
+    Returns (and records) the run's metrics, including time-to-first-card.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout_ms / 1000
+    metrics = {"engine": engine, "url": page.url, "time_to_first_card_ms": None, "cards": 0, "ready": False}
+
+    try:
+        await page.wait_for_selector(selector, state="attached", timeout=timeout_ms)
+        metrics["time_to_first_card_ms"] = round((loop.time() - started) * 1000)
+
+        last_count, stable_since = -1, loop.time()
+        while loop.time() < deadline:
+            count = await page.locator(selector).count()
+            if count != last_count:
+                last_count, stable_since = count, loop.time()
+            elif (loop.time() - stable_since) * 1000 >= stable_ms:
+                metrics["ready"] = True
+                break
+            await asyncio.sleep(poll_ms / 1000)
+        metrics["cards"] = max(last_count, 0)
+    except PlaywrightTimeoutError:
+        pass
+
+    metrics["waited_ms"] = round((loop.time() - started) * 1000)
+    recent_runs.append(metrics)
+    print(f"⏱️ Readiness: {json.dumps(metrics)}", file=sys.stderr)
+    return metrics
+
+def get_readiness_stats():
+    """Per-engine time-to-first-card summary over the recent in-process runs."""
+    summary = {}
+    for run in recent_runs:
+        engine = summary.setdefault(run["engine"], {"runs": 0, "ready": 0, "ttfc_ms": []})
+        engine["runs"] += 1
+        engine["ready"] += run["ready"]
+        if run["time_to_first_card_ms"] is not None:
+            engine["ttfc_ms"].append(run["time_to_first_card_ms"])
+
+    for engine in summary.values():
+        ttfc = sorted(engine.pop("ttfc_ms"))
+        engine["avg_time_to_first_card_ms"] = round(sum(ttfc) / len(ttfc)) if ttfc else None
+        engine["p95_time_to_first_card_ms"] = ttfc[int(len(ttfc) * 0.95)] if ttfc else None
+    return summary
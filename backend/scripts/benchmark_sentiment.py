@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to sys.path
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(root)
+
+from textblob import TextBlob
+from backend.ml_engine import MLEngine
+from backend.sentiment_lexicon import LexiconSentiment
+
+COLAB_DATA_PATH = os.path.join(root, "backend", "data", "colab_data.json")
+
+def textblob_score(title):
+    # The uncached TextBlob path of MLEngine.analyze_sentiment
+    return (TextBlob(title).sentiment.polarity + 1) / 2
+
+def run(name, score, titles, repeat):
+    """Scores every title `repeat` times. Returns per-title latencies (µs) and the scores."""
+    latencies, scores = [], []
+    for _ in range(repeat):
+        scores = []
+        for title in titles:
+            started = time.perf_counter()
+            scores.append(score(title))
+            latencies.append((time.perf_counter() - started) * 1e6)
+    total_s = sum(latencies) / 1e6
+    latencies.sort()
+    print(f"{name:<10} {len(latencies) / total_s:>12,.0f} titles/s"
+          f"   p50 {statistics.median(latencies):>8.1f}µs   p95 {latencies[int(len(latencies) * 0.95)]:>8.1f}µs")
+    return scores
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput, latency and score drift: lexicon vs TextBlob sentiment.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the titles per backend")
+    parser.add_argument("--show", type=int, default=5, help="Titles with the largest drift to print")
+    args = parser.parse_args()
+
+    with open(COLAB_DATA_PATH, "r", encoding="utf-8") as f:
+        titles = [p.get("title", "") for p in json.load(f) if p.get("title")]
+    print(f"📊 Sentiment benchmark over {len(titles)} colab_data.json titles (x{args.repeat})\n")
+
+    started = time.perf_counter()
+    LexiconSentiment.score("warm up")
+    print(f"Lexicon compile: {(time.perf_counter() - started) * 1000:.0f}ms (once per process)")
+    textblob_score("warm up")
+
+    baseline = run("textblob", textblob_score, titles, args.repeat)
+    fast = run("lexicon", LexiconSentiment.score, titles, args.repeat)
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        LexiconSentiment.score_many(titles)
+    print(f"{'batch':<10} {len(titles) * args.repeat / (time.perf_counter() - started):>12,.0f} titles/s   (score_many)")
+
+    # --- PARITY REPORT ---
+    drift = [abs(a - b) for a, b in zip(baseline, fast)]
+    labels_match = sum(MLEngine.label_sentiment(a)[0] == MLEngine.label_sentiment(b)[0] for a, b in zip(baseline, fast))
+    print(f"\nScore drift: mean {statistics.mean(drift):.4f}, max {max(drift):.4f}, "
+          f"identical {sum(d < 1e-9 for d in drift)}/{len(drift)}")
+    print(f"Label agreement: {labels_match}/{len(drift)}")
+    for d, title, a, b in sorted(zip(drift, titles, baseline, fast), reverse=True)[:args.show]:
+        if d >= 1e-9:
+            print(f"  Δ{d:.3f}  textblob={a:.3f} lexicon={b:.3f}  {title[:70]}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from backend.database import Database
+from backend.normalize import parse_reviews
 
 async def detect_emerging_trends():
     print("📈 PakPick AI: Trend Detection Engine")
@@ -33,7 +34,7 @@ async def detect_emerging_trends():
     for p in all_products:
         sentiment = p.get("sentiment_score", 0)
         pos = p.get("pos_score", 0)
-        reviews = int(str(p.get("reviews", "0")).replace("(", "").replace(")", "").strip() or 0)
+        reviews = parse_reviews(p.get("reviews"))
         
         # Heuristic for "Newly Introduced Trend"
         if sentiment > 0.8 and pos > 70 and reviews < 50:
@@ -57,7 +58,7 @@ async def detect_emerging_trends():
         for trend in emerging:
             trend["detected_at"] = datetime.now().isoformat()
             trend["trend_type"] = "Emerging"
-            await Database.save_product(trend, "emerging_trends")
+        await Database.save_products_many(emerging, "emerging_trends")
         print(f"💾 Saved {len(emerging)} trends to database.")
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(root)
+
+from backend.local_store import LocalStore, LEGACY_TINYDB_PATH, LOCAL_DB_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the legacy TinyDB local_storage.json into the SQLite local store.")
+    parser.add_argument("--source", default=LEGACY_TINYDB_PATH, help="TinyDB JSON file to import")
+    parser.add_argument("--force", action="store_true", help="Import again even if an import already ran")
+    args = parser.parse_args()
+
+    print("📥 PakPick AI: Local Storage Importer")
+    print("====================================")
+    store = LocalStore.shared()
+    started = time.perf_counter()
+    imported = store.import_tinydb(args.source, force=args.force)
+    if not imported:
+        print(f"✅ Nothing to import (already imported into {LOCAL_DB_PATH}, or {args.source} is missing). Use --force to re-run.")
+        return
+    print(f"✅ Imported {imported} into {LOCAL_DB_PATH} in {(time.perf_counter() - started) * 1000:.0f}ms")
+    for table in ("products", "emerging_trends", "watchlist"):
+        print(f"   {table}: {store.count(table)} documents")
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,300 @@
+import argparse
 import asyncio
-import os
+import hashlib
 import json
+import os
 import sys
+import time
+from datetime import datetime
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from backend.database import Database
+from backend.database import Database, BULK_BATCH_SIZE
+from backend.local_store import LocalStore
+
+CHECKPOINT_PATH = "backend/data/cloud_migration_checkpoint.json"
+RETRIES = 3
+
+class Source:
+    """
+    One local table to migrate: `batches(after, size)` yields (position, docs) in write order,
+    `lookup(key)` re-reads one document by its upsert `key` in Mongo and `count()` is the local total.
+    A `whole` source ignores positions and is sent in full on every run.
+    """
+    def __init__(self, name, key, batches, lookup, count, whole=False):
+        self.name = name
+        self.key = key
+        self.batches = batches
+        self.lookup = lookup
+        self.count = count
+        self.whole = whole
+
+    def key_of(self, doc):
+        return [doc.get(k) for k in self.key]
+
+def _keyset_batches(scan):
+    def batches(after, size):
+        # Position = (updated_at, rowid): documents upserted since the last run sort after it
+        after = tuple(after) if isinstance(after, (list, tuple)) else ("", 0)
+        while True:
+            rows = scan(after, size)
+            if not rows:
+                return
+            after = rows[-1][0]
+            yield list(after), [doc for _, doc in rows]
+    return batches
+
+def _search_cache_batches(after, size):
+    from backend.search_cache import SearchCache
+    # Always sent whole: extend/annotate rewrite entries but keep their timestamp (it drives
+    # expiry), so no position can tell what changed. The table holds at most a few hundred entries.
+    entries = sorted(SearchCache.entries(), key=lambda e: e.doc_id)
+    for i in range(0, len(entries), size):
+        chunk = entries[i:i + size]
+        yield chunk[-1].doc_id, [SearchCache.to_cloud(e) for e in chunk]
+
+def _search_cache_lookup(key):
+    from backend.search_cache import SearchCache
+    entry = SearchCache.peek(key[0])
+    return SearchCache.to_cloud(entry) if entry else None
+
+def sources(store):
+    from backend.search_cache import SearchCache
+    documents = {
+        name: Source(name, ("title", "platform"), _keyset_batches(lambda after, size, name=name: store.scan(name, after, size)),
+                     lambda key, name=name: store.get(name, *key), lambda name=name: store.count(name))
+        for name in ("products", "emerging_trends", "watchlist")
+    }
+    return {
+        **documents,
+        "search_cache": Source("search_cache", ("q",), _search_cache_batches, _search_cache_lookup,
+                               lambda: len(SearchCache.entries()), whole=True),
+        "system_metadata": Source("system_metadata", ("key",), _keyset_batches(store.scan_metadata),
+                                  lambda key: store.get_metadata(key[0]), store.count_metadata),
+    }
+
+def load_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_checkpoint(path, checkpoint):
+    # Atomic replace: an interrupted run never leaves a half-written checkpoint behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def write_batch(source, docs):
+    """Bulk upsert with retries on errors. Returns the counts, with the keys Cloud rejected as "failed"."""
+    for attempt in range(1, RETRIES + 1):
+        try:
+            counts = await Database._cloud_bulk_write(source.name, docs, key=source.key)
+            counts["failed"] = [source.key_of(docs[i]) for i in counts.get("failed", [])]
+            return counts
+        except Exception as e:
+            if attempt == RETRIES:
+                raise
+            print(f"   ⚠️ {source.name}: batch failed ({e}), retry {attempt}/{RETRIES - 1}")
+            await asyncio.sleep(attempt)
+
+async def migrate_collection(source, checkpoint, args):
+    """
+    Streams one table in batches to `args.workers` concurrent bulk writers. Batches can finish
+    out of order, so the checkpoint only advances over the contiguous prefix of finished ones.
+    Documents Cloud rejects are recorded in the checkpoint and retried first on the next run.
+    """
+    state = checkpoint.setdefault(source.name, {"offset": None, "migrated": 0})
+    state.setdefault("failed", [])
+    if source.whole:
+        # Sent in full again: progress counts this run only (rejected keys are still retried)
+        state.update(offset=None, migrated=0)
+    queue = asyncio.Queue(maxsize=args.workers * 2)
+    finished = {}               # batch number -> (end position, size)
+    watermark = {"next": 0}     # first batch number not yet covered by the checkpoint
+    stats = {"docs": 0, "batches": 0, "inserted": 0, "updated": 0, "errors": 0, "retried": 0}
+    started = time.perf_counter()
+
+    def record(counts, docs):
+        for k in ("inserted", "updated", "errors"):
+            stats[k] += counts.get(k, 0)
+        stats["docs"] += len(docs)
+        stats["batches"] += 1
+        for key in counts["failed"]:
+            if key not in state["failed"]:
+                state["failed"].append(key)
+
+    async def produce():
+        number = 0
+        for end, docs in source.batches(state["offset"], args.batch_size):
+            await queue.put((number, end, docs))
+            number += 1
+        for _ in range(args.workers):
+            await queue.put(None)
 
-async def migrate_data():
+    async def write():
+        while (item := await queue.get()) is not None:
+            number, end, docs = item
+            record(await write_batch(source, docs), docs)
+            finished[number] = (end, len(docs))
+            advanced = False
+            while watermark["next"] in finished:
+                end_offset, size = finished.pop(watermark["next"])
+                state["offset"] = end_offset
+                state["migrated"] += size
+                watermark["next"] += 1
+                advanced = True
+            if advanced:
+                state["updated_at"] = datetime.now().isoformat()
+                save_checkpoint(args.checkpoint, checkpoint)
+
+    try:
+        # Writes rejected on an earlier run (their current local version; deleted ones are dropped)
+        retry = [doc for doc in (source.lookup(key) for key in state["failed"]) if doc is not None]
+        state["failed"] = []
+        if retry:
+            stats["retried"] = len(retry)
+            record(await write_batch(source, retry), retry)
+        save_checkpoint(args.checkpoint, checkpoint)
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(write()) for _ in range(args.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        # Rejected keys are kept even when the run stops early
+        save_checkpoint(args.checkpoint, checkpoint)
+        stats["seconds"] = time.perf_counter() - started
+    stats["rejected"] = len(state["failed"])
+    return stats
+
+def _digest(key, doc):
+    body = json.dumps({k: v for k, v in doc.items() if k != "_id"}, sort_keys=True, default=str)
+    return int(hashlib.sha1(f"{key}|{body}".encode()).hexdigest()[:16], 16)
+
+async def verify_collection(source, batch_size):
+    """
+    Compares every local document with its cloud counterpart (matched on the upsert key, over
+    the fields the local copy has). The checksums are an order-independent XOR of per-document
+    hashes, so they are equal exactly when no document is missing or different.
+    """
+    collection = Database.db[source.name]
+    report = {"local": 0, "cloud": await collection.count_documents({}), "missing": 0, "mismatched": 0,
+              "local_checksum": 0, "cloud_checksum": 0, "examples": []}
+    for _, docs in source.batches(None, batch_size):
+        keys = [tuple(doc.get(k) for k in source.key) for doc in docs]
+        cloud_docs = {}
+        async for doc in collection.find({"$or": [dict(zip(source.key, key)) for key in keys]}):
+            cloud_docs[tuple(doc.get(k) for k in source.key)] = doc
+        for key, doc in zip(keys, docs):
+            report["local"] += 1
+            local_hash = _digest(key, doc)
+            report["local_checksum"] ^= local_hash
+            cloud_doc = cloud_docs.get(key)
+            if cloud_doc is None:
+                report["missing"] += 1
+            else:
+                cloud_hash = _digest(key, {k: cloud_doc.get(k) for k in doc if k != "_id"})
+                report["cloud_checksum"] ^= cloud_hash
+                if cloud_hash == local_hash:
+                    continue
+                report["mismatched"] += 1
+            if len(report["examples"]) < 5:
+                report["examples"].append(list(key))
+    report["local_checksum"] = f"{report['local_checksum']:016x}"
+    report["cloud_checksum"] = f"{report['cloud_checksum']:016x}"
+    report["ok"] = report["missing"] == 0 and report["mismatched"] == 0
+    return report
+
+async def migrate_data(args):
+    try:
+        return await _migrate(args)
+    finally:
+        await Database.close()
+
+async def _migrate(args):
     print("🚀 PakPick AI: Cloud Migration Utility")
     print("======================================")
-    
+
     # Connect (this will detect if MongoDB is available)
     await Database.connect_db()
-    
-    if Database.mode == "Local (Permanent Fix)":
+
+    if Database.db is None:
         print("⚠️ MongoDB NOT connected/detected. Local mode is active.")
         print("⚠️ Migration aborted. Please set your MONGO_URI in .env first.")
-        return
+        return False
 
-    print(f"📡 MongoDB Connected. Starting ingestion from local storage...")
-    
-    local_path = 'backend/data/local_storage.json'
-    if not os.path.exists(local_path):
-        print("❌ Local storage file not found. Nothing to migrate.")
-        return
+    store = LocalStore.shared()
+    # Data still only in the legacy TinyDB file is brought over first
+    store.import_tinydb()
+    available = sources(store)
+    selected = args.collections or list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        print(f"❌ Unknown collections: {', '.join(unknown)} (choose from {', '.join(available)})")
+        return False
 
-    try:
-        from tinydb import TinyDB
-        local_db = TinyDB(local_path)
-        
-        # 1. Migrate MAIN products
-        products = local_db.table('products').all()
-        print(f"📦 Found {len(products)} products locally.")
-        for p in products:
-            # save_product automatically favors Cloud if connected
-            await Database.save_product(p, "products")
-            
-        # 2. Migrate TRENDS
-        trends = local_db.table('emerging_trends').all()
-        print(f"📦 Found {len(trends)} trends locally.")
-        for t in trends:
-            await Database.save_product(t, "emerging_trends")
-            
+    checkpoint = {} if args.reset else load_checkpoint(args.checkpoint)
+    if checkpoint:
+        print(f"↩️ Resuming from {args.checkpoint} (use --reset to start over)")
+    print(f"📡 MongoDB Connected. Migrating with {args.workers} writers, batches of {args.batch_size}...")
+
+    ok = True
+    if not args.verify_only:
+        total_docs, started = 0, time.perf_counter()
+        for name in selected:
+            source = available[name]
+            try:
+                stats = await migrate_collection(source, checkpoint, args)
+            except Exception as e:
+                print(f"❌ {name}: migration stopped ({e}). Progress is saved, run again to resume.")
+                return False
+            total_docs += stats["docs"]
+            rate = stats["docs"] / stats["seconds"] if stats["seconds"] else 0
+            print(f"   ⚡ {name}: {stats['docs']} docs in {stats['batches']} batches, {stats['seconds']:.1f}s "
+                  f"({rate:.0f} docs/s; {stats['inserted']} new, {stats['updated']} updated"
+                  f"{', ' + str(stats['retried']) + ' retried' if stats['retried'] else ''}; "
+                  f"{source.count()} local)")
+            if stats["rejected"]:
+                ok = False
+                print(f"   ❌ {name}: Cloud rejected {stats['rejected']} documents (kept in the checkpoint, "
+                      f"retried on the next run), e.g. {checkpoint[name]['failed'][:3]}")
+        elapsed = time.perf_counter() - started
+        print(f"📦 Migrated {total_docs} documents in {elapsed:.1f}s ({total_docs / elapsed if elapsed else 0:.0f} docs/s)")
+
+    if not args.no_verify:
+        print("🔍 Verifying counts and checksums...")
+        for name in selected:
+            report = await verify_collection(available[name], args.batch_size)
+            ok = ok and report["ok"]
+            status = "✅" if report["ok"] else "❌"
+            print(f"   {status} {name}: local {report['local']}, cloud {report['cloud']}, missing {report['missing']}, "
+                  f"mismatched {report['mismatched']}, checksum {report['local_checksum']}/{report['cloud_checksum']}")
+            if report["examples"]:
+                print(f"      e.g. {report['examples']}")
+
+    if ok:
         print("✅ Migration Complete! Your Cloud Database is now in sync.")
-        
-    except Exception as e:
-        print(f"❌ Migration Error: {e}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the local store (SQLite + search cache) to MongoDB Atlas, resumably.")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="Documents per bulk write")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent bulk writers")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Progress file used to resume")
+    parser.add_argument("--reset", action="store_true", help="Ignore saved progress and migrate everything again")
+    parser.add_argument("--verify-only", action="store_true", help="Only compare local and cloud data")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the count/checksum verification")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(migrate_data(args)) else 1)
 
 if __name__ == "__main__":
-    asyncio.run(migrate_data())
+    main()
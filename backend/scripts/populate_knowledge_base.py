@@ -66,7 +66,7 @@ async def main():
         await asyncio.sleep(1)
 
     print("\n🎉 Bulk Ingestion Complete!")
-    print("The local TinyDB is now populated with real market data.")
+    print("The local knowledge base (SQLite) is now populated with real market data.")
     print("MLEngine will now prioritize these cached real results over mock data.")
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add the project root to sys.path
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(root)
+
+from backend.ml_engine import MLEngine
+from backend.normalize import normalize_record
+from backend.sentiment_cache import SentimentCache
+
+COLAB_DATA_PATH = os.path.join(root, "backend", "data", "colab_data.json")
+
+def check_parity(products, scores):
+    """Compares the batch scores against the scalar MLEngine functions. Returns the mismatch count."""
+    mismatches = 0
+    for product, score in zip(products, scores):
+        expected = {
+            "pos_score": MLEngine.calculate_pos_score(product["price"], product["reviews"], score["sentiment_score"]),
+            "estimated_monthly_sales": MLEngine.estimate_sales(product["reviews"], variation=1.0),
+            "profit_estimate": MLEngine.calculate_profit(product["price"]),
+        }
+        for key, value in expected.items():
+            if score[key] != value:
+                mismatches += 1
+                print(f"❌ {product.get('title', '')[:40]}: {key} batch={score[key]} scalar={value}")
+    return mismatches
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk re-score the colab catalog (or the knowledge base) in one batch pass.")
+    parser.add_argument("--db", action="store_true", help="Re-score the knowledge base products and save them back")
+    parser.add_argument("--check", action="store_true", help="Verify parity with the scalar scoring functions")
+    args = parser.parse_args()
+
+    if args.db:
+        from backend.database import Database
+        await Database.connect_db()
+        products = await Database.get_products("products") or []
+    else:
+        with open(COLAB_DATA_PATH, "r", encoding="utf-8") as f:
+            products = json.load(f)
+    products = [normalize_record(p) for p in products]
+    print(f"📦 Re-scoring {len(products)} products...")
+
+    started = time.perf_counter()
+    sentiments = MLEngine.analyze_sentiments([p.get("title", "") for p in products])
+    SentimentCache.save()
+    print(f"🧠 Sentiment: {(time.perf_counter() - started) * 1000:.1f}ms ({SentimentCache.get_stats()['hit_rate']:.0%} cached)")
+
+    started = time.perf_counter()
+    for p, s in zip(products, sentiments):
+        MLEngine.calculate_pos_score(p["price"], p["reviews"], s)
+        MLEngine.estimate_sales(p["reviews"])
+        MLEngine.calculate_profit(p["price"])
+    scalar_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    scores = MLEngine.score_batch(products, sentiments, variation=1.0 if args.check else None)
+    batch_ms = (time.perf_counter() - started) * 1000
+    print(f"⏱️ Scalar loop: {scalar_ms:.1f}ms | Batch: {batch_ms:.1f}ms")
+
+    if args.check:
+        mismatches = check_parity(products, scores)
+        print("✅ Batch scores match the scalar functions" if not mismatches else f"⚠️ {mismatches} mismatches")
+
+    if args.db:
+        # Saves the scores computed above instead of scoring everything again
+        await Database.save_products_many(MLEngine.rescore_products(products, scores))
+        print(f"🏁 Saved {len(products)} re-scored products to {Database.mode}.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,269 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from tinydb import Query
+
+from backend.product_index import ProductIndex
+from backend.shared_storage import LocalStorage
+
+CACHE_TABLE = "search_cache"
+
+class SearchCache:
+    """
+    Two-tier cache in front of the /search pipeline.
+    Tier 1: bounded in-process LRU keyed by the normalized query (microsecond hits).
+    Tier 2: the persistent `search_cache` table in local storage (survives restarts).
+
+    Entries carry two expiries: past `soft_ttl` they are stale (served, but revalidated
+    in the background); past `ttl` (hard) they are dropped and treated as a miss.
+    """
+    max_memory_entries: int = int(os.getenv("SEARCH_CACHE_MEMORY_ENTRIES", "256"))
+    max_disk_entries: int = int(os.getenv("SEARCH_CACHE_DISK_ENTRIES", "500"))
+    max_results_per_entry: int = int(os.getenv("SEARCH_CACHE_MAX_RESULTS", "50"))
+    default_ttl: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    default_soft_ttl: int = int(os.getenv("SEARCH_CACHE_SOFT_TTL_SECONDS", str(6 * 3600)))
+    prediction_ttl: int = int(os.getenv("SEARCH_CACHE_PREDICTION_TTL_SECONDS", "300"))
+    # Minimum gap between background re-scrapes of one query (scrapers that keep returning
+    # nothing would otherwise be re-run on every request for a stale or predicted entry)
+    revalidate_cooldown: int = int(os.getenv("SEARCH_CACHE_REVALIDATE_COOLDOWN_SECONDS", "120"))
+
+    _memory: OrderedDict = OrderedDict()
+    _revalidated_at: dict = {}  # normalized query -> monotonic time of the last background re-scrape
+    stats: dict = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "expired": 0,
+                   "evictions": 0, "revalidations": 0, "revalidations_skipped": 0}
+
+    @staticmethod
+    def normalize(q: str) -> str:
+        """Cache key: lowercase with collapsed whitespace, so 'Smart  Watch ' == 'smart watch'."""
+        return " ".join(str(q).lower().split())
+
+    @classmethod
+    def _get_store(cls):
+        # The process-wide local_storage.json handle (cached, batched and lock-protected writes)
+        return LocalStorage.table(CACHE_TABLE)
+
+    @classmethod
+    def peek(cls, key: str):
+        """The entry for a normalized query regardless of expiry, without touching stats or LRU order."""
+        hit = cls._memory.get(key)
+        if hit:
+            return hit[0]
+        doc = cls._get_store().get(Query().q == key)
+        return dict(doc) if doc else None
+
+    @classmethod
+    def entries(cls):
+        """Every persisted entry (served from the shared in-memory copy of the file)."""
+        return cls._get_store().all()
+
+    @staticmethod
+    def _created_at(entry) -> float:
+        try:
+            return datetime.fromisoformat(entry.get("timestamp")).timestamp()
+        except (TypeError, ValueError):
+            return 0
+
+    @classmethod
+    def _expires_at(cls, entry) -> float:
+        """Absolute hard expiry (epoch seconds). Legacy entries without a ttl use the default."""
+        created = cls._created_at(entry)
+        return created + entry.get("ttl", cls.default_ttl) if created else 0
+
+    @classmethod
+    def to_cloud(cls, entry) -> dict:
+        """
+        The entry as stored in Mongo: adds `expires_at` as a UTC Date (millisecond precision, like
+        BSON) so the collection's TTL index drops it at the same hard expiry as the local tiers.
+        """
+        expires_at = int(cls._expires_at(entry) * 1000)
+        return {**entry, "expires_at": datetime.fromtimestamp(expires_at / 1000, timezone.utc).replace(tzinfo=None)}
+
+    @classmethod
+    def age(cls, entry) -> float:
+        """Seconds since the entry was written."""
+        return max(time.time() - cls._created_at(entry), 0)
+
+    @classmethod
+    def is_stale(cls, entry) -> bool:
+        """True once the entry is past its soft expiry and should be refreshed."""
+        return cls.age(entry) >= entry.get("soft_ttl", cls.default_soft_ttl)
+
+    @classmethod
+    def claim_revalidation(cls, q: str) -> bool:
+        """True (and starts the cooldown) when a stale query may be re-scraped now."""
+        key = cls.normalize(q)
+        now = time.monotonic()
+        if now - cls._revalidated_at.get(key, -cls.revalidate_cooldown) < cls.revalidate_cooldown:
+            cls.stats["revalidations_skipped"] += 1
+            return False
+        if len(cls._revalidated_at) >= cls.max_disk_entries:
+            cls._revalidated_at = {k: t for k, t in cls._revalidated_at.items() if now - t < cls.revalidate_cooldown}
+        cls._revalidated_at[key] = now
+        cls.stats["revalidations"] += 1
+        return True
+
+    @classmethod
+    def _remember(cls, key, entry):
+        cls._memory[key] = (entry, cls._expires_at(entry))
+        cls._memory.move_to_end(key)
+        while len(cls._memory) > cls.max_memory_entries:
+            cls._memory.popitem(last=False)
+            cls.stats["evictions"] += 1
+
+    @classmethod
+    def get(cls, q: str):
+        """Returns the cached entry for a query (fresh or stale), or None on miss/hard expiry."""
+        key = cls.normalize(q)
+        now = time.time()
+
+        # Tier 1: In-process LRU
+        hit = cls._memory.get(key)
+        if hit:
+            entry, expires_at = hit
+            if expires_at > now:
+                cls._memory.move_to_end(key)
+                cls.stats["hits"] += 1
+                cls.stats["memory_hits"] += 1
+                cls.stats["stale_hits"] += cls.is_stale(entry)
+                return entry
+            del cls._memory[key]
+            cls.stats["expired"] += 1
+
+        # Tier 2: Persistent table (another worker may have refreshed it)
+        doc = cls._get_store().get(Query().q == key)
+        if doc:
+            entry = dict(doc)
+            if cls._expires_at(entry) > now:
+                cls._remember(key, entry)
+                cls.stats["hits"] += 1
+                cls.stats["disk_hits"] += 1
+                cls.stats["stale_hits"] += cls.is_stale(entry)
+                return entry
+            cls.stats["expired"] += 1
+
+        cls.stats["misses"] += 1
+        return None
+
+    @classmethod
+    def put(cls, q: str, results, ttl: int = None, soft_ttl: int = None, market: dict = None):
+        """
+        Writes results through both tiers, atomically replacing any previous entry for the query.
+        `market` is the query-level competition analysis, cached alongside the results.
+        """
+        key = cls.normalize(q)
+        entry = {
+            "q": key,
+            "results": results[:cls.max_results_per_entry],
+            "timestamp": datetime.now().isoformat(),
+            "ttl": ttl if ttl is not None else cls.default_ttl,
+            "soft_ttl": soft_ttl if soft_ttl is not None else cls.default_soft_ttl,
+        }
+        if market is not None:
+            entry["market"] = market
+        cls._remember(key, entry)
+
+        table = cls._get_store()
+        table.upsert(entry, Query().q == key)
+        ProductIndex.add(CACHE_TABLE, entry["results"], key)
+
+        # Size limit for the persistent tier: drop the oldest entries
+        docs = table.all()
+        overflow = len(docs) - cls.max_disk_entries
+        if overflow > 0:
+            oldest = sorted(docs, key=lambda d: d.get("timestamp", ""))[:overflow]
+            table.remove(doc_ids=[d.doc_id for d in oldest])
+            for d in oldest:
+                ProductIndex.discard(CACHE_TABLE, cls.normalize(d.get("q", "")), cls._result_ids(d))
+            cls.stats["evictions"] += overflow
+        return entry
+
+    @classmethod
+    def extend(cls, q: str, results):
+        """
+        Merges late-arriving results into an existing entry, keeping its timestamp and expiry.
+        Entries holding only AI placeholder results are replaced instead.
+        """
+        key = cls.normalize(q)
+        hit = cls._memory.get(key)
+        if hit:
+            existing = hit[0]
+        else:
+            doc = cls._get_store().get(Query().q == key)
+            existing = dict(doc) if doc else None
+
+        if not existing or all(r.get("is_prediction") for r in existing.get("results", [])):
+            return cls.put(q, results)
+
+        seen = {(r.get("title"), r.get("platform")) for r in existing["results"]}
+        merged = existing["results"] + [r for r in results if (r.get("title"), r.get("platform")) not in seen]
+        entry = {**existing, "results": merged[:cls.max_results_per_entry]}
+        cls._remember(key, entry)
+        cls._get_store().upsert(entry, Query().q == key)
+        ProductIndex.add(CACHE_TABLE, entry["results"], key)
+        return entry
+
+    @classmethod
+    def annotate(cls, q: str, **fields):
+        """Updates fields of an existing entry (e.g. a recomputed `market`), keeping its timestamp and expiry."""
+        key = cls.normalize(q)
+        hit = cls._memory.get(key)
+        if hit:
+            existing = hit[0]
+        else:
+            doc = cls._get_store().get(Query().q == key)
+            existing = dict(doc) if doc else None
+        if not existing:
+            return None
+
+        entry = {**existing, **fields}
+        cls._remember(key, entry)
+        cls._get_store().upsert(entry, Query().q == key)
+        if "results" in fields:
+            ProductIndex.add(CACHE_TABLE, entry["results"], key)
+        return entry
+
+    @classmethod
+    def invalidate(cls, q: str = None):
+        """Drops one query (or everything when q is None) from both tiers."""
+        if q is None:
+            removed = len(cls._get_store())
+            cls._memory.clear()
+            cls._get_store().truncate()
+            ProductIndex.discard_source(CACHE_TABLE)
+            return removed
+
+        key = cls.normalize(q)
+        cls._memory.pop(key, None)
+        entry = cls._get_store().get(Query().q == key)
+        if entry:
+            ProductIndex.discard(CACHE_TABLE, key, cls._result_ids(entry))
+        return len(cls._get_store().remove(Query().q == key))
+
+    @staticmethod
+    def _result_ids(entry):
+        return [str(r[k]) for r in entry.get("results", []) for k in ("id", "_id") if r.get(k) is not None]
+
+    @classmethod
+    def warm(cls):
+        """Loads the most recent persistent entries into memory (one file parse at startup)."""
+        docs = sorted(cls._get_store().all(), key=lambda d: d.get("timestamp", ""))
+        now = time.time()
+        for doc in docs[-cls.max_memory_entries:]:
+            entry = dict(doc)
+            if cls._expires_at(entry) > now:
+                cls._remember(cls.normalize(entry.get("q", "")), entry)
+        return len(cls._memory)
+
+    @classmethod
+    def get_stats(cls):
+        lookups = cls.stats["hits"] + cls.stats["misses"]
+        return {
+            **cls.stats,
+            "hit_rate": round(cls.stats["hits"] / lookups, 3) if lookups else 0,
+            "memory_entries": len(cls._memory),
+            "max_memory_entries": cls.max_memory_entries,
+            "max_disk_entries": cls.max_disk_entries,
+            "default_ttl_seconds": cls.default_ttl,
+            "default_soft_ttl_seconds": cls.default_soft_ttl,
+        }
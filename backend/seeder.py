@@ -2,6 +2,7 @@ import json
 import os
 import asyncio
 from backend.database import Database
+from backend.normalize import normalize_record
 
 COLAB_DATA_PATH = "backend/data/colab_data.json"
 
@@ -20,10 +21,10 @@ async def sync_colab_data(force=False):
     if Database.mode == "Disconnected":
         await Database.connect_db()
 
-    # Check if we already have products
-    existing_products = await Database.get_products()
-    if len(existing_products) > 0 and not force:
-        print(f"✅ Data Seeder: Database already has {len(existing_products)} items. Skipping sync.")
+    # Check if we already have products (one document is enough to know)
+    existing_products = await Database.get_products(fields=["title"], limit=1)
+    if existing_products and not force:
+        print("✅ Data Seeder: Database already has products. Skipping sync.")
         return
 
     try:
@@ -32,15 +33,13 @@ async def sync_colab_data(force=False):
         
         print(f"📦 Data Seeder: Found {len(products)} products in colab_data.json. Syncing...")
         
+        # Basic validation
+        valid = [normalize_record(p) for p in products if "title" in p and "platform" in p]
+        # Save to database in bulk batches (handling both Cloud/Local via Database class)
         count = 0
-        for product in products:
-            # Basic validation
-            if "title" in product and "platform" in product:
-                # Save to database (handling both Cloud/Local via Database class)
-                await Database.save_product(product)
-                count += 1
-                if count % 100 == 0:
-                    print(f"⚡ Synced {count}/{len(products)} products...")
+        for batch in await Database.save_products_many(valid):
+            count += batch["size"]
+            print(f"⚡ Synced {count}/{len(valid)} products ({batch['target']}: {batch['inserted']} new, {batch['updated']} updated)...")
 
         print(f"🏁 Data Seeder: Successfully synced {count} products to {Database.mode}.")
     except Exception as e:
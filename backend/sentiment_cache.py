@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "backend/data/sentiment_cache.json")
+
+class SentimentCache:
+    """
+    Memoizes title sentiment (TextBlob is the most expensive per-item CPU step, and titles
+    barely change between searches). Keyed by a hash of the normalized title, bounded with
+    LRU eviction, and persisted to a JSON file so scores survive restarts.
+    """
+    max_entries: int = int(os.getenv("SENTIMENT_CACHE_ENTRIES", "50000"))
+    # Unsaved entries that trigger a write to disk (the rest are saved on shutdown)
+    flush_every: int = int(os.getenv("SENTIMENT_CACHE_FLUSH_EVERY", "500"))
+
+    _memory: OrderedDict = OrderedDict()
+    _loaded: bool = False
+    _dirty: int = 0
+    stats: dict = {"hits": 0, "misses": 0, "evictions": 0, "saves": 0}
+
+    @staticmethod
+    def key(title: str) -> str:
+        """Lowercase, collapsed whitespace (incl. the \\xa0 Daraz titles carry), hashed to 16 hex chars."""
+        normalized = " ".join(str(title).lower().split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def load(cls):
+        """Reads the persisted scores into memory (once per process)."""
+        if cls._loaded:
+            return len(cls._memory)
+        cls._loaded = True
+        try:
+            with open(SENTIMENT_CACHE_PATH, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        # The file is written oldest-first, so the newest entries survive the bound
+        for k, score in list(entries.items())[-cls.max_entries:]:
+            cls._memory[k] = score
+        return len(cls._memory)
+
+    @classmethod
+    def save(cls):
+        """Writes the cache to disk atomically (temp file + rename)."""
+        if not cls._dirty:
+            return
+        os.makedirs(os.path.dirname(SENTIMENT_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{SENTIMENT_CACHE_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cls._memory, f)
+        os.replace(tmp_path, SENTIMENT_CACHE_PATH)
+        cls._dirty = 0
+        cls.stats["saves"] += 1
+
+    @classmethod
+    def get(cls, title: str):
+        if not cls._loaded:
+            cls.load()
+        k = cls.key(title)
+        score = cls._memory.get(k)
+        if score is None:
+            cls.stats["misses"] += 1
+            return None
+        cls._memory.move_to_end(k)
+        cls.stats["hits"] += 1
+        return score
+
+    @classmethod
+    def put(cls, title: str, score: float):
+        k = cls.key(title)
+        cls._memory[k] = score
+        cls._memory.move_to_end(k)
+        while len(cls._memory) > cls.max_entries:
+            cls._memory.popitem(last=False)
+            cls.stats["evictions"] += 1
+
+        cls._dirty += 1
+        if cls._dirty >= cls.flush_every:
+            try:
+                cls.save()
+            except OSError as e:
+                print(f"⚠️ Sentiment cache save failed: {e}")
+
+    @classmethod
+    def get_stats(cls):
+        lookups = cls.stats["hits"] + cls.stats["misses"]
+        return {
+            **cls.stats,
+            "hit_rate": round(cls.stats["hits"] / lookups, 3) if lookups else 0,
+            "entries": len(cls._memory),
+            "max_entries": cls.max_entries,
+            "unsaved": cls._dirty,
+        }
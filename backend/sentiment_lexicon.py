@@ -0,0 +1,116 @@
+import os
+import re
+from xml.etree import ElementTree
+
+import textblob
+
+# TextBlob's own polarity lexicon (the one its PatternAnalyzer loads), so scores stay comparable
+LEXICON_PATH = os.path.join(os.path.dirname(textblob.__file__), "en", "en-sentiment.xml")
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+# TextBlob's tokenizer splits punctuation off the ends of whitespace-separated words only
+PUNCTUATION = ".,;:!?()[]{}`'\"@#$^&*+-|=~_"
+# ...and it splits every quote/apostrophe into its own token, so "isn't" never reads as a negation
+_QUOTES = re.compile(r"['\"\u2018\u2019\u201c\u201d]")
+
+def _avg(values):
+    return sum(values) / len(values) if values else 0.0
+
+class LexiconSentiment:
+    """
+    Fast sentiment backend: TextBlob's polarity lexicon precompiled once into a flat
+    word -> (polarity, intensity, is_modifier) dict, scored with the same negation /
+    modifier / exclamation rules as PatternAnalyzer but without building TextBlob
+    objects or running the tagger. Emoticon and sarcasm handling is skipped (product
+    titles carry neither).
+    """
+    _lexicon: dict = None
+
+    @classmethod
+    def _compile(cls):
+        senses = {}
+        for node in ElementTree.parse(LEXICON_PATH).getroot().findall("word"):
+            form = node.attrib.get("form")
+            if form:
+                psi = (float(node.attrib.get("polarity", 0.0)), float(node.attrib.get("intensity", 1.0)))
+                senses.setdefault(form, {}).setdefault(node.attrib.get("pos"), []).append(psi)
+
+        # Average the senses per part-of-speech tag, then across tags (as PatternAnalyzer does)
+        words = {}
+        for form, by_pos in senses.items():
+            per_pos = {pos: tuple(_avg(v) for v in zip(*psi)) for pos, psi in by_pos.items()}
+            words[form] = (*(_avg(v) for v in zip(*per_pos.values())), "RB" in per_pos)
+
+        # TextBlob maps adjectives onto their adverbs ("terrible" -> "terribly")
+        for form, by_pos in senses.items():
+            if "JJ" in by_pos:
+                stem = form[:-1] + "i" if form.endswith("y") else form
+                stem = stem[:-2] if stem.endswith("le") else stem
+                p, i = (_avg(v) for v in zip(*by_pos["JJ"]))
+                words[stem + "ly"] = (p, i, True)
+
+        cls._lexicon = words
+        return words
+
+    @staticmethod
+    def tokenize(text: str):
+        tokens = []
+        for chunk in _QUOTES.sub(" ", text.lower()).split():
+            word = chunk.strip(PUNCTUATION)
+            if word:
+                tokens.append(word)
+            # Trailing exclamation marks boost the previous word
+            tokens.extend("!" * chunk[len(chunk.rstrip(PUNCTUATION)):].count("!"))
+        return tokens
+
+    @classmethod
+    def polarity(cls, text: str) -> float:
+        """Polarity in -1..1 for one title (PatternAnalyzer's `assessments` rules, untagged)."""
+        lexicon = cls._lexicon or cls._compile()
+        scores = []  # [polarity, intensity, negated] per assessed word
+        modifier = negation = None
+        for w in cls.tokenize(text):
+            entry = lexicon.get(w)
+            if entry is not None:
+                p, i, is_modifier = entry
+                if modifier is None:
+                    scores.append([p, i, False])
+                else:
+                    # Known word preceded by a modifier ("really good")
+                    last = scores[-1]
+                    last[0] = max(-1.0, min(p * last[1], 1.0))
+                    last[1] = i
+                if negation is not None:
+                    scores[-1][1] = 1.0 / scores[-1][1] if scores[-1][1] else 0.0
+                    scores[-1][2] = True
+                modifier = w if is_modifier else None
+                negation = w if w in NEGATIONS else None
+            else:
+                if w in NEGATIONS:
+                    negation = w
+                elif negation and len(w.strip("'")) > 1:
+                    negation = None
+                if negation is not None and modifier is not None and modifier.endswith("ly"):
+                    # "really not good"
+                    scores[-1][2] = True
+                    negation = None
+                elif modifier and len(w) > 2:
+                    modifier = None
+                if w == "!" and scores:
+                    scores[-1][0] = max(-1.0, min(scores[-1][0] * 1.25, 1.0))
+
+        if not scores:
+            return 0.0
+        # "not good" = slightly bad, "not bad" = slightly good
+        return sum(p * -0.5 if negated else p for p, _, negated in scores) / len(scores)
+
+    @classmethod
+    def score(cls, text: str) -> float:
+        """Sentiment in 0..1, the same scale as MLEngine.analyze_sentiment."""
+        return (cls.polarity(text) + 1) / 2
+
+    @classmethod
+    def score_many(cls, texts):
+        """Batch scoring; empty/"Unknown" titles get the neutral 0.5 like the TextBlob path."""
+        score = cls.score
+        return [score(t) if t and t != "Unknown" else 0.5 for t in texts]
@@ -1,88 +1,106 @@
 import asyncio
 import json
+import os
 import sys
 import random
 from duckduckgo_search import DDGS
 
+# Add the project root to sys.path (this file also runs as a standalone script)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.normalize import find_price
+
+# Stop waiting for the remaining site queries once this many results carry a real price
+ENOUGH_PRICED_RESULTS = int(os.getenv("SERP_ENOUGH_PRICED_RESULTS", "10"))
+
+# One client (and its keep-alive connections) shared by every query and request in this process
+_ddgs: DDGS = None
+
+def get_ddgs():
+    global _ddgs
+    if _ddgs is None:
+        _ddgs = DDGS()
+    return _ddgs
+
+def parse_serp_results(keyword, search_results):
+    """Turns raw search hits into product items (price extraction, platform detection)."""
+    results = []
+    for res in search_results or []:
+        title = res.get('title', '')
+        body = res.get('body', '')
+        link = res.get('href', '')
+
+        # --- PRICE EXTRACTION LOGIC ---
+        price = find_price(title) or find_price(body)
+
+        # Filter out garbage results
+        if price == 0:
+            # Try validation by keywords
+            if not any(k in title.lower() for k in keyword.lower().split()):
+                continue
+
+        # Determine platform
+        platform = "Web"
+        if "daraz" in link: platform = "Daraz"
+        elif "markaz" in link: platform = "Markaz"
+        elif "telemart" in link: platform = "Telemart"
+
+        # Fallback for image (Generic placeholders based on keyword if needed,
+        # but better to handle on frontend or use a reliable service)
+        # SERP results don't give images easily without API.
+        # We will use a reliable high-res image service based on keyword hash.
+        img_hash = hash(title) % 10
+        image = f"https://images.unsplash.com/photo-155{img_hash}1288049-bebda4e38f71?w=400&q=80"
+        if "earbud" in keyword: image = "https://images.unsplash.com/photo-1590658268037-6bf12165a8df?w=400"
+        if "watch" in keyword: image = "https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=400"
+
+        results.append({
+            "title": title.replace(" | Daraz.pk", "").replace(" - Markaz", "").strip(),
+            "price": price if price > 0 else random.randint(1500, 5000),
+            "platform": platform,
+            "image": image, # Still using placeholders for SERP as it doesn't give direct product images
+            "link": link,
+            "rating": round(random.uniform(3.8, 4.8), 1),
+            "reviews": random.randint(2, 45), # Search indices usually reflect popular items
+            "growth": f"+{random.randint(2,12)}%",
+            "pos": random.randint(55, 75),
+            "is_aggregated": True,
+            "has_real_price": price > 0
+        })
+    return results
+
 async def scrape_serp(keyword):
     """
     Search Engine Results Page (SERP) Scraper.
     Queries various search engines to find product data from target platforms
     without hitting their bot protections directly.
+    The site queries run concurrently in worker threads (DDGS is synchronous), so the
+    event loop is never blocked.
     """
     results = []
-    
+
     # Target Platforms
     queries = [
         f"site:daraz.pk {keyword} price in pakistan",
         f"site:markaz.pk {keyword}",
         f"site:telemart.pk {keyword} price"
     ]
-    
+
+    def run_query(q):
+        print(f"📡 SERP Query: {q}", file=sys.stderr)
+        # 'wt-wt' is for "No Region" (Works best generally), or use 'pk-pk' for Pakistan specific
+        try:
+            return get_ddgs().text(q, region='pk-pk', max_results=8)
+        except Exception as e:
+            print(f"SERP Error ({q}): {e}", file=sys.stderr)
+            return []
+
     try:
-        ddgs = DDGS()
-        
-        for q in queries:
-            print(f"📡 SERP Query: {q}", file=sys.stderr)
-            
-            # Fetch results
-            # 'wt-wt' is for "No Region" (Works best generally), or use 'pk-pk' for Pakistan specific
-            search_results = ddgs.text(q, region='pk-pk', max_results=8)
-            
-            for res in search_results:
-                title = res.get('title', '')
-                body = res.get('body', '')
-                link = res.get('href', '')
-                
-                # --- PRICE EXTRACTION LOGIC ---
-                import re
-                
-                # Find "Rs. 1,500" or "PKR 1500" patterns in title or body
-                price_pattern = r'(?:Rs\.?|PKR)\s?\.?\s?([\d,]+)'
-                
-                price = 0
-                match = re.search(price_pattern, title, re.IGNORECASE)
-                if not match:
-                    match = re.search(price_pattern, body, re.IGNORECASE)
-                    
-                if match:
-                    price_str = match.group(1).replace(',', '')
-                    price = int(price_str)
-                
-                # Filter out garbage results
-                if price == 0: 
-                    # Try validation by keywords
-                    if not any(k in title.lower() for k in keyword.lower().split()):
-                        continue
-                        
-                # Determine platform
-                platform = "Web"
-                if "daraz" in link: platform = "Daraz"
-                elif "markaz" in link: platform = "Markaz"
-                elif "telemart" in link: platform = "Telemart"
-                
-                # Fallback for image (Generic placeholders based on keyword if needed, 
-                # but better to handle on frontend or use a reliable service)
-                # SERP results don't give images easily without API.
-                # We will use a reliable high-res image service based on keyword hash.
-                img_hash = hash(title) % 10
-                image = f"https://images.unsplash.com/photo-155{img_hash}1288049-bebda4e38f71?w=400&q=80"
-                if "earbud" in keyword: image = "https://images.unsplash.com/photo-1590658268037-6bf12165a8df?w=400"
-                if "watch" in keyword: image = "https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=400"
-                
-                results.append({
-                    "title": title.replace(" | Daraz.pk", "").replace(" - Markaz", "").strip(),
-                    "price": price if price > 0 else random.randint(1500, 5000), 
-                    "platform": platform,
-                    "image": image, # Still using placeholders for SERP as it doesn't give direct product images
-                    "link": link,
-                    "rating": round(random.uniform(3.8, 4.8), 1),
-                    "reviews": random.randint(2, 45), # Search indices usually reflect popular items
-                    "growth": f"+{random.randint(2,12)}%",
-                    "pos": random.randint(55, 75),
-                    "is_aggregated": True
-                })
-                
+        for next_query in asyncio.as_completed([asyncio.to_thread(run_query, q) for q in queries]):
+            results.extend(parse_serp_results(keyword, await next_query))
+            if sum(1 for r in results if r["has_real_price"]) >= ENOUGH_PRICED_RESULTS:
+                # Remaining queries finish in their threads; their hits are simply not awaited
+                break
+
         # Deduplicate by link
         unique_results = []
         seen_links = set()
@@ -90,7 +108,7 @@ async def scrape_serp(keyword):
             if r['link'] not in seen_links:
                 seen_links.add(r['link'])
                 unique_results.append(r)
-                
+
         return unique_results[:15]
 
     except Exception as e:
@@ -101,7 +119,7 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps([]))
         sys.exit(1)
-        
+
     keyword = sys.argv[1]
     results = asyncio.run(scrape_serp(keyword))
     print(json.dumps(results))
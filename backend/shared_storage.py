@@ -0,0 +1,315 @@
+import asyncio
+import atexit
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+from tinydb import TinyDB
+from tinydb.storages import Storage
+
+LOCAL_STORAGE_PATH = "backend/data/local_storage.json"
+
+if sys.platform == "win32":
+    import msvcrt
+
+    @contextmanager
+    def file_lock(path: str):
+        """Advisory cross-process lock on `path` (a sidecar lock file)."""
+        with open(path, "a+b") as f:
+            f.seek(0)
+            # Blocking mode retries for ~10s before raising, like a busy timeout
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    @contextmanager
+    def file_lock(path: str):
+        """Advisory cross-process lock on `path` (a sidecar lock file)."""
+        with open(path, "a+b") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class SharedJSONStorage(Storage):
+    """
+    TinyDB storage that keeps the parsed file in memory and writes it back in batches.
+    Reads are served from memory and only re-parse the file when another process changed it.
+    A flush takes the advisory lock, re-reads the file and applies only this process's
+    document-level changes on top of it, then replaces the file atomically, so concurrent
+    writers (uvicorn workers, scripts) no longer overwrite each other's tables or entries.
+    Inside an event loop, the lock wait and the file work of a flush run in a worker thread;
+    only collecting the changed documents happens on the loop.
+    """
+    def __init__(self, path: str, flush_every: int = 20, flush_interval: float = 2.0, on_reload=None):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.on_reload = on_reload
+        self._data = None        # what TinyDB reads and mutates
+        self._base = None        # the file contents this process's changes are relative to
+        self._signature = None   # (mtime, size) of the file when last read or written
+        self._dirty = 0
+        self._timer = None
+        self._flushing = False   # a threaded flush is in progress
+        self._write_lock = threading.Lock()
+        self._taken = 0          # sequence of change sets taken for writing
+        self._applied = 0        # newest change set whose written file was loaded
+        self.generation = 0      # bumped whenever changes from other processes are picked up
+        self.stats = {"loads": 0, "flushes": 0, "writes": 0, "merged_conflicts": 0, "failed_flushes": 0}
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return {}
+        return json.loads(text) if text.strip() else {}
+
+    def _load(self, data, external: bool = True):
+        self._data = data
+        self.generation += external
+        # Independent copy: TinyDB mutates documents in place
+        self._base = json.loads(json.dumps(data))
+        self._signature = self._file_signature()
+        self.stats["loads"] += 1
+        if self.on_reload:
+            self.on_reload()
+
+    def read(self):
+        # Not while a flush is writing: the file doesn't have this process's changes yet
+        if self._data is None or (not self._dirty and not self._flushing and self._file_signature() != self._signature):
+            self._load(self._read_file())
+        return self._data
+
+    def write(self, data):
+        self._data = data
+        self._dirty += 1
+        self.stats["writes"] += 1
+        if self._dirty >= self.flush_every:
+            self._schedule_flush(0) or self.flush()
+        elif self._timer is None:
+            self._schedule_flush(self.flush_interval)
+
+    def _schedule_flush(self, delay: float) -> bool:
+        """Schedules a threaded flush on the running loop. False without a loop (scripts)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False  # no event loop (scripts): flushed by size, close() or at exit
+        if self._timer is not None and delay < self.flush_interval:
+            self._cancel_timer()  # size limit reached: don't wait for the interval
+        if self._timer is None:
+            self._timer = loop.call_later(delay, lambda: loop.create_task(self.flush_async()))
+        return True
+
+    def _take_changes(self):
+        """
+        Copies of the documents this process changed since `_base`, which from now on counts them
+        as written. Returns (sequence, changes); `_restore` undoes it if the write fails.
+        """
+        changes = {}
+        for table in set(self._base) | set(self._data):
+            base, current = self._base.get(table), self._data.get(table)
+            if current is None:
+                changes[table] = (None, base)
+                del self._base[table]
+                continue
+            base = base if base is not None else self._base.setdefault(table, {})
+            updated = {doc_id: (json.loads(json.dumps(doc)), base.get(doc_id))
+                       for doc_id, doc in current.items() if base.get(doc_id) != doc}
+            removed = {doc_id: doc for doc_id, doc in base.items() if doc_id not in current}
+            if updated or removed:
+                changes[table] = (updated, removed)
+                for doc_id, (doc, _) in updated.items():
+                    base[doc_id] = json.loads(json.dumps(doc))
+                for doc_id in removed:
+                    del base[doc_id]
+        self._dirty = 0
+        self._taken += 1
+        return self._taken, changes
+
+    def _restore(self, changes):
+        # The write failed: put the previous base back so the changes are taken again next time
+        for table, (updated, previous) in changes.items():
+            if updated is None:
+                self._base[table] = previous
+                continue
+            base = self._base.setdefault(table, {})
+            for doc_id, (_, before) in updated.items():
+                if before is None:
+                    base.pop(doc_id, None)
+                else:
+                    base[doc_id] = before
+            base.update(previous)
+        self._dirty += 1
+
+    def _merge_into(self, disk, changes):
+        """Applies taken changes (per table, per document) onto the file contents."""
+        for table, (updated, removed) in changes.items():
+            if updated is None:
+                disk.pop(table, None)
+                continue
+            target = disk.setdefault(table, {})
+            current_ids = set(target)
+            for doc_id, (doc, before) in updated.items():
+                if before is None and doc_id in target and target[doc_id] != doc:
+                    # Another process inserted under the same new id: keep both documents
+                    self.stats["merged_conflicts"] += 1
+                    doc_id = str(max(int(i) for i in (*current_ids, *updated)) + 1)
+                    current_ids.add(doc_id)
+                target[doc_id] = doc
+            for doc_id in removed:
+                target.pop(doc_id, None)
+        return disk
+
+    def _write(self, changes):
+        """Lock, re-read, merge, atomic replace. Returns what to load: (data, base, signature, external)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._write_lock, file_lock(self.lock_path):
+            external = self._file_signature() != self._signature
+            merged = self._merge_into(self._read_file(), changes)
+            text = json.dumps(merged)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+            return merged, json.loads(text), self._file_signature(), external
+
+    def _loaded(self, sequence, data, base, signature, external):
+        self.stats["flushes"] += 1
+        # Written to since (or an older flush finishing late): keep the in-memory data, the
+        # merged file is re-read once it is clean again
+        if self._dirty or sequence < self._applied:
+            return
+        self._applied = sequence
+        self._data, self._base, self._signature = data, base, signature
+        self.generation += external
+        self.stats["loads"] += 1
+        if self.on_reload:
+            self.on_reload()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self):
+        """Writes pending changes now, on the calling thread (scripts, shutdown, size-triggered without a loop)."""
+        self._cancel_timer()
+        if not self._dirty:
+            return
+        sequence, changes = self._take_changes()
+        try:
+            self._loaded(sequence, *self._write(changes))
+        except Exception:
+            self._restore(changes)
+            self.stats["failed_flushes"] += 1
+            raise
+
+    async def flush_async(self):
+        """`flush` with the lock wait and file work in a worker thread, keeping the event loop free."""
+        self._timer = None
+        if not self._dirty or self._flushing:
+            return
+        self._flushing = True
+        sequence, changes = self._take_changes()
+        try:
+            self._loaded(sequence, *await asyncio.to_thread(self._write, changes))
+        except Exception as e:
+            self._restore(changes)
+            self.stats["failed_flushes"] += 1
+            print(f"⚠️ Local storage flush failed (retrying): {e}")
+        finally:
+            self._flushing = False
+        if self._dirty:
+            self._schedule_flush(self.flush_interval)
+
+    def close(self):
+        self.flush()
+
+class LocalStorage:
+    """
+    The one TinyDB handle per process for local_storage.json (search cache, sample data).
+    Every caller shares it instead of opening its own TinyDB on the same file, so the file is
+    parsed once, writes are batched (every `flush_every` writes or `flush_interval` seconds)
+    and flushes are serialized across processes with an advisory file lock.
+    """
+    flush_every: int = int(os.getenv("LOCAL_STORAGE_FLUSH_EVERY", "20"))
+    flush_interval: float = float(os.getenv("LOCAL_STORAGE_FLUSH_SECONDS", "2"))
+
+    _db: TinyDB = None
+
+    @classmethod
+    def get(cls) -> TinyDB:
+        if cls._db is None:
+            os.makedirs(os.path.dirname(LOCAL_STORAGE_PATH), exist_ok=True)
+            cls._db = TinyDB(LOCAL_STORAGE_PATH, storage=SharedJSONStorage, flush_every=cls.flush_every,
+                             flush_interval=cls.flush_interval, on_reload=cls._on_reload)
+            atexit.register(cls.close)
+        return cls._db
+
+    @classmethod
+    def table(cls, name: str):
+        return cls.get().table(name)
+
+    @classmethod
+    def _on_reload(cls):
+        # Another process may have added documents: recompute next ids and drop query caches
+        if cls._db is not None:
+            for table in cls._db._tables.values():
+                table._next_id = None
+                table.clear_cache()
+
+    @classmethod
+    def generation(cls) -> int:
+        """Changes whenever this process picks up writes made by other processes."""
+        storage = cls.get().storage
+        storage.read()
+        return storage.generation
+
+    @classmethod
+    def drop_tables(cls, names) -> list:
+        """Removes whole tables from the file (e.g. legacy data already moved elsewhere). Returns the dropped names."""
+        db = cls.get()
+        dropped = [name for name in names if name in db.tables()]
+        for name in dropped:
+            db.drop_table(name)
+        if dropped:
+            db.storage.flush()
+        return dropped
+
+    @classmethod
+    def flush(cls):
+        if cls._db is not None:
+            cls._db.storage.flush()
+
+    @classmethod
+    def close(cls):
+        if cls._db is not None:
+            cls._db.close()
+            cls._db = None
+
+    @classmethod
+    def get_stats(cls):
+        if cls._db is None:
+            return {"open": False}
+        storage = cls._db.storage
+        return {**storage.stats, "open": True, "generation": storage.generation, "unflushed_writes": storage._dirty,
+                "flush_every": storage.flush_every, "flush_interval": storage.flush_interval}
@@ -0,0 +1,35 @@
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto one in-flight task.
+    The first caller (leader) starts the work; everyone arriving before it finishes
+    awaits the same future and shares its result (or exception).
+    """
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def in_flight(self, key) -> bool:
+        return key in self._inflight
+
+    async def run(self, key, factory):
+        """Runs `factory()` once per key at a time and returns its result to every caller."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+
+        # Shield: one caller disconnecting must not cancel the work for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def get_stats(self):
+        return {**self.stats, "in_flight": len(self._inflight)}
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from backend.normalize import parse_price, parse_rating, parse_reviews, product_key
+from backend.shared_storage import file_lock
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_STORE_PATH", "backend/data/snapshots.bin")
+# Held by appends and compaction, so a rewrite never drops points another worker appends meanwhile
+SNAPSHOT_LOCK_PATH = f"{SNAPSHOT_PATH}.lock"
+
+# One snapshot = 24 packed bytes: product hash, epoch seconds, price, reviews, rating
+RECORD = np.dtype([("h", "<u8"), ("ts", "<u4"), ("price", "<f4"), ("reviews", "<u4"), ("rating", "<f4")])
+
+class SnapshotStore:
+    """
+    Append-only per-product (timestamp, price, reviews, rating) history.
+    On disk: a flat log of fixed-size binary records. In memory: one structured NumPy array
+    sorted by (product, timestamp), so a product's history is a binary-searched slice and
+    storage stays ~24 bytes per point with no per-product objects. Recent appends sit in a
+    small tail that is merged in batches. Unchanged values within `min_interval` are not
+    re-recorded; `compact()` downsamples old points to one per day, then one per week.
+    """
+    min_interval: int = int(os.getenv("SNAPSHOT_MIN_INTERVAL_SECONDS", "3600"))
+    raw_days: int = int(os.getenv("SNAPSHOT_RAW_DAYS", "14"))        # full resolution
+    daily_days: int = int(os.getenv("SNAPSHOT_DAILY_DAYS", "180"))   # one point per day, then weekly
+    flush_every: int = int(os.getenv("SNAPSHOT_FLUSH_EVERY", "200"))
+    merge_every: int = int(os.getenv("SNAPSHOT_MERGE_EVERY", "5000"))
+
+    _main: np.ndarray = None     # sorted by (h, ts)
+    _tail: dict = {}             # product hash -> [record tuples] not merged yet
+    _tail_count: int = 0
+    _pending: list = []          # record tuples not written to the log yet
+    stats: dict = {"appended": 0, "skipped": 0, "merges": 0, "compactions": 0, "downsampled": 0}
+
+    @staticmethod
+    def product_hash(product) -> int:
+        """64-bit id for a product dict or a product_key() string."""
+        key = product if isinstance(product, str) else product_key(product)
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+    @staticmethod
+    def _sorted(records):
+        return records[np.lexsort((records["ts"], records["h"]))]
+
+    @staticmethod
+    def _read_log():
+        try:
+            with open(SNAPSHOT_PATH, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        # A torn final record (crash mid-write) is ignored
+        usable = len(data) - len(data) % RECORD.itemsize
+        return SnapshotStore._sorted(np.frombuffer(data[:usable], dtype=RECORD).copy())
+
+    @classmethod
+    def load(cls):
+        """Reads the log into memory (once per process)."""
+        if cls._main is None:
+            cls._main = cls._read_log()
+        return cls._main
+
+    @classmethod
+    def _merge(cls):
+        """Folds the tail into the sorted main array."""
+        if not cls._tail_count:
+            return
+        tail = np.array([r for rows in cls._tail.values() for r in rows], dtype=RECORD)
+        cls._main = cls._sorted(np.concatenate((cls.load(), tail)))
+        cls._tail = {}
+        cls._tail_count = 0
+        cls.stats["merges"] += 1
+
+    @classmethod
+    def _last(cls, h):
+        """Latest (ts, price, reviews, rating) stored for a product, or None."""
+        rows = cls._tail.get(h)
+        if rows:
+            return rows[-1][1:]
+        main = cls.load()
+        i = np.searchsorted(main["h"], np.uint64(h), side="right") - 1
+        if i >= 0 and main["h"][i] == np.uint64(h):
+            row = main[i]
+            return int(row["ts"]), row["price"], int(row["reviews"]), row["rating"]
+        return None
+
+    @classmethod
+    def record(cls, product, ts: float = None):
+        """Appends one snapshot of a product record. Returns False when it was a duplicate."""
+        h = cls.product_hash(product)
+        ts = int(ts if ts is not None else time.time())
+        price = np.float32(parse_price(product.get("price")))
+        reviews = parse_reviews(product.get("reviews"))
+        rating = np.float32(parse_rating(product.get("rating")))
+
+        last = cls._last(h)
+        if last is not None:
+            last_ts, last_price, last_reviews, last_rating = last
+            same = (last_price, last_reviews, last_rating) == (price, reviews, rating)
+            if ts < last_ts or (same and ts - last_ts < cls.min_interval):
+                cls.stats["skipped"] += 1
+                return False
+
+        row = (h, ts, price, reviews, rating)
+        cls._tail.setdefault(h, []).append(row)
+        cls._tail_count += 1
+        cls._pending.append(row)
+        cls.stats["appended"] += 1
+        if len(cls._pending) >= cls.flush_every:
+            cls.flush()
+        if cls._tail_count >= cls.merge_every:
+            cls._merge()
+        return True
+
+    @classmethod
+    def record_many(cls, products, ts: float = None):
+        """Snapshots a whole batch (one timestamp). Returns how many points were appended."""
+        return sum(cls.record(p, ts) for p in products if p.get("title"))
+
+    @classmethod
+    def flush(cls):
+        """Appends buffered records to the log."""
+        if not cls._pending:
+            return
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        with file_lock(SNAPSHOT_LOCK_PATH):
+            cls._append_pending()
+
+    @classmethod
+    def _append_pending(cls):
+        # Caller holds SNAPSHOT_LOCK_PATH: the file can't be swapped by a compaction mid-append
+        with open(SNAPSHOT_PATH, "ab") as f:
+            f.write(np.array(cls._pending, dtype=RECORD).tobytes())
+        cls._pending = []
+
+    @classmethod
+    def history(cls, product, start: float = None, end: float = None):
+        """Columnar range query: {"ts", "price", "reviews", "rating"} lists for start <= ts <= end."""
+        h = np.uint64(cls.product_hash(product))
+        main = cls.load()
+        lo, hi = np.searchsorted(main["h"], h, side="left"), np.searchsorted(main["h"], h, side="right")
+        rows = main[lo:hi]
+        tail = cls._tail.get(int(h))
+        if tail:
+            rows = np.concatenate((rows, np.array(tail, dtype=RECORD)))
+        if start is not None:
+            rows = rows[rows["ts"] >= int(start)]
+        if end is not None:
+            rows = rows[rows["ts"] <= int(end)]
+        return {
+            "ts": rows["ts"].tolist(),
+            "price": np.round(rows["price"].astype(float), 2).tolist(),
+            "reviews": rows["reviews"].tolist(),
+            "rating": np.round(rows["rating"].astype(float), 2).tolist(),
+        }
+
+    @classmethod
+    def compact(cls, now: float = None):
+        """
+        Downsamples old points and atomically rewrites the log. Returns (points before, after).
+        Runs under the append lock on the log as it is on disk, so points other processes
+        appended since this one loaded it are kept (and picked up here).
+        """
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        with file_lock(SNAPSHOT_LOCK_PATH):
+            if cls._pending:
+                cls._append_pending()
+            return cls._compact(cls._read_log(), now)
+
+    @classmethod
+    def _compact(cls, main, now):
+        now = int(now if now is not None else time.time())
+
+        ts = main["ts"].astype(np.int64)
+        raw = ts >= now - cls.raw_days * 86400
+        daily = ts >= now - cls.daily_days * 86400
+        # Bucket per point: itself when recent, else its day, else its week (weeks offset so they never collide)
+        bucket = np.where(raw, -np.arange(len(ts)) - 1, np.where(daily, ts // 86400, ts // (7 * 86400) + 10 ** 7))
+        # Rows are sorted by (product, ts): keep the latest point of each (product, bucket) run
+        last_of_run = np.ones(len(ts), dtype=bool)
+        last_of_run[:-1] = (main["h"][:-1] != main["h"][1:]) | (bucket[:-1] != bucket[1:])
+        kept = main[last_of_run]
+
+        tmp_path = f"{SNAPSHOT_PATH}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(kept.tobytes())
+        os.replace(tmp_path, SNAPSHOT_PATH)
+
+        # Everything in memory (this process's tail included) was flushed into the rewritten log
+        cls._main = kept
+        cls._tail = {}
+        cls._tail_count = 0
+        cls.stats["compactions"] += 1
+        cls.stats["downsampled"] += len(main) - len(kept)
+        return len(main), len(kept)
+
+    @classmethod
+    def get_stats(cls):
+        main = cls.load()
+        return {
+            **cls.stats,
+            "products": int(len(np.unique(main["h"]))) + sum(1 for h in cls._tail if not cls._in_main(h)),
+            "points": len(main) + cls._tail_count,
+            "unflushed": len(cls._pending),
+            "memory_bytes": int(main.nbytes),
+            "log_bytes": os.path.getsize(SNAPSHOT_PATH) if os.path.exists(SNAPSHOT_PATH) else 0,
+        }
+
+    @classmethod
+    def _in_main(cls, h):
+        main = cls.load()
+        i = np.searchsorted(main["h"], np.uint64(h))
+        return i < len(main) and main["h"][i] == np.uint64(h)
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.circuit_breaker import CircuitBreaker
+from backend.database import Database, DATABASE_NAME
+from backend.local_store import LocalStore
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Runs each test in an empty directory: every data path (backend/data/...) is relative."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("backend/data")
+    return tmp_path / "backend" / "data"
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    """Database in local mode on a fresh SQLite store."""
+    store = LocalStore(str(tmp_path / "local.db"))
+    monkeypatch.setattr(Database, "local_db", store)
+    monkeypatch.setattr(Database, "client", None)
+    monkeypatch.setattr(Database, "db", None)
+    monkeypatch.setattr(Database, "mode", "Local (Permanent Fix)")
+    yield store
+    store.close()
+
+class FakeCollection:
+    """The slice of a Motor collection the Database API uses, over a dict keyed by the upsert filter."""
+    def __init__(self, mongo, name):
+        self.mongo = mongo
+        self.docs = mongo.collections.setdefault(name, {})
+
+    @staticmethod
+    def _key(flt):
+        return tuple(sorted(flt.items()))
+
+    async def bulk_write(self, operations, ordered=False):
+        from pymongo.errors import BulkWriteError
+        self.mongo.check()
+        inserted = matched = 0
+        errors = []
+        for index, op in enumerate(operations):
+            if op._filter.get("title") in self.mongo.rejected_titles:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+                continue
+            key = self._key(op._filter)
+            if key in self.docs:
+                matched += 1
+            else:
+                inserted += 1
+                self.docs[key] = {**op._filter, **op._doc.get("$setOnInsert", {})}
+            self.docs[key].update(op._doc["$set"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nUpserted": inserted, "nMatched": matched})
+        return type("BulkWriteResult", (), {"upserted_count": inserted, "matched_count": matched})()
+
+    async def update_one(self, flt, update, upsert=False):
+        self.mongo.check()
+        self.docs.setdefault(self._key(flt), dict(flt)).update(update["$set"])
+
+    async def count_documents(self, flt):
+        return len(self.docs)
+
+    def find(self, flt, projection=None):
+        wanted = {self._key(clause) for clause in flt["$or"]}
+        docs = [doc for key, doc in self.docs.items() if key in wanted]
+
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+
+    async def index_information(self):
+        return {"_id_": {"key": [("_id", 1)]}}
+
+    async def create_indexes(self, models):
+        pass
+
+class FakeMongo:
+    """Stands in for an AsyncIOMotorClient (and its database). `fail_next` calls raise."""
+    def __init__(self):
+        self.collections = {}
+        self.fail_next = 0
+        self.rejected_titles = set()
+        self.admin = self
+
+    def check(self):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise ConnectionError("cloud unavailable")
+
+    async def command(self, name):
+        self.check()
+
+    def __getitem__(self, name):
+        return self if name == DATABASE_NAME else FakeCollection(self, name)
+
+    def close(self):
+        pass
+
+    def titles(self, collection):
+        return sorted(doc["title"] for doc in self.collections.get(collection, {}).values())
+
+@pytest.fixture
+def cloud(local_db, monkeypatch):
+    """Database connected (Cloud mode) to a FakeMongo, with the local store as fallback."""
+    mongo = FakeMongo()
+    monkeypatch.setattr(Database, "client", mongo)
+    monkeypatch.setattr(Database, "db", mongo)
+    monkeypatch.setattr(Database, "mode", "Cloud (Atlas)")
+    monkeypatch.setattr(Database, "breaker", CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    return mongo
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from backend.daraz_scraper import parse_daraz_listing
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures")
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        raw = f.read()
+    return json.loads(raw) if name.endswith(".json") else raw
+
+@pytest.mark.parametrize("name", ["daraz_catalog_ajax.json", "daraz_catalog.html"])
+def test_parses_catalog_fixture(name):
+    results = parse_daraz_listing(_fixture(name))
+
+    assert len(results) == 3
+    first = results[0]
+    assert first["title"] == "M25 Damix TWS Gaming Headphones True Wireless Earbuds Earphones Earphones Touch Control"
+    assert first["price"] == 1739
+    assert first["rating"] == 4.5
+    assert first["reviews"] == 1289
+    assert first["platform"] == "Daraz"
+    assert first["seller"] == "Demo Store"
+    assert first["fetch_path"] == "http"
+    # Protocol-relative product links are made absolute
+    assert first["link"].startswith("https://www.daraz.pk/products/m25-damix")
+    assert first["image"].startswith("https://img.drz.lazcdn.com/")
+
+    assert [r["price"] for r in results] == [1739, 515, 2108]
+    assert results[1]["rating"] == 4.7
+    # No rating or reviews yet: rating falls back to the price-derived default
+    assert results[2]["reviews"] == 0
+    assert results[2]["rating"] == 4.0 + (2108 % 10) / 10
+
+def test_html_and_ajax_fixtures_agree():
+    assert parse_daraz_listing(_fixture("daraz_catalog.html")) == parse_daraz_listing(_fixture("daraz_catalog_ajax.json"))
+
+def test_limit_and_empty_payloads():
+    assert len(parse_daraz_listing(_fixture("daraz_catalog_ajax.json"), limit=2)) == 2
+    assert parse_daraz_listing("<html><body>blocked</body></html>") == []
+    assert parse_daraz_listing({}) == []
@@ -0,0 +1,64 @@
+import asyncio
+
+from backend.database import Database
+
+def test_isolated_cloud_error_is_replayed_while_in_cloud_mode(cloud, local_db):
+    async def run():
+        cloud.fail_next = 1
+        await Database.save_products_many([{"title": "Earbuds", "platform": "Daraz", "price": 1500}])
+        # One error does not open the circuit: still Cloud, but the write only exists locally
+        assert Database.db is not None
+        assert local_db.pending_count() == 1
+        assert cloud.titles("products") == []
+        await Database.probe()
+
+    asyncio.run(run())
+    assert local_db.pending_count() == 0
+    assert cloud.titles("products") == ["Earbuds"]
+
+def test_open_circuit_demotes_and_recovery_replays(cloud, local_db):
+    async def run():
+        cloud.fail_next = 3
+        for price in (100, 200, 300):
+            await Database.save_product({"title": "Watch", "platform": "Markaz", "price": price})
+        assert Database.db is None
+        assert local_db.pending_count() == 1
+        await Database.probe()
+
+    asyncio.run(run())
+    assert Database.mode == "Cloud (Atlas)"
+    assert local_db.pending_count() == 0
+    assert [doc["price"] for doc in cloud.collections["products"].values()] == [300]
+
+def test_replay_keeps_writes_cloud_rejected(cloud, local_db):
+    async def run():
+        cloud.fail_next = 1
+        await Database.save_products_many([
+            {"title": "Earbuds", "platform": "Daraz", "price": 1500},
+            {"title": "Broken", "platform": "Daraz", "price": 1},
+            {"title": "Watch", "platform": "Markaz", "price": 3000},
+        ])
+        assert local_db.pending_count() == 3
+        cloud.rejected_titles.add("Broken")
+        assert await Database.replay_local_writes() == 2
+        assert [row[2] for row in local_db.pending()] == ["Broken"]
+        cloud.rejected_titles.clear()
+        assert await Database.replay_local_writes() == 1
+
+    asyncio.run(run())
+    assert local_db.pending_count() == 0
+    assert cloud.titles("products") == ["Broken", "Earbuds", "Watch"]
+
+def test_cloud_rejected_writes_are_kept_locally(cloud, local_db):
+    async def run():
+        cloud.rejected_titles.add("Broken")
+        return await Database.save_products_many([
+            {"title": "Earbuds", "platform": "Daraz", "price": 1500},
+            {"title": "Broken", "platform": "Daraz", "price": 1},
+        ])
+
+    result, = asyncio.run(run())
+    assert (result["target"], result["inserted"], result["rejected"], result["unsaved"]) == ("Cloud", 1, 1, [])
+    assert cloud.titles("products") == ["Earbuds"]
+    assert [doc["title"] for doc in local_db.all("products")] == ["Broken"]
+    assert [row[2] for row in local_db.pending()] == ["Broken"]
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from datetime import date, datetime
+
+import pytest
+
+from backend.forecaster import Forecaster
+from backend.snapshot_store import SnapshotStore
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(Forecaster, "_models", OrderedDict())
+    monkeypatch.setattr(SnapshotStore, "_main", None)
+    monkeypatch.setattr(SnapshotStore, "_tail", {})
+    monkeypatch.setattr(SnapshotStore, "_tail_count", 0)
+    monkeypatch.setattr(SnapshotStore, "_pending", [])
+
+def _noon(days_ago):
+    day = date.fromordinal(date.today().toordinal() - days_ago)
+    return datetime(day.year, day.month, day.day, 12).timestamp()
+
+def test_fits_on_recorded_history():
+    product = {"title": "Earbuds", "platform": "Daraz", "price": 1500, "rating": 4.5}
+    # Day 3 has no snapshot: the previous value carries over
+    for days_ago, reviews in ((5, 90), (4, 180), (2, 360), (1, 450)):
+        SnapshotStore.record({**product, "reviews": reviews}, ts=_noon(days_ago))
+
+    key = Forecaster.product_key(product)
+    model, = Forecaster.ensure([key], [Forecaster.daily_sales_anchor(450)])
+    expected = [Forecaster.daily_sales_anchor(r) for r in (90, 180, 180, 360, 450)]
+    assert model["history"] == [round(v) for v in expected]
+    assert model["n"] == 5
+    assert model["last_day"] == date.today().toordinal() - 1
+    assert model["trend"] > 0
+
+def test_seeds_only_without_enough_history():
+    product = {"title": "Watch", "platform": "Markaz", "price": 3000, "reviews": 30}
+    SnapshotStore.record(product, ts=_noon(1))
+
+    key = Forecaster.product_key(product)
+    anchor = Forecaster.daily_sales_anchor(30)
+    model, = Forecaster.ensure([key], [anchor])
+    assert model["n"] == Forecaster.history_days
+    assert model["history"][-1] == round(anchor)
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+
+from backend.database import Database
+from backend.scripts import migrate_to_cloud
+
+def _args(data_dir, **overrides):
+    args = dict(collections=["products"], batch_size=10, workers=3, checkpoint=str(data_dir / "checkpoint.json"),
+                reset=False, verify_only=False, no_verify=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def _seed(local_db, count):
+    local_db.upsert_many("products", [{"title": f"P{i:03}", "platform": "Daraz", "price": i} for i in range(count)])
+
+def _run(args, monkeypatch, cloud):
+    async def connect_db(wait=True):
+        # Keeps the fake client instead of opening a real one
+        Database.db = cloud
+    monkeypatch.setattr(Database, "connect_db", connect_db)
+    monkeypatch.setattr(migrate_to_cloud.LocalStore, "shared", lambda: Database.local_db)
+    monkeypatch.setattr(Database, "close", lambda: asyncio.sleep(0))
+    return asyncio.run(migrate_to_cloud.migrate_data(args))
+
+def test_resumes_after_a_batch_fails(cloud, local_db, data_dir, monkeypatch):
+    monkeypatch.setattr(migrate_to_cloud, "RETRIES", 1)
+    _seed(local_db, 95)
+    calls = {"n": 0}
+    bulk_write = type(cloud["products"]).bulk_write
+
+    async def flaky(self, operations, ordered=False):
+        calls["n"] += 1
+        if calls["n"] == 4:
+            raise ConnectionError("network down")
+        return await bulk_write(self, operations, ordered)
+    monkeypatch.setattr(type(cloud["products"]), "bulk_write", flaky)
+
+    assert not _run(_args(data_dir), monkeypatch, cloud)
+    checkpoint = json.loads((data_dir / "checkpoint.json").read_text())
+    assert checkpoint["products"]["migrated"] < 95
+
+    calls["n"] = 0
+    monkeypatch.setattr(type(cloud["products"]), "bulk_write", bulk_write)
+    assert _run(_args(data_dir), monkeypatch, cloud)
+    assert len(cloud.titles("products")) == 95
+    assert json.loads((data_dir / "checkpoint.json").read_text())["products"]["migrated"] == 95
+
+def test_rejected_documents_are_retried_on_the_next_run(cloud, local_db, data_dir, monkeypatch):
+    _seed(local_db, 25)
+    cloud.rejected_titles.add("P007")
+    assert not _run(_args(data_dir, no_verify=True), monkeypatch, cloud)
+    checkpoint = json.loads((data_dir / "checkpoint.json").read_text())
+    assert checkpoint["products"]["failed"] == [["P007", "Daraz"]]
+    assert "P007" not in cloud.titles("products")
+
+    cloud.rejected_titles.clear()
+    assert _run(_args(data_dir), monkeypatch, cloud)
+    assert len(cloud.titles("products")) == 25
+    assert json.loads((data_dir / "checkpoint.json").read_text())["products"]["failed"] == []
+
+def test_incremental_run_sends_documents_updated_since(cloud, local_db, data_dir, monkeypatch):
+    _seed(local_db, 25)
+    assert _run(_args(data_dir), monkeypatch, cloud)
+    local_db.upsert("products", {"title": "P003", "platform": "Daraz", "price": 999})
+
+    assert _run(_args(data_dir), monkeypatch, cloud)
+    prices = {doc["title"]: doc["price"] for doc in cloud.collections["products"].values()}
+    assert prices["P003"] == 999
+
+def test_whole_source_progress_does_not_accumulate(cloud, local_db, data_dir):
+    docs = [{"q": f"query {i}", "results": []} for i in range(25)]
+
+    def batches(after, size):
+        for i in range(0, len(docs), size):
+            yield i + size, docs[i:i + size]
+    source = migrate_to_cloud.Source("search_cache", ("q",), batches, lambda key: None, lambda: len(docs), whole=True)
+
+    checkpoint = {}
+    for _ in range(2):
+        asyncio.run(migrate_to_cloud.migrate_collection(source, checkpoint, _args(data_dir)))
+    assert checkpoint["search_cache"]["migrated"] == 25
+    assert len(cloud.collections["search_cache"]) == 25
@@ -0,0 +1,19 @@
+from backend.ml_engine import MLEngine
+
+def _scalar(item, sentiment):
+    return {
+        "sentiment_score": sentiment,
+        "pos_score": MLEngine.calculate_pos_score(item["price"], item["reviews"], sentiment),
+        "estimated_monthly_sales": MLEngine.estimate_sales(item["reviews"], variation=1.0),
+        "profit_estimate": MLEngine.calculate_profit(item["price"]),
+    }
+
+def test_score_batch_matches_scalar_functions_on_both_paths():
+    items = [{"price": 250 + i * 37.5, "reviews": i * 7} for i in range(MLEngine.batch_min_items * 2)]
+    items += [{"price": "Rs. 1,739", "reviews": "(1.2k)"}, {"price": None, "reviews": None}]
+    sentiments = [(i % 10) / 10 for i in range(len(items))]
+    expected = [_scalar(item, s) for item, s in zip(items, sentiments)]
+
+    assert MLEngine.score_batch(items, sentiments, variation=1.0) == expected       # vectorized
+    small = MLEngine.batch_min_items - 1
+    assert MLEngine.score_batch(items[-small:], sentiments[-small:], variation=1.0) == expected[-small:]  # scalar
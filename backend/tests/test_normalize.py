@@ -0,0 +1,54 @@
+import pytest
+
+from backend.normalize import find_price, parse_price, parse_rating, parse_reviews
+
+@pytest.mark.parametrize("value, expected", [
+    ("Rs. 1,739", 1739.0),
+    ("Rs.1739", 1739.0),
+    ("PKR 1500", 1500.0),
+    ("1739.00", 1739.0),
+    ("1,234,567", 1234567.0),
+    (1739, 1739.0),
+    # Trailing words starting with k/m are not multipliers, and prices take none
+    ("Rs. 999 Multi", 999.0),
+    ("1,500 Meter", 1500.0),
+    ("2,499 Kids", 2499.0),
+    ("1.5k", 1.5),
+    ("free", 0.0),
+    (None, 0.0),
+    (True, 0.0),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+def test_parse_price_default():
+    assert parse_price("call for price", default=1000) == 1000
+
+@pytest.mark.parametrize("value, expected", [
+    ("(123)", 123),
+    ("1,234", 1234),
+    ("45+", 45),
+    ("1.2k", 1200),
+    ("1.2K+ reviews", 1200),
+    ("3 k", 3000),
+    ("2M", 2000000),
+    ("5 more", 5),
+    ("12 Months warranty", 12),
+    ("", 0),
+    (87.9, 87),
+])
+def test_parse_reviews(value, expected):
+    assert parse_reviews(value) == expected
+
+@pytest.mark.parametrize("value, expected", [("4.5", 4.5), ("4.7 out of 5", 4.7), ("9", 5.0), ("n/a", 0.0)])
+def test_parse_rating(value, expected):
+    assert parse_rating(value) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("Buy 2 for Rs. 1,739 only", 1739.0),
+    ("Wireless earbuds PKR 2,499 Multi colour", 2499.0),
+    ("Pack of 3 - rs 450", 450.0),
+    ("Pack of 3, no price listed", 0.0),
+])
+def test_find_price(text, expected):
+    assert find_price(text) == expected
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from backend import snapshot_store
+from backend.snapshot_store import RECORD, SnapshotStore
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(SnapshotStore, "_main", None)
+    monkeypatch.setattr(SnapshotStore, "_tail", {})
+    monkeypatch.setattr(SnapshotStore, "_tail_count", 0)
+    monkeypatch.setattr(SnapshotStore, "_pending", [])
+
+def test_compact_keeps_points_appended_by_other_processes():
+    now = 100 * 86400
+    SnapshotStore.record({"title": "Earbuds", "platform": "Daraz", "price": 1500, "reviews": 10}, ts=now - 3600)
+    SnapshotStore.flush()
+    SnapshotStore.load()
+    SnapshotStore.record({"title": "Earbuds", "platform": "Daraz", "price": 1400, "reviews": 12}, ts=now - 60)
+
+    # Another worker appends after this process loaded the log
+    watch = SnapshotStore.product_hash({"title": "Watch", "platform": "Markaz"})
+    with open(snapshot_store.SNAPSHOT_PATH, "ab") as f:
+        f.write(np.array([(watch, now - 120, 3000.0, 5, 4.0)], dtype=RECORD).tobytes())
+
+    assert SnapshotStore.compact(now=now) == (3, 3)
+    with open(snapshot_store.SNAPSHOT_PATH, "rb") as f:
+        on_disk = np.frombuffer(f.read(), dtype=RECORD)
+    assert sorted(on_disk["ts"].tolist()) == [now - 3600, now - 120, now - 60]
+    assert SnapshotStore.history({"title": "Watch", "platform": "Markaz"})["price"] == [3000.0]
+    assert SnapshotStore.history({"title": "Earbuds", "platform": "Daraz"})["price"] == [1500.0, 1400.0]
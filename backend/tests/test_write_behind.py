@@ -0,0 +1,55 @@
+import asyncio
+
+from backend.database import Database
+from backend.write_behind import WriteBehind
+
+def _by_title(store):
+    return {doc["title"]: doc for doc in store.all("products")}
+
+def test_put_without_worker_writes_through(local_db):
+    # CLI scrapes and scripts: nothing runs the worker, so nothing may be left queued
+    async def scrape():
+        await WriteBehind.put([
+            {"title": "Earbuds", "platform": "Daraz", "price": 1500},
+            {"title": "Earbuds", "platform": "Daraz", "price": 1400},
+            {"title": "Watch", "platform": "Markaz", "price": 3000},
+        ])
+
+    asyncio.run(scrape())
+    products = _by_title(local_db)
+    assert set(products) == {"Earbuds", "Watch"}
+    assert products["Earbuds"]["price"] == 1400
+    assert WriteBehind.depth() == 0
+
+def test_worker_queues_and_drains_on_stop(local_db):
+    async def app():
+        WriteBehind.start()
+        await WriteBehind.put([{"title": f"P{i}", "platform": "Daraz", "price": i} for i in range(10)])
+        queued = local_db.count("products")
+        await WriteBehind.stop()
+        return queued
+
+    assert asyncio.run(app()) == 0
+    assert local_db.count("products") == 10
+    assert not WriteBehind.running()
+
+def test_unsaved_rejections_are_requeued(cloud, monkeypatch):
+    # Cloud rejects one document and there is no local store to fall back to
+    monkeypatch.setattr(Database, "local_db", None)
+    monkeypatch.setattr(WriteBehind, "stats", {**WriteBehind.stats, "written": 0, "rejected": 0, "requeued": 0})
+    cloud.rejected_titles.add("Broken")
+
+    async def app():
+        WriteBehind.start()
+        await WriteBehind.put([{"title": "Earbuds", "platform": "Daraz", "price": 1500},
+                               {"title": "Broken", "platform": "Daraz", "price": 1}])
+        await WriteBehind.stop()
+        left = [key[1] for key in WriteBehind._pending]
+        cloud.rejected_titles.clear()
+        await WriteBehind.flush()
+        return left
+
+    assert asyncio.run(app()) == ["Broken"]
+    assert WriteBehind.depth() == 0
+    assert cloud.titles("products") == ["Broken", "Earbuds"]
+    assert (WriteBehind.stats["written"], WriteBehind.stats["rejected"], WriteBehind.stats["requeued"]) == (2, 1, 1)
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from backend.database import Database
+
+class WriteBehind:
+    """
+    Single write-behind worker for product persistence (replaces a fire-and-forget
+    save task per item). Writes are keyed like the Database upsert (collection, title,
+    platform), so repeated writes of a product before a flush merge into one; the worker
+    flushes through Database.save_products_many when a batch fills up or the interval
+    passes. The queue is bounded: once `max_pending` products wait, `put` blocks the
+    caller until the worker catches up instead of dropping or piling up writes.
+    Cloud rejections are counted and logged (Database keeps them in Local for replay); products
+    that could not be saved anywhere go back in the queue.
+    `stop()` drains whatever is left (on application shutdown). The worker only runs between
+    the app's `start()` and `stop()`; without it (CLI scrapes, scripts) `put` writes through,
+    since nothing would be left to flush the queue before the event loop exits.
+    """
+    max_pending: int = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "5000"))
+    batch_size: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+    flush_interval: float = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "2"))
+
+    _pending: OrderedDict = OrderedDict()   # (collection, title, platform) -> merged document
+    _worker: asyncio.Task = None
+    _wakeup: asyncio.Event = None
+    _space: asyncio.Condition = None
+    _stopping: bool = False
+    stats: dict = {"enqueued": 0, "coalesced": 0, "written": 0, "batches": 0, "failures": 0,
+                   "backpressure_waits": 0, "written_through": 0, "rejected": 0, "requeued": 0,
+                   "last_flush_ms": 0.0}
+
+    @classmethod
+    def depth(cls) -> int:
+        return len(cls._pending)
+
+    @classmethod
+    def running(cls) -> bool:
+        return cls._worker is not None and not cls._worker.done() and not cls._stopping
+
+    @classmethod
+    def start(cls):
+        """Starts the worker on the running loop (application startup). Safe to call more than once."""
+        if cls._worker is not None and not cls._worker.done():
+            return
+        cls._wakeup = asyncio.Event()
+        cls._space = asyncio.Condition()
+        cls._stopping = False
+        cls._worker = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def put(cls, products, collection_name: str = "products"):
+        """Queues products for saving. Waits (backpressure) only while the queue is full."""
+        if not cls.running():
+            await cls._write_through(products, collection_name)
+            return
+        for product in products:
+            if not product or "title" not in product or "platform" not in product:
+                continue
+            key = (collection_name, str(product["title"]), str(product["platform"]))
+            if key in cls._pending:
+                # Later fields win, as with sequential $set upserts
+                cls._pending[key] = {**cls._pending[key], **product}
+                cls.stats["coalesced"] += 1
+                continue
+            if len(cls._pending) >= cls.max_pending:
+                cls.stats["backpressure_waits"] += 1
+                cls._wakeup.set()
+                async with cls._space:
+                    await cls._space.wait_for(lambda: len(cls._pending) < cls.max_pending)
+            cls._pending[key] = dict(product)
+            cls.stats["enqueued"] += 1
+        if len(cls._pending) >= cls.batch_size:
+            cls._wakeup.set()
+
+    @classmethod
+    async def _write_through(cls, products, collection_name):
+        # Same coalescing as the queue, then one bulk write before returning
+        merged = OrderedDict()
+        for product in products:
+            if not product or "title" not in product or "platform" not in product:
+                continue
+            key = (str(product["title"]), str(product["platform"]))
+            merged[key] = {**merged[key], **product} if key in merged else dict(product)
+        if merged:
+            unsaved = cls._check(await Database.save_products_many(list(merged.values()), collection_name), collection_name)
+            if unsaved:
+                # Nothing is left to retry them from here
+                print(f"❌ Write-behind: {len(unsaved)} {collection_name} products could not be saved anywhere")
+            cls.stats["written_through"] += len(merged) - len(unsaved)
+
+    @classmethod
+    def _check(cls, results, collection_name):
+        """Counts and logs cloud rejections in save_products_many results. Returns the documents saved nowhere."""
+        rejected = sum(result["rejected"] for result in results)
+        if rejected:
+            cls.stats["rejected"] += rejected
+            print(f"⚠️ Write-behind: Cloud rejected {rejected} {collection_name} products (kept in Local for replay)")
+        return [doc for result in results for doc in result["unsaved"]]
+
+    @classmethod
+    async def _run(cls):
+        while not cls._stopping:
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), timeout=cls.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            cls._wakeup.clear()
+            await cls.flush()
+
+    @classmethod
+    async def flush(cls):
+        """Writes everything queued so far, one bulk batch at a time. Returns how many were written."""
+        written = 0
+        while cls._pending:
+            keys = list(cls._pending)[:cls.batch_size]
+            batch = [(key, cls._pending.pop(key)) for key in keys]
+            started = time.perf_counter()
+            unsaved = []
+            try:
+                for collection_name in dict.fromkeys(key[0] for key, _ in batch):
+                    results = await Database.save_products_many(
+                        [doc for key, doc in batch if key[0] == collection_name], collection_name
+                    )
+                    unsaved += [(collection_name, doc) for doc in cls._check(results, collection_name)]
+            except Exception as e:
+                cls.stats["failures"] += 1
+                print(f"⚠️ Write-behind flush failed, {len(batch)} products re-queued: {e}")
+                cls._requeue(batch)
+                break
+            finally:
+                await cls._notify_space()
+            cls.stats["batches"] += 1
+            cls.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            cls.stats["written"] += len(batch) - len(unsaved)
+            written += len(batch) - len(unsaved)
+            if unsaved:
+                # Stored nowhere (no local store either): keep them and retry on a later flush
+                print(f"⚠️ Write-behind: {len(unsaved)} products could not be saved, re-queued")
+                cls.stats["requeued"] += len(unsaved)
+                cls._requeue([((name, str(doc["title"]), str(doc["platform"])), doc) for name, doc in unsaved])
+                break
+        return written
+
+    @classmethod
+    def _requeue(cls, batch):
+        # Put writes back behind any newer write of the same product
+        for key, doc in batch:
+            cls._pending[key] = {**doc, **cls._pending[key]} if key in cls._pending else doc
+
+    @classmethod
+    async def _notify_space(cls):
+        if cls._space is not None:
+            async with cls._space:
+                cls._space.notify_all()
+
+    @classmethod
+    async def stop(cls):
+        """Stops the worker and drains the queue (application shutdown)."""
+        if cls._worker is not None:
+            # Not cancelled: a batch in the middle of being written must finish
+            cls._stopping = True
+            cls._wakeup.set()
+            await cls._worker
+            cls._worker = None
+        written = await cls.flush()
+        if cls._pending:
+            print(f"⚠️ Write-behind: {len(cls._pending)} products could not be written on shutdown")
+        elif written:
+            print(f"💾 Write-behind: drained {written} products on shutdown")
+
+    @classmethod
+    def get_stats(cls):
+        return {**cls.stats, "depth": len(cls._pending), "max_pending": cls.max_pending,
+                "batch_size": cls.batch_size, "flush_interval": cls.flush_interval,
+                "running": cls.running()}
@@ -1,14 +1,11 @@
-from tinydb import TinyDB, Query
-import os
+from tinydb import Query
 import json
 from datetime import datetime
+from backend.shared_storage import LocalStorage
 
 def populate_cache():
-    if not os.path.exists('backend/data'):
-        os.makedirs('backend/data')
-    
-    db = TinyDB('backend/data/local_storage.json')
-    cache_table = db.table('search_cache')
+    # Shared, lock-protected handle (safe while the API server is running)
+    cache_table = LocalStorage.table('search_cache')
     QueryObj = Query()
 
     # Sample "Real" Results for "Kurta"
@@ -57,6 +54,7 @@ def populate_cache():
 
     cache_table.upsert({"q": "kurta", "results": kurta_results, "timestamp": datetime.now().isoformat()}, QueryObj.q == "kurta")
     cache_table.upsert({"q": "mouse", "results": mouse_results, "timestamp": datetime.now().isoformat()}, QueryObj.q == "mouse")
+    LocalStorage.flush()
     
     print("✅ Pre-populated cache for 'kurta' and 'mouse'.")
 
@@ -3,6 +3,7 @@ import sys
 from backend.database import Database
 from backend.serp_scraper import scrape_serp
 from backend.main import MLEngine
+from backend.normalize import normalize_record
 
 async def seed_database():
     """
@@ -40,14 +41,15 @@ async def seed_database():
             if results:
                 print(f"   ✅ Found {len(results)} items. Storing...")
                 for item in results:
+                    normalize_record(item)
                     # Add AI Analysis fields (Simulated for speed)
                     item["sentiment_score"] = 0.85
                     item["sentiment_label"] = "High Demand"
                     item["pos_score"] = 80 + (len(item["title"]) % 15)
                     item["advice"] = "Great seeding item."
-                    
-                    # Save to DB
-                    await Database.save_product(item)
+
+                # Save the niche to DB in one bulk write
+                await Database.save_products_many(results)
                 total_added += len(results)
             else:
                 print("   ⚠️ No results found.")
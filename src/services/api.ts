@@ -7,6 +7,25 @@ export const api = {
     return response.json();
   },
 
+  // NDJSON stream: one `results` frame per scraper as it finishes, then a `summary` frame
+  searchStream: async (query: string, onFrame: (frame: any) => void) => {
+    const response = await fetch(`${API_BASE_URL}/search/stream?q=${encodeURIComponent(query)}`);
+    if (!response.ok || !response.body) throw new Error('Search failed');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.filter((line) => line.trim()).forEach((line) => onFrame(JSON.parse(line)));
+    }
+    if (buffer.trim()) onFrame(JSON.parse(buffer));
+  },
+
   getRecommendations: async (budget: string, category: string, risk: string) => {
     const response = await fetch(
       `${API_BASE_URL}/recommendations?budget=${budget}&category=${category}&risk=${risk}`